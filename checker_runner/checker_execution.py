@@ -1,5 +1,10 @@
+import time
 from abc import abstractmethod, ABC
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from typing import Iterator
+
+from saarctf_commons.config import config
 
 _process_needs_restart = False
 
@@ -22,6 +27,69 @@ class CheckerRunOutput:
     data: dict = field(default_factory=dict)  # additional, runner-specific data
 
 
+class PhaseTimer:
+    """
+    Measures wall-clock and CPU time of the phases of a check (check_integrity, store_flags, ...).
+    Results are stored in CheckerRunOutput.data["timings"]: {phase: {"wall": seconds, "cpu": seconds}}.
+    If a phase runs multiple times, the slowest run is kept. CPU time is omitted if it can't be attributed to the check.
+    """
+
+    def __init__(self) -> None:
+        self.timings: dict[str, dict[str, float]] = {}
+
+    @contextmanager
+    def measure(self, phase: str, cpu: bool = True) -> Iterator[None]:
+        """
+        :param cpu: measure CPU time of the current thread (not meaningful for coroutines)
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - wall_start, time.thread_time() - cpu_start if cpu else None)
+
+    def record(self, phase: str, wall: float, cpu: float | None = None) -> None:
+        previous = self.timings.get(phase)
+        if previous is not None and previous['wall'] >= wall:
+            return
+        entry = {'wall': round(wall, 4)}
+        if cpu is not None:
+            entry['cpu'] = round(cpu, 4)
+        self.timings[phase] = entry
+
+    def attach(self, result: CheckerRunOutput) -> CheckerRunOutput:
+        if self.timings:
+            result.data['timings'] = self.timings
+        return result
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int
+    statuses: list[str]
+
+    @classmethod
+    def for_service(cls, cfg: dict | None) -> 'RetryPolicy':
+        """
+        :param cfg: runner config of the service (from database), can override the global defaults in "retry"
+        :return: the retry policy of this service (max_retries = 0 if retries are disabled)
+        """
+        defaults = config.RUNNER.retry
+        if not defaults.enabled:
+            return cls(0, [])
+        override = (cfg or {}).get('retry') or {}
+        return cls(int(override.get('max_retries', defaults.max_retries)), list(override.get('statuses', defaults.statuses)))
+
+    def allows(self, status: str, attempt: int) -> bool:
+        """
+        :param status: result of the last attempt
+        :param attempt: number of the last attempt (0 = initial run)
+        :return: True if this check qualifies for another attempt
+        """
+        return attempt < self.max_retries and status in self.statuses
+
+
 class CheckerRunner(ABC):
     def __init__(self, service_id: int, package: str, script: str, cfg: dict | None) -> None:
         """
@@ -39,6 +107,18 @@ class CheckerRunner(ABC):
     def execute_checker(self, team_id: int, tick: int) -> CheckerRunOutput:
         raise NotImplementedError
 
+    async def execute_checker_concurrent(self, team_id: int, tick: int, timeout: float) -> CheckerRunOutput:
+        """
+        Run this check in the worker's event loop, concurrently with other checks (see concurrent_execution.py).
+        By default, execute_checker runs in the worker's thread pool. Runners with async checkers should override this.
+        """
+        from checker_runner.concurrent_execution import WorkerEventLoop, CheckerTimeout
+
+        try:
+            return await WorkerEventLoop.get().run_in_pool(lambda: self.execute_checker(team_id, tick), timeout)
+        except CheckerTimeout:
+            return CheckerRunOutput("TIMEOUT", message="Timeout, service too slow")
+
     def execute_checker_subprocess(
         self, team_id: int, tick: int, timeout: int
     ) -> CheckerRunOutput:
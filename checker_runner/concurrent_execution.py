@@ -0,0 +1,193 @@
+"""
+Infrastructure to run many checks concurrently in a single worker process.
+
+- WorkerEventLoop: one long-lived asyncio event loop per process (in a background thread),
+  plus a bounded thread pool for checkers that can't run as coroutines.
+- Log capture per check: a single root log handler writes into the buffer of the check that is currently
+  running in this context (contextvars are inherited by asyncio tasks and by the thread pool wrapper below).
+- Shared HTTP sessions (keep-alive connection pools) per base URL, for checkers that talk to HTTP services (eno).
+  Closed when the worker process shuts down.
+
+Concurrent workers should only consume the concurrent queue:
+celery -A checker_runner.celery_cmd worker --pool threads --concurrency 100 -Q concurrent
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from logging import Handler, LogRecord, NOTSET, getLogger
+from typing import Any, Callable, ClassVar, Coroutine, Iterator, TypeVar, TYPE_CHECKING
+
+from celery.signals import worker_process_shutdown
+
+from checker_runner.checker_execution import set_process_needs_restart
+from saarctf_commons.config import config
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession, ClientTimeout
+
+T = TypeVar("T")
+
+
+class CheckerTimeout(Exception):
+    pass
+
+
+_current_output: contextvars.ContextVar[list[str] | None] = contextvars.ContextVar('checker_output', default=None)
+
+
+class ContextOutputHandler(Handler):
+    """
+    Log handler that captures log messages into the output buffer of the current check (if any)
+    """
+
+    def __init__(self, level: int = NOTSET) -> None:
+        Handler.__init__(self, level)
+
+    def emit(self, record: LogRecord) -> None:
+        buffer = _current_output.get()
+        if buffer is not None:
+            buffer.append(self.format(record))
+
+    @classmethod
+    def install(cls) -> None:
+        root = getLogger()
+        if not any(isinstance(handler, cls) for handler in root.handlers):
+            root.addHandler(cls())
+
+
+@contextmanager
+def capture_output() -> Iterator[list[str]]:
+    """
+    Capture all log messages of this context (and all tasks/threads started from it).
+    :return: the list that receives the formatted messages
+    """
+    ContextOutputHandler.install()
+    buffer: list[str] = []
+    token = _current_output.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current_output.reset(token)
+
+
+async def run_with_timeout(coro: Coroutine[Any, Any, T], timeout: float) -> T:
+    """
+    Like asyncio.wait_for, but timeouts inside the coroutine (e.g. socket timeouts) can be distinguished from our timeout.
+    :raises CheckerTimeout: if the coroutine did not finish in time (it is cancelled)
+    """
+    task = asyncio.ensure_future(coro)
+    done, _ = await asyncio.wait({task}, timeout=timeout)
+    if not done:
+        task.cancel()
+        raise CheckerTimeout()
+    return task.result()
+
+
+class WorkerEventLoop:
+    """
+    A per-process event loop running in a background thread. Started on first use (also in forked children).
+    """
+    _instance: ClassVar['WorkerEventLoop | None'] = None
+    _instance_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self) -> None:
+        self.owner_pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.pool = ThreadPoolExecutor(max_workers=config.RUNNER.concurrent.threads, thread_name_prefix='checker')
+        self.stuck_threads = 0  # sync checkers that timed out, but are still running
+        self._http_sessions: dict[str, 'ClientSession'] = {}
+        self._thread = threading.Thread(target=self.loop.run_forever, name='Worker Event Loop', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> 'WorkerEventLoop':
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance.owner_pid != os.getpid():
+                cls._instance = WorkerEventLoop()
+            return cls._instance
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """Schedule a coroutine on this loop (from any other thread)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Run a coroutine on this loop and wait for its result (from any other thread)"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # timeout, or interrupted (e.g. celery's soft time limit) - do not leave the coroutine running
+            future.cancel()
+            raise
+
+    async def run_in_pool(self, func: Callable[[], T], timeout: float) -> T:
+        """
+        Run a blocking function in the thread pool, with the current context (log capture).
+        Threads can't be killed: if the timeout hits, the thread keeps running, and the process restarts if too many threads are stuck.
+        :raises CheckerTimeout:
+        """
+        future = self.loop.run_in_executor(self.pool, functools.partial(contextvars.copy_context().run, func))
+        done, _ = await asyncio.wait({future}, timeout=timeout)
+        if not done:
+            self.stuck_threads += 1
+            future.add_done_callback(self._thread_unstuck)
+            if self.stuck_threads > config.RUNNER.concurrent.threads // 2:
+                set_process_needs_restart()
+            raise CheckerTimeout()
+        return future.result()
+
+    def _thread_unstuck(self, _: Any) -> None:
+        self.stuck_threads -= 1
+
+    def get_http_session(self, base_url: str, limit_per_host: int, timeout: 'ClientTimeout') -> 'ClientSession':
+        """
+        The shared session for a base URL - connections are kept alive and reused by all checks of this process.
+        Must be called from a coroutine running on this loop. Do not close the session.
+        :param limit_per_host: max. number of parallel connections
+        """
+        if asyncio.get_running_loop() is not self.loop:
+            raise RuntimeError('Shared HTTP sessions can only be used on the worker event loop')
+        session = self._http_sessions.get(base_url)
+        if session is None or session.closed:
+            from aiohttp import ClientSession, TCPConnector
+            session = ClientSession(connector=TCPConnector(limit=0, limit_per_host=limit_per_host), timeout=timeout)
+            self._http_sessions[base_url] = session
+        return session
+
+    async def _close_http_sessions(self) -> None:
+        sessions, self._http_sessions = list(self._http_sessions.values()), {}
+        for session in sessions:
+            await session.close()
+
+    def shutdown(self) -> None:
+        if self._http_sessions:
+            try:
+                self.run(self._close_http_sessions(), 5)
+            except Exception:
+                traceback.print_exc()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def shutdown_current(cls) -> None:
+        """Shutdown the loop of this process (if started)"""
+        with cls._instance_lock:
+            instance, cls._instance = cls._instance, None
+        if instance is not None and instance.owner_pid == os.getpid():
+            instance.shutdown()
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_event_loop(**kwargs: Any) -> None:
+    WorkerEventLoop.shutdown_current()
+
+
+atexit.register(WorkerEventLoop.shutdown_current)
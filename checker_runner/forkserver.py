@@ -0,0 +1,207 @@
+"""
+Forkserver ("zygote") for checker scripts in subprocess mode.
+
+Every worker process starts its own zygote on demand. The zygote imports gamelib, pwntools etc. once,
+imports the checker module of each service (using PackageLoader) and then forks an isolated child per check.
+The child gets the same treatment as a fresh subprocess: resource limits, own process group (killed on timeout),
+stdout/stderr captured, result reported using the SEPARATOR protocol of the saarctf runner.
+
+Protocol between worker and zygote: one JSON object per line over a socketpair.
+- Request:  {"package", "script", "service_id", "team_id", "tick", "timeout"}
+- Response: {"exitcode": int | None, "timeout": bool, "output": str}
+"""
+
+import json
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from typing import Any, ClassVar, BinaryIO
+
+
+class ForkServer:
+    """
+    Worker side: handle to the zygote of this process
+    """
+    _instance: ClassVar['ForkServer | None'] = None
+
+    def __init__(self) -> None:
+        self.owner_pid = os.getpid()
+        sock, zygote_sock = socket.socketpair()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'checker_runner.forkserver', str(zygote_sock.fileno())],
+            pass_fds=[zygote_sock.fileno()],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        zygote_sock.close()
+        self.sock = sock
+        self.file: BinaryIO = sock.makefile('rwb')  # type: ignore[assignment]
+
+    @classmethod
+    def get(cls) -> 'ForkServer':
+        """
+        :return: the zygote of this process, (re)started if necessary
+        """
+        if cls._instance is None or cls._instance.owner_pid != os.getpid() or cls._instance.process.poll() is not None:
+            cls._instance = ForkServer()
+        return cls._instance
+
+    @classmethod
+    def reset(cls) -> None:
+        """Kill the current zygote (if any), the next check will start a new one"""
+        if cls._instance is not None and cls._instance.owner_pid == os.getpid():
+            cls._instance.close()
+        cls._instance = None
+
+    def run(self, package: str, script: str, service_id: int, team_id: int, tick: int, timeout: int) -> dict[str, Any]:
+        """
+        Run a checker script in a forked child of the zygote.
+        :param timeout: in seconds, the child is killed afterwards
+        :return: the response (see module docs)
+        """
+        request = {'package': package, 'script': script, 'service_id': service_id, 'team_id': team_id, 'tick': tick, 'timeout': timeout}
+        try:
+            # the zygote enforces the timeout, we only guard against a stuck zygote
+            self.sock.settimeout(timeout + 30)
+            self.file.write(json.dumps(request).encode() + b'\n')
+            self.file.flush()
+            line = self.file.readline()
+            if not line:
+                raise ConnectionError('Forkserver terminated')
+            return json.loads(line)
+        except BaseException:
+            # interrupted (for example by celery's soft time limit): the response might still arrive,
+            # it must never be read as the result of the next check
+            self.close()
+            if ForkServer._instance is self:
+                ForkServer._instance = None
+            raise
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        finally:
+            self.process.kill()
+            self.process.wait()
+
+
+def _read_output(fd: int, pid: int, timeout: float) -> tuple[bytes, bool]:
+    """
+    Collect the output of a child until it closes its end of the pipe. Kill it on timeout.
+    :return: (output, timed out)
+    """
+    output = bytearray()
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if timed_out:
+                break  # killed, but the pipe is still open (leaked to some other process)
+            timed_out = True
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                os.kill(pid, signal.SIGKILL)
+            deadline = time.monotonic() + 1
+            continue
+        readable, _, _ = select.select([fd], [], [], remaining)
+        if readable:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            output += chunk
+    os.close(fd)
+    return bytes(output), timed_out
+
+
+def _run_child(runner: Any, team_id: int, tick: int, output_fd: int) -> None:
+    """
+    Executed in the forked child. Never returns.
+    """
+    exitcode = 1
+    try:
+        os.setsid()
+        os.dup2(output_fd, 1)
+        os.dup2(output_fd, 2)
+        os.close(output_fd)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        # do not share random state or database connections with the zygote (or other checks)
+        import random
+        random.seed()
+        from controlserver.models import Database
+        Database.db_engine.dispose(close=False)
+        from checker_runner.runner import set_limits
+        set_limits()
+
+        print("(forkserver child)")
+        result = runner.execute_checker(team_id, tick)
+        runner.print_subprocess_result(result)
+        exitcode = 0
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exitcode)
+
+
+def _handle_request(request: dict[str, Any], sock: socket.socket) -> dict[str, Any]:
+    from checker_runner.runners.saarctf import SaarctfServiceRunner
+
+    runner = SaarctfServiceRunner(request['service_id'], request['package'], request['script'], None)
+    try:
+        # import in the zygote, so that all future children inherit the checker module
+        runner.get_checker_class()
+        runner.get_service_config(request['service_id'])
+    except Exception:
+        return {'exitcode': None, 'timeout': False, 'output': traceback.format_exc()}
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        sock.close()
+        _run_child(runner, request['team_id'], request['tick'], write_fd)
+    os.close(write_fd)
+    output, timed_out = _read_output(read_fd, pid, request['timeout'])
+    _, status = os.waitpid(pid, 0)
+    return {'exitcode': os.waitstatus_to_exitcode(status), 'timeout': timed_out, 'output': output.decode('utf-8', errors='replace')}
+
+
+def serve(fd: int) -> None:
+    """
+    Zygote main loop: handle requests until the worker closes the connection.
+    """
+    from saarctf_commons.config import load_default_config
+    from saarctf_commons.redis import NamedRedisConnection
+    from controlserver.models import init_database
+
+    load_default_config()
+    NamedRedisConnection.set_clientname("worker-forkserver")
+    init_database()
+    # preload everything that is common to all checker scripts
+    import checker_runner.runner
+    import checker_runner.runners.saarctf
+
+    sock = socket.socket(fileno=fd)
+    with sock.makefile('rwb') as f:
+        for line in f:
+            try:
+                response = _handle_request(json.loads(line), sock)
+            except Exception:
+                response = {'exitcode': None, 'timeout': False, 'output': traceback.format_exc()}
+            f.write(json.dumps(response).encode() + b'\n')
+            f.flush()
+
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]))
@@ -3,15 +3,22 @@ DB Filesystem loader.
 
 Loads file/folder structures from the database, replicates them on disk, and loads python modules from these folders.
 Details about the DB filesystem structure are in controlserver/db_filesystem.py
+
+Workers warm up when they start and when packages change (config.RUNNER.warmup): packages of enabled services are loaded,
+compiled to bytecode and their checker modules imported, so that no check has to pay for this within its timeout.
 """
 
+import compileall
 import importlib.util
 import sys
+import time
+import traceback
 from types import ModuleType
 
 from filelock import FileLock
 
 from controlserver.db_filesystem import DBFilesystem
+from controlserver.models import Service, db_session_2
 from saarctf_commons.config import config
 
 sys.path.append(str(config.CHECKER_PACKAGES_PATH))
@@ -82,3 +89,34 @@ class PackageLoader:
         # Write cache
         cls.cached_modules[modulename] = module
         return module
+
+    @classmethod
+    def warmup(cls, packages: list[str] | None = None) -> dict[str, float]:
+        """
+        Load packages, compile them and import the checker modules of the services using them.
+        :param packages: (default: the packages of all enabled services)
+        :return: {package: seconds}
+        """
+        with db_session_2() as session:
+            query = session.query(Service.package, Service.checker_script).filter(Service.package != None)
+            if packages is None:
+                query = query.filter(Service.checker_enabled == True)
+            scripts: dict[str, set[str]] = {}
+            for package, script in query:
+                scripts.setdefault(package, set()).add(script)
+
+        timings: dict[str, float] = {}
+        for package in packages if packages is not None else list(scripts):
+            start = time.time()
+            try:
+                cls.ensure_package_exists(package)
+                compileall.compile_dir(str(config.CHECKER_PACKAGES_PATH / package), quiet=1)
+                for script in scripts.get(package, ()):
+                    filename = script.split(":")[0] if script else ""
+                    if filename.endswith(".py"):
+                        cls.load_module_from_package(package, filename)
+            except Exception:
+                traceback.print_exc()
+            timings[package] = time.time() - start
+            print("Package {} warmed up in {:.3f} sec".format(package, timings[package]))
+        return timings
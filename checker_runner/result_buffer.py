@@ -0,0 +1,144 @@
+"""
+Per-process buffer for checker results, written as batches (multi-row INSERT ... ON CONFLICT, one commit per batch).
+
+A batch is written when:
+- it reaches batch_size results, or
+- all checks currently running in this process are waiting for their result to be written, or
+- its oldest result has waited for max_delay seconds.
+Saving blocks until the result is committed, so a task never finishes (and is never acknowledged, see acks_late) before
+its result is durable. In prefork workers (one check per process) every result is written immediately.
+"""
+
+import atexit
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, ClassVar
+
+from celery.signals import task_prerun, task_postrun, worker_process_shutdown
+from sqlalchemy import func
+
+from controlserver.models import CheckerResult, CheckerResultOutput, db_session_2
+from saarctf_commons.config import config
+from saarctf_commons.db_utils import retry_on_sql_error
+
+CHECKER_TASKS = {
+    'checker_runner.runner.run_checkerscript',
+    'checker_runner.runner.run_checkerscript_external',
+    'checker_runner.runner.run_checkerscript_concurrent',
+    'checker_runner.runner.run_checkerscript_batch',
+}
+# one task checks many teams - every team counts as a running check, the task finishes each team once its result is stored
+BATCH_TASKS = {'checker_runner.runner.run_checkerscript_batch'}
+
+
+@dataclass
+class _PendingResult:
+    row: dict[str, Any]
+    output_row: dict[str, Any]
+    done: threading.Event = field(default_factory=threading.Event)
+    error: BaseException | None = None
+
+
+class CheckerResultBuffer:
+    _instance: ClassVar['CheckerResultBuffer | None'] = None
+
+    def __init__(self, batch_size: int, max_delay: float) -> None:
+        self.owner_pid = os.getpid()
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: list[_PendingResult] = []
+        self._running = 0  # checker tasks running in this process
+
+    @classmethod
+    def get(cls) -> 'CheckerResultBuffer':
+        if cls._instance is None or cls._instance.owner_pid != os.getpid():
+            cls._instance = CheckerResultBuffer(config.RUNNER.result_buffer.batch_size, config.RUNNER.result_buffer.max_delay)
+        return cls._instance
+
+    def task_started(self, checks: int = 1) -> None:
+        with self._lock:
+            self._running += checks
+
+    def task_finished(self, checks: int = 1) -> None:
+        with self._lock:
+            self._running = max(0, self._running - checks)
+
+    def save(self, row: dict[str, Any], output_row: dict[str, Any]) -> None:
+        """
+        Add a result to the next batch, and wait until this batch has been committed.
+        :param row: CheckerResult.props_dict()
+        :param output_row: CheckerResult.output_props_dict()
+        :raises: the database error, if the batch could not be written
+        """
+        pending = _PendingResult(row, output_row)
+        with self._lock:
+            self._pending.append(pending)
+            # no need to wait if no other check of this process could join this batch
+            flush_now = len(self._pending) >= self.batch_size or len(self._pending) >= self._running
+        if flush_now or not pending.done.wait(self.max_delay):
+            self.flush()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+
+    def flush(self) -> None:
+        """
+        Write all pending results
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            error: BaseException | None = None
+            try:
+                self._write([pending.row for pending in batch], [pending.output_row for pending in batch])
+            except BaseException as e:
+                error = e
+            for pending in batch:
+                pending.error = error
+                pending.done.set()
+
+    @staticmethod
+    @retry_on_sql_error(attempts=3)
+    def _write(rows: list[dict[str, Any]], output_rows: list[dict[str, Any]]) -> None:
+        # only one row per check is allowed in a statement (a retry might finish while its first attempt is still pending)
+        # "finished" is the database time of the commit, like unbuffered results (worker clocks might differ)
+        unique_rows = {(row['tick'], row['team_id'], row['service_id']): {**row, 'finished': func.now()} for row in rows}
+        unique_output_rows = {(row['tick'], row['team_id'], row['service_id']): row for row in output_rows}
+        with db_session_2() as session:
+            session.execute(CheckerResult.upsert(CheckerResult(finished=func.now())).values(list(unique_rows.values())))
+            session.execute(CheckerResultOutput.upsert().values(list(unique_output_rows.values())))
+            session.commit()
+
+
+@task_prerun.connect
+def _checker_task_started(sender: Any = None, **kwargs: Any) -> None:
+    if sender is not None and sender.name in CHECKER_TASKS:
+        if sender.name in BATCH_TASKS:
+            args: list[Any] = list(kwargs.get('args') or [])
+            CheckerResultBuffer.get().task_started(len(args[4]) if len(args) > 4 else 1)
+        else:
+            CheckerResultBuffer.get().task_started()
+
+
+@task_postrun.connect
+def _checker_task_finished(sender: Any = None, **kwargs: Any) -> None:
+    if sender is not None and sender.name in CHECKER_TASKS and sender.name not in BATCH_TASKS:
+        CheckerResultBuffer.get().task_finished()
+
+
+@worker_process_shutdown.connect
+def _flush_on_shutdown(**kwargs: Any) -> None:
+    flush_checker_results()
+
+
+def flush_checker_results() -> None:
+    if CheckerResultBuffer._instance is not None and CheckerResultBuffer._instance.owner_pid == os.getpid():
+        CheckerResultBuffer._instance.flush()
+
+
+atexit.register(flush_checker_results)
@@ -2,27 +2,39 @@
 Celery configuration (message queues) and code to run the checker scripts.
 """
 
+import json
 import os
 import resource
+import signal
+import socket
 import subprocess
 import sys
 import time
+import traceback
 from logging import Handler, NOTSET, getLogger, LogRecord
 from typing import List, Any
 
 import sqlalchemy
 from celery import Celery, Task
 from celery.local import PromiseProxy
-from celery.signals import celeryd_after_setup
+from celery.signals import celeryd_after_setup, worker_process_init, worker_process_shutdown
 from kombu.common import Broadcast
 from sqlalchemy import func
 
-from checker_runner.checker_execution import process_needs_restart, set_process_needs_restart, CheckerRunOutput
+from checker_runner.checker_execution import process_needs_restart, set_process_needs_restart, CheckerRunOutput, RetryPolicy
+from checker_runner.result_buffer import CheckerResultBuffer, flush_checker_results
 from checker_runner.runners.factory import CheckerRunnerFactory
-from controlserver.models import CheckerResult, db_session, init_database, db_session_2
+from controlserver.models import CheckerResult, CheckerResultOutput, db_session, init_database, db_session_2
 from saarctf_commons.config import config, load_default_config
 from saarctf_commons.db_utils import retry_on_sql_error
+from saarctf_commons.prometheus_utils import CHECKER_SECONDS, setup_prometheus, process_exited
 from saarctf_commons.redis import NamedRedisConnection, get_redis_connection
+from saarctf_commons.tracing import span, current_context
+
+# checker subprocesses are killed this many seconds before celery's soft time limit (time to collect their output)
+SUBPROCESS_TIMEOUT_MARGIN = 3
+# message priority of tasks without explicit priority (0-9)
+DEFAULT_TASK_PRIORITY = 4
 
 
 @celeryd_after_setup.connect
@@ -38,6 +50,42 @@ def worker_init(sender: Any, instance: Any, **kwargs: Any) -> None:
     # open redis connection so that we see this process in the client list
     get_redis_connection().get("components:worker")
     NamedRedisConnection.set_clientname("worker", True)
+    setup_prometheus("worker")
+    if config.RUNNER.warmup:
+        # before the pool processes are forked, they inherit the imported checker modules
+        warmup_packages()
+
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs: Any) -> None:
+    # do not share the database connections of the main process (warmup)
+    from controlserver.models import Database
+    if hasattr(Database, 'db_engine'):
+        Database.db_engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(pid: int | None = None, **kwargs: Any) -> None:
+    process_exited(pid or os.getpid())
+
+
+def warmup_packages(packages: List[str] | None = None) -> None:
+    """
+    Load, compile and import checker packages (all enabled services by default), and report the time it took.
+    """
+    from checker_runner.package_loader import PackageLoader
+    from controlserver.logger import log
+
+    start = time.time()
+    try:
+        timings = PackageLoader.warmup(packages)
+    except Exception:
+        traceback.print_exc()
+        return
+    if timings:
+        slowest = max(timings, key=lambda package: timings[package])
+        log('worker', f'Worker {socket.gethostname()} warmed up {len(timings)} packages in {time.time() - start:.1f} sec',
+            f'Slowest: {slowest} ({timings[slowest]:.1f} sec)')
 
 
 class OutputHandler(Handler):
@@ -62,23 +110,50 @@ def set_limits() -> None:
     pass
 
 
-@retry_on_sql_error(attempts=3)
 def save_checker_result(tick: int, service_id: int, team_id: int, celery_id: str,
                         result: CheckerRunOutput, runtime: float) -> None:
+    """
+    Store a result in the database, batched with other results of this process if enabled. Returns once the result is committed.
+    """
+    CHECKER_SECONDS.labels(service_id, result.status).observe(runtime)
     dbresult = CheckerResult(tick=tick, service_id=service_id, team_id=team_id, celery_id=celery_id)
     dbresult.time = runtime  # type: ignore[assignment]
     dbresult.status = result.status
     dbresult.message = result.message
     dbresult.output = result.output
     dbresult.data = result.data
-    dbresult.finished = func.now()
+    with span('save_result', team_id=team_id, status=result.status):
+        if config.RUNNER.result_buffer.enabled:
+            CheckerResultBuffer.get().save(dbresult.props_dict(), dbresult.output_props_dict())
+        else:
+            dbresult.finished = func.now()
+            _save_checker_result_directly(dbresult)
 
+
+@retry_on_sql_error(attempts=3)
+def _save_checker_result_directly(dbresult: CheckerResult) -> None:
     with db_session_2() as session:
         session.execute(CheckerResult.upsert(dbresult).values(dbresult.props_dict()))
+        session.execute(CheckerResultOutput.upsert().values(dbresult.output_props_dict()))
         session.commit()
 
 
-def run_checkerscript(self: Task, runner_spec: str, package: str, script: str, service_id: int, team_id: int, tick: int, cfg: dict | None) -> str:
+def report_retry_candidate(tick: int, service_id: int, team_id: int, result: CheckerRunOutput, runtime: float,
+                           cfg: dict | None, attempt: int) -> None:
+    """
+    Report a transient failure to the dispatcher, which might re-run the check later in this tick.
+    Nothing is reported if the service's retry policy does not allow another attempt.
+    """
+    if tick <= 0 or not RetryPolicy.for_service(cfg).allows(result.status, attempt):
+        return
+    request = {'team_id': team_id, 'service_id': service_id, 'status': result.status, 'runtime': runtime, 'attempt': attempt}
+    with get_redis_connection() as redis:
+        redis.rpush(f'dispatcher:retry_requests:{tick}', json.dumps(request))
+        redis.expire(f'dispatcher:retry_requests:{tick}', 3600)
+
+
+def run_checkerscript(self: Task, runner_spec: str, package: str, script: str, service_id: int, team_id: int, tick: int, cfg: dict | None,
+                      attempt: int = 0) -> str:
     """
     Run a given checker script against a single team.
     :param self: (celery task instance)
@@ -89,6 +164,7 @@ def run_checkerscript(self: Task, runner_spec: str, package: str, script: str, s
     :param team_id:
     :param tick:
     :param cfg:
+    :param attempt: 0 for the regular run, >0 for retries (see RetryConfig)
     :return: The (db) status of this execution
     """
     set_limits()
@@ -119,24 +195,38 @@ def run_checkerscript(self: Task, runner_spec: str, package: str, script: str, s
         result.output = checker_output
 
     getLogger().removeHandler(output)
+    if attempt > 0:
+        result.data['attempt'] = attempt
 
     # store result in database
+    runtime = time.time() - start_time
     try:
-        save_checker_result(tick, service_id, team_id, self.request.id, result, time.time() - start_time)
+        save_checker_result(tick, service_id, team_id, self.request.id, result, runtime)
     except sqlalchemy.exc.InvalidRequestError as e:
         # This session is in 'prepared' state; no further SQL can be emitted within this transaction.
         if "no further SQL can be emitted" in str(e):
             set_process_needs_restart()
         else:
             raise e
+    report_retry_candidate(tick, service_id, team_id, result, runtime, cfg, attempt)
     if process_needs_restart():
+        flush_checker_results()
         print("RESTART")
         sys.exit(0)
     return result.status
 
 
+def subprocess_timeout(task: Task) -> int:
+    """
+    :return: the timeout for checker subprocesses, so that they are killed (and their output collected) before celery's soft time limit
+    """
+    hard_limit, soft_limit = task.request.timelimit
+    soft_limit = soft_limit or (hard_limit - 5 if hard_limit else 60)
+    return max(1, int(soft_limit - SUBPROCESS_TIMEOUT_MARGIN))
+
+
 def run_checkerscript_external(self: Task, runner_spec: str, package: str, script: str, service_id: int, team_id: int, tick: int,
-                               cfg: dict | None) -> str:
+                               cfg: dict | None, attempt: int = 0) -> str:
     """
     Run a given checker script against a single team - in a seperate process, decoupled from the celery worker.
     In case the checker script crashes the process, nobody is harmed.
@@ -148,18 +238,131 @@ def run_checkerscript_external(self: Task, runner_spec: str, package: str, scrip
     :param team_id:
     :param tick:
     :param cfg:
+    :param attempt: 0 for the regular run, >0 for retries (see RetryConfig)
     :return: The (db) status of this execution
     """
     set_limits()
 
     start_time = time.time()
     runner = CheckerRunnerFactory.build(runner_spec, service_id, package, script, cfg)
-    result = runner.execute_checker_subprocess(team_id, tick, self.request.timelimit[0] - 5)
-    save_checker_result(tick, service_id, team_id, self.request.id, result, time.time() - start_time)
+    result = runner.execute_checker_subprocess(team_id, tick, subprocess_timeout(self))
+    if attempt > 0:
+        result.data['attempt'] = attempt
+    runtime = time.time() - start_time
+    save_checker_result(tick, service_id, team_id, self.request.id, result, runtime)
+    report_retry_candidate(tick, service_id, team_id, result, runtime, cfg, attempt)
+
+    return result.status
+
+
+def run_checkerscript_concurrent(self: Task, runner_spec: str, package: str, script: str, service_id: int, team_id: int, tick: int,
+                                 cfg: dict | None, attempt: int = 0) -> str:
+    """
+    Run a given checker script against a single team - concurrently with other checks of this worker process.
+    Async checkers run as coroutines in the worker's event loop, sync checkers in a bounded thread pool (see concurrent_execution.py).
+    Meant for workers with "--pool threads" (celery's time limits are not enforced there, we use our own timeout).
+    :param self: (celery task instance)
+    :param runner_spec: which runner to use
+    :param package:
+    :param script: Format: "<filename rel to package root>:<class name>"
+    :param service_id:
+    :param team_id:
+    :param tick:
+    :param cfg:
+    :param attempt: 0 for the regular run, >0 for retries (see RetryConfig)
+    :return: The (db) status of this execution
+    """
+    from checker_runner.concurrent_execution import WorkerEventLoop, capture_output
+
+    start_time = time.time()
+    timeout = self.request.timelimit[1] or self.request.timelimit[0] or 60
+    runner = CheckerRunnerFactory.build(runner_spec, service_id, package, script, cfg)
 
+    async def execute() -> tuple[CheckerRunOutput, list[str]]:
+        with capture_output() as output:
+            return await runner.execute_checker_concurrent(team_id, tick, timeout), output
+
+    result, output = WorkerEventLoop.get().run(execute(), timeout + 30)
+    if not result.output:
+        result.output = "\n".join(output).replace("\x00", "<0x00>")
+    if attempt > 0:
+        result.data['attempt'] = attempt
+
+    runtime = time.time() - start_time
+    save_checker_result(tick, service_id, team_id, self.request.id, result, runtime)
+    report_retry_candidate(tick, service_id, team_id, result, runtime, cfg, attempt)
+    if process_needs_restart():
+        # other checks are still running in this process - warm shutdown, the worker gets restarted from outside
+        flush_checker_results()
+        print("RESTART")
+        os.kill(os.getpid(), signal.SIGTERM)
     return result.status
 
 
+def run_checkerscript_batch(self: Task, runner_spec: str, package: str, script: str, service_id: int, team_ids: list[int], tick: int,
+                            cfg: dict | None) -> dict[str, str]:
+    """
+    Run a given (async) checker script against many teams at once - one coroutine per team in this process' event loop.
+    Used for services with runner_config["batch"] (Eno services that spread their requests over the whole tick):
+    one task per shard of teams occupies a worker slot, instead of one task per team.
+    Each team's result is stored as soon as it is finished.
+    :param self: (celery task instance)
+    :param runner_spec: which runner to use
+    :param package:
+    :param script: Format: "<filename rel to package root>:<class name>"
+    :param service_id:
+    :param team_ids:
+    :param tick:
+    :param cfg:
+    :return: {team id: (db) status}
+    """
+    import asyncio
+    from checker_runner.concurrent_execution import WorkerEventLoop, capture_output
+
+    set_limits()
+    timeout = self.request.timelimit[1] or self.request.timelimit[0] or 60
+    task_span = current_context()  # the event loop runs in another thread
+
+    async def execute(team_id: int) -> str:
+        start_time = time.time()
+        try:
+            try:
+                # runners keep per-check state, one instance per team
+                runner = CheckerRunnerFactory.build(runner_spec, service_id, package, script, cfg)
+                with span('check', tick, task_span, team_id=team_id) as check_span:
+                    with capture_output() as output:
+                        result = await runner.execute_checker_concurrent(team_id, tick, timeout)
+                    check_span.attributes['status'] = result.status
+                    if not result.output:
+                        result.output = "\n".join(output).replace("\x00", "<0x00>")
+            except Exception:
+                # one broken check must not take down the checks of the other teams
+                traceback.print_exc()
+                result = CheckerRunOutput("CRASHED", output=traceback.format_exc())
+            runtime = time.time() - start_time
+            await asyncio.to_thread(save_checker_result, tick, service_id, team_id, self.request.id, result, runtime)
+        finally:
+            # this team no longer waits for the result buffer (see BATCH_TASKS)
+            CheckerResultBuffer.get().task_finished()
+        await asyncio.to_thread(report_retry_candidate, tick, service_id, team_id, result, runtime, cfg, 0)
+        return result.status
+
+    async def execute_all() -> list[str | BaseException]:
+        return await asyncio.gather(*(execute(team_id) for team_id in team_ids), return_exceptions=True)
+
+    statuses = WorkerEventLoop.get().run(execute_all(), timeout + 30)
+    for team_id, status in zip(team_ids, statuses):
+        if isinstance(status, BaseException):
+            # the result could not be stored
+            print(f'Team {team_id}:', file=sys.stderr)
+            traceback.print_exception(status)
+    if process_needs_restart():
+        flush_checker_results()
+        print("RESTART")
+        sys.exit(0)
+    return {str(team_id): status if isinstance(status, str) else 'CRASHED' for team_id, status in zip(team_ids, statuses)}
+
+
 def preload_packages(packages: List[str] | None = None) -> bool:
     """
     Load a list of packages, so that they are present on the disk when they're required.
@@ -169,9 +372,12 @@ def preload_packages(packages: List[str] | None = None) -> bool:
     from checker_runner.package_loader import PackageLoader
 
     if packages:
-        for package in packages:
-            print("Preloading {} ...".format(package))
-            PackageLoader.ensure_package_exists(package)
+        if config.RUNNER.warmup:
+            warmup_packages(packages)
+        else:
+            for package in packages:
+                print("Preloading {} ...".format(package))
+                PackageLoader.ensure_package_exists(package)
     print("Done.")
     return True
 
@@ -202,6 +408,8 @@ class CeleryWorker:
         self.app: Celery
         self.run_checkerscript: PromiseProxy
         self.run_checkerscript_external: PromiseProxy
+        self.run_checkerscript_concurrent: PromiseProxy
+        self.run_checkerscript_batch: PromiseProxy
         self.preload_packages: PromiseProxy
         self.run_command: PromiseProxy
 
@@ -217,15 +425,30 @@ class CeleryWorker:
         self.app.conf.result_expires = None
         self.app.conf.worker_pool_restarts = True
         self.app.conf.task_queues = (Broadcast(name="broadcast"),)
+        # priority queues (x-max-priority), so that retries (RetryConfig.priority) overtake the waiting checks of a tick
+        self.app.conf.task_queue_max_priority = 9
+        self.app.conf.task_default_priority = self.broker_priority(DEFAULT_TASK_PRIORITY)
+        self.app.conf.broker_transport_options = {'priority_steps': list(range(10))}
         self.app.conf.result_backend_thread_safe = threadsafe
 
-        # register tasks
-        self.run_checkerscript = self.app.task(bind=True)(run_checkerscript)
-        self.run_checkerscript_external = self.app.task(bind=True)(run_checkerscript_external)
+        # register tasks (buffered results: acknowledge checker tasks only after their result has been written)
+        acks_late = config.RUNNER.result_buffer.enabled
+        self.run_checkerscript = self.app.task(bind=True, acks_late=acks_late)(run_checkerscript)
+        self.run_checkerscript_external = self.app.task(bind=True, acks_late=acks_late)(run_checkerscript_external)
+        self.run_checkerscript_concurrent = self.app.task(bind=True, acks_late=acks_late)(run_checkerscript_concurrent)
+        self.run_checkerscript_batch = self.app.task(bind=True, acks_late=acks_late)(run_checkerscript_batch)
         self.preload_packages = self.app.task(queue="broadcast", options=dict(queue="broadcast"))(preload_packages)
         self.run_command = self.app.task(queue='broadcast', options=dict(queue='broadcast'), soft_time_limit=100)(
             run_command)
 
+    @staticmethod
+    def broker_priority(priority: int) -> int:
+        """
+        :param priority: 0-9, higher values are consumed first (like RabbitMQ)
+        :return: the message priority for the configured broker (the redis transport consumes lower values first)
+        """
+        return priority if config.RABBITMQ else 9 - priority
+
 
 celery_worker = CeleryWorker()
 
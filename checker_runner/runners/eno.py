@@ -2,11 +2,12 @@ import asyncio
 import base64
 import hashlib
 import hmac
-import random
+import os
 import struct
+import threading
+import time
 import traceback
 from abc import ABC, abstractmethod
-from enum import Enum
 from functools import lru_cache
 from typing import Any, ClassVar
 
@@ -19,48 +20,68 @@ from enochecker_core import (
     CheckerTaskResult,
 )
 
-from checker_runner.checker_execution import CheckerRunner, CheckerRunOutput
+from checker_runner.checker_execution import CheckerRunner, CheckerRunOutput, PhaseTimer
+from checker_runner.runners.eno_timeslots import TIME_BUFFER, plan_timeslots
 from gamelib import MAC_LENGTH, get_flag_regex
 from saarctf_commons.config import config
+from saarctf_commons.custom_flag_ids import get_custom_flag_id, set_custom_flag_id
 from saarctf_commons.redis import get_redis_connection
 
 
-class SlotType(Enum):
-    EARLY = 1
-    UNCONSTRAINED = 2
-    LATE = 3
+class TaskIdAllocator:
+    """
+    Eno task IDs, unique over all workers and restarts without a redis roundtrip per ID:
+    blocks of IDs are reserved with INCRBY and handed out locally.
+    """
 
+    KEY = "runner:eno:task_id"
 
-class TaggedIntervalEntry:
-    def __init__(self, entry_type: SlotType, offset: float, idx: int):
-        self.entry_type = entry_type
-        self.offset = offset
-        self.idx = idx
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._next = 0
+        self._end = 0  # exclusive
 
-    def __repr__(self) -> str:
-        return f"TaggedIntervalEntry {{.entry_type = {self.entry_type}, .offset = {self.offset:6.3f}, .idx = {self.idx}}}"
+    def allocate(self) -> int:
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked worker process - the parent might still use this block
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                block_size = config.RUNNER.eno.task_id_block_size
+                with get_redis_connection() as conn:
+                    self._end = conn.incrby(self.KEY, block_size) + 1
+                self._next = self._end - block_size
+            self._next += 1
+            return self._next - 1
 
 
 class AsyncCheckerRunner(CheckerRunner, ABC):
     def execute_checker(self, team_id: int, tick: int) -> CheckerRunOutput:
-        return asyncio.run(self.execute_checker_async(team_id, tick))
-        # try:
-        #     loop = asyncio.get_running_loop()
-        #     return asyncio.run_coroutine_threadsafe(
-        #         self.execute_checker_async(team_id, tick), loop
-        #     ).result(60)
+        # the process-wide event loop keeps its HTTP connections alive between checks
+        from checker_runner.concurrent_execution import WorkerEventLoop
 
-        # except RuntimeError:
-        #     loop = asyncio.new_event_loop()
-        #     return loop.run_until_complete(self.execute_checker_async(team_id, tick))
+        return WorkerEventLoop.get().run(self.execute_checker_async(team_id, tick))
 
     @abstractmethod
     async def execute_checker_async(self, team_id: int, tick: int) -> CheckerRunOutput:
         raise NotImplementedError
 
+    async def execute_checker_concurrent(self, team_id: int, tick: int, timeout: float) -> CheckerRunOutput:
+        from checker_runner.concurrent_execution import run_with_timeout, CheckerTimeout
+
+        try:
+            return await run_with_timeout(self.execute_checker_async(team_id, tick), timeout)
+        except CheckerTimeout:
+            return CheckerRunOutput("TIMEOUT", message="Timeout, service too slow")
+        except Exception:
+            traceback.print_exc()
+            return CheckerRunOutput("CRASHED")
+
 
 class EnoCheckerRunner(AsyncCheckerRunner):
-    TIME_BUFFER = 5
+    TIME_BUFFER = TIME_BUFFER
 
     def __init__(
         self, service_id: int, package: str, script: str, cfg: dict | None
@@ -72,6 +93,7 @@ class EnoCheckerRunner(AsyncCheckerRunner):
         self.messages: dict[str, str] = {}
         self.recovery_messages: dict[str, str] = {}
         self.status: str = "SUCCESS"  # TODO convert to enum in the future
+        self.timer = PhaseTimer()  # per checker method, the slowest request
 
     def reset(self) -> None:
         self.custom_results = {}
@@ -79,16 +101,14 @@ class EnoCheckerRunner(AsyncCheckerRunner):
         self.messages = {}
         self.recovery_messages = {}
         self.status = "SUCCESS"
+        self.timer = PhaseTimer()
 
     _service_info_cache: ClassVar[dict[str, CheckerInfoMessage]] = {}
 
     async def get_service_info(self) -> CheckerInfoMessage:
         if self.url in self._service_info_cache:
             return self._service_info_cache[self.url]
-        async with (
-            self._session() as session,
-            session.get(self.url + "/service") as response,
-        ):
+        async with self._session().get(self.url + "/service") as response:
             if response.status != 200:
                 raise Exception(
                     f"Info request {response.url} returned {response.status}"
@@ -106,10 +126,11 @@ class EnoCheckerRunner(AsyncCheckerRunner):
                 raise ValueError()
             return int(v.decode())
 
-    @staticmethod
-    def get_fresh_task_id() -> int:
-        with get_redis_connection() as conn:
-            return conn.incr("runner:eno:task_id", 1)
+    _task_ids: ClassVar[TaskIdAllocator] = TaskIdAllocator()
+
+    @classmethod
+    def get_fresh_task_id(cls) -> int:
+        return cls._task_ids.allocate()
 
     def get_flag(self, team_id: int, tick: int, payload: int = 0) -> str:
         data = struct.pack("<HHHH", tick & 0xFFFF, team_id, self.service_id, payload)
@@ -121,23 +142,26 @@ class EnoCheckerRunner(AsyncCheckerRunner):
 
     def set_flag_id(self, team_id: int, tick: int, index: int, value: str) -> None:
         with get_redis_connection() as redis_conn:
-            redis_conn.set(
-                f"custom_flag_ids:{self.service_id}:{tick}:{team_id}:{index}", value
-            )
+            set_custom_flag_id(redis_conn, self.service_id, tick, team_id, index, value)
 
     def get_flag_id(self, team_id: int, tick: int, index: int) -> str | None:
         with get_redis_connection() as redis_conn:
-            value = redis_conn.get(
-                f"custom_flag_ids:{self.service_id}:{tick}:{team_id}:{index}"
-            )
-            return value.decode() if value is not None else None
+            return get_custom_flag_id(redis_conn, self.service_id, tick, team_id, index)
 
     def _session(self) -> ClientSession:
-        return ClientSession(timeout=ClientTimeout(total=20))
+        """
+        :return: the keep-alive session of this process for this checker (do not close)
+        """
+        from checker_runner.concurrent_execution import WorkerEventLoop
+
+        return WorkerEventLoop.get().get_http_session(
+            self.url, config.RUNNER.eno.connections_per_host, ClientTimeout(total=20)
+        )
 
     async def _query(
         self, session: ClientSession, msg: CheckerTaskMessage
     ) -> CheckerResultMessage:
+        start = time.perf_counter()
         try:
             json_msg = msg.model_dump_json()
             async with session.post(
@@ -165,6 +189,9 @@ class EnoCheckerRunner(AsyncCheckerRunner):
             return CheckerResultMessage(
                 result=CheckerTaskResult.INTERNAL_ERROR, message=None
             )
+        finally:
+            # the checker runs remotely, we can't attribute CPU time
+            self.timer.record(CheckerMethod(msg.method).value, time.perf_counter() - start)
 
     def _task_chain_msg_write(self, messages: dict, key: str, msg: CheckerResultMessage):
         # We only show the first message returned from each task chain,
@@ -261,175 +288,6 @@ class EnoCheckerRunner(AsyncCheckerRunner):
 
         return msg
 
-    @staticmethod
-    def gen_timeslots_flat(
-        tick_length, checker_info, task_timeout_s
-    ) -> tuple[list[float], list[float], list[float]]:
-        total_tasks_count = (
-            2 + config.RUNNER.eno.check_past_ticks
-        ) * checker_info.flag_variants
-        total_tasks_count += (
-            2 * checker_info.noise_variants + checker_info.havoc_variants
-        )
-        constrained_task_count = (
-            checker_info.flag_variants + checker_info.noise_variants
-        )
-
-        last_possible_start_offset = (
-            tick_length - EnoCheckerRunner.TIME_BUFFER - task_timeout_s
-        )
-
-        task_start_interval = last_possible_start_offset / float(total_tasks_count)
-        # print(f"[DBG] task_start_interval: {task_start_interval}")
-        task_interval_start_offsets = [
-            task_start_interval * i for i in range(total_tasks_count)
-        ]
-
-        # print("[DBG]", task_interval_start_offsets)
-        # print("[DBG] Latest interval start (expected):", last_possible_start_offset - task_start_interval)
-        # print("[DBG] Latest interval start (actual):", task_interval_start_offsets[-1])
-
-        # Last task interval starts at last_possible_start_offset - task_start_interval
-        # To be able to safely choose a slot the last early task has to be chosen in a interval
-        # (task_timeout + task_start_interval) before
-        latest_early_task_start_offset = (
-            last_possible_start_offset - 2 * task_start_interval - task_timeout_s
-        )
-        earliest_late_task_start_offset = task_timeout_s + task_start_interval
-
-        early_task_slots = task_interval_start_offsets[:constrained_task_count]
-        late_task_slots = task_interval_start_offsets[-constrained_task_count:]
-        unconstrained_slots = task_interval_start_offsets[
-            constrained_task_count:-constrained_task_count
-        ]
-
-        assert latest_early_task_start_offset >= early_task_slots[-1]
-        assert earliest_late_task_start_offset <= late_task_slots[0]
-        assert (
-            early_task_slots[0] + task_timeout_s + task_start_interval
-            <= late_task_slots[0]
-        )
-
-        # print("[DBG] early_task_slots:", early_task_slots)
-        # print("[DBG] unconstrained_slots:", unconstrained_slots)
-        # print("[DBG] late_task_slots:", late_task_slots)
-
-        EARLY_TASKS_TAGGED = [
-            TaggedIntervalEntry(SlotType.EARLY, val, idx)
-            for idx, val in enumerate(early_task_slots)
-        ]
-        UNCONSTRAINED_TAGGED = [
-            TaggedIntervalEntry(SlotType.UNCONSTRAINED, val, idx)
-            for idx, val in enumerate(unconstrained_slots)
-        ]
-        LATE_TASKS_TAGGED = [
-            TaggedIntervalEntry(SlotType.LATE, val, idx)
-            for idx, val in enumerate(late_task_slots)
-        ]
-
-        tagged_task_slots = (
-            EARLY_TASKS_TAGGED + UNCONSTRAINED_TAGGED + LATE_TASKS_TAGGED
-        )
-        clearence_threshhold = task_timeout_s + task_start_interval
-
-        def _valid_clearance(early_task, late_task):
-            # print(early_task, late_task, late_task.offset - early_task.offset >= clearence_threshhold)
-            return late_task.offset - early_task.offset >= clearence_threshhold
-
-        def _try_perform_swap(
-            current: TaggedIntervalEntry, swap_target: TaggedIntervalEntry
-        ):
-            if swap_target.entry_type is SlotType.UNCONSTRAINED:
-                current.offset, swap_target.offset = swap_target.offset, current.offset
-
-            if swap_target.entry_type is SlotType.EARLY:
-                swap_target_late = LATE_TASKS_TAGGED[swap_target.idx]
-                if _valid_clearance(current, swap_target_late):
-                    current.offset, swap_target.offset = (
-                        swap_target.offset,
-                        current.offset,
-                    )
-
-            if swap_target.entry_type is SlotType.LATE:
-                swap_target_early = EARLY_TASKS_TAGGED[swap_target.idx]
-                if _valid_clearance(swap_target_early, current):
-                    current.offset, swap_target.offset = (
-                        swap_target.offset,
-                        current.offset,
-                    )
-
-        for _ in range(20):
-            for constrained_task_idx in range(constrained_task_count):
-                early_task = EARLY_TASKS_TAGGED[constrained_task_idx]
-                current_late_task = LATE_TASKS_TAGGED[early_task.idx]
-                swap_late_task = random.choice(tagged_task_slots)
-
-                # 1: Is this even a valid swap target?
-                if _valid_clearance(early_task, swap_late_task):
-                    _try_perform_swap(current_late_task, swap_late_task)
-
-                late_task = LATE_TASKS_TAGGED[-constrained_task_idx - 1]
-                current_early_task = EARLY_TASKS_TAGGED[late_task.idx]
-                swap_early_task = random.choice(tagged_task_slots)
-                if _valid_clearance(swap_early_task, late_task):
-                    _try_perform_swap(current_early_task, swap_early_task)
-
-        # print(f"[DBG] early_task_slots:", *EARLY_TASKS_TAGGED, sep="\n    ")
-        # print(f"[DBG] unconstrained_slots:", *UNCONSTRAINED_TAGGED, sep="\n    ")
-        # print(f"[DBG] late_task_slots:", *LATE_TASKS_TAGGED, sep="\n    ")
-
-        early_late_task_slots = [
-            (early.offset, late.offset)
-            for early, late in zip(EARLY_TASKS_TAGGED, LATE_TASKS_TAGGED)
-        ]
-        unconstrained_start_offsets = [
-            unconstrained.offset for unconstrained in UNCONSTRAINED_TAGGED
-        ]
-
-        # Shuffle the slots to start each task at a random
-        random.shuffle(early_late_task_slots)
-        random.shuffle(unconstrained_start_offsets)
-
-        early_task_slots = [x[0] for x in early_late_task_slots]
-        late_task_slots = [x[1] for x in early_late_task_slots]
-
-        # Add jitter within the interval to each task
-        early_task_delays = [
-            random.random() * task_start_interval + i for i in early_task_slots
-        ]
-        late_task_delays = [
-            random.random() * task_start_interval + i for i in late_task_slots
-        ]
-        unconstrained_task_delays = [
-            random.random() * task_start_interval + i
-            for i in unconstrained_start_offsets
-        ]
-
-        return (early_task_delays, late_task_delays, unconstrained_task_delays)
-
-    @staticmethod
-    def gen_timeslots_fallback(
-        tick_length, checker_info, task_timeout_s
-    ) -> tuple[list[float], list[float], list[float]]:
-        unconstrained_task_count = (
-            config.RUNNER.eno.check_past_ticks
-        ) * checker_info.flag_variants + checker_info.havoc_variants
-        constrained_task_count = (
-            checker_info.flag_variants + checker_info.noise_variants
-        )
-
-        early_task_delays = [
-            random.random() * 15 for _ in range(constrained_task_count)
-        ]
-        late_task_delays = [
-            30 + random.random() * 10 for _ in range(constrained_task_count)
-        ]
-        unconstrained_task_delays = [
-            random.random() * 40 for _ in range(unconstrained_task_count)
-        ]
-
-        return (early_task_delays, late_task_delays, unconstrained_task_delays)
-
     @staticmethod
     def gen_timeslots(
         tick, checker_info, task_timeout_s
@@ -439,14 +297,15 @@ class EnoCheckerRunner(AsyncCheckerRunner):
         except ValueError:
             tick_length = 60
 
-        try:
-            return EnoCheckerRunner.gen_timeslots_flat(
-                tick_length, checker_info, task_timeout_s
-            )
-        except AssertionError:
-            return EnoCheckerRunner.gen_timeslots_fallback(
-                tick_length, checker_info, task_timeout_s
-            )
+        plan = plan_timeslots(
+            tick_length,
+            checker_info.flag_variants,
+            checker_info.noise_variants,
+            checker_info.havoc_variants,
+            config.RUNNER.eno.check_past_ticks,
+            task_timeout_s,
+        )
+        return plan.delays()
 
     async def execute_checker_async(self, team_id: int, tick: int) -> CheckerRunOutput:
         self.reset()
@@ -459,87 +318,87 @@ class EnoCheckerRunner(AsyncCheckerRunner):
         late_slots_iter = iter(late_slots)
         unconstrained_slots_iter = iter(unconstrained_slots)
 
-        async with self._session() as session:
-            for variant_id in range(info.flag_variants):
-                tasks.append(
-                    self._process_message_with_jitter(
-                        session,
-                        self._message(
-                            team_id, tick, CheckerMethod.PUTFLAG, variant_id=variant_id
-                        ),
-                        next(early_slots_iter),
-                    )
+        session = self._session()
+        for variant_id in range(info.flag_variants):
+            tasks.append(
+                self._process_message_with_jitter(
+                    session,
+                    self._message(
+                        team_id, tick, CheckerMethod.PUTFLAG, variant_id=variant_id
+                    ),
+                    next(early_slots_iter),
+                )
+            )
+            tasks.append(
+                self._process_message_with_jitter(
+                    session,
+                    self._message(
+                        team_id, tick, CheckerMethod.GETFLAG, variant_id=variant_id
+                    ),
+                    next(late_slots_iter),
                 )
+            )
+            for i in range(1, config.RUNNER.eno.check_past_ticks + 1):
+                # We start at tick 1, don't allow OOB accesses!
+                if tick - i <= 0:
+                    break
                 tasks.append(
                     self._process_message_with_jitter(
                         session,
                         self._message(
-                            team_id, tick, CheckerMethod.GETFLAG, variant_id=variant_id
+                            team_id,
+                            tick,
+                            CheckerMethod.GETFLAG,
+                            variant_id=variant_id,
+                            related_tick=tick - i,
                         ),
-                        next(late_slots_iter),
+                        next(unconstrained_slots_iter),
                     )
                 )
-                for i in range(1, config.RUNNER.eno.check_past_ticks + 1):
-                    # We start at tick 1, don't allow OOB accesses!
-                    if tick - i <= 0:
-                        break
-                    tasks.append(
-                        self._process_message_with_jitter(
-                            session,
-                            self._message(
-                                team_id,
-                                tick,
-                                CheckerMethod.GETFLAG,
-                                variant_id=variant_id,
-                                related_tick=tick - i,
-                            ),
-                            next(unconstrained_slots_iter),
-                        )
-                    )
 
-            for variant_id in range(info.noise_variants):
-                tasks.append(
-                    self._process_message_with_jitter(
-                        session,
-                        self._message(
-                            team_id, tick, CheckerMethod.PUTNOISE, variant_id=variant_id
-                        ),
-                        next(early_slots_iter),
-                    )
+        for variant_id in range(info.noise_variants):
+            tasks.append(
+                self._process_message_with_jitter(
+                    session,
+                    self._message(
+                        team_id, tick, CheckerMethod.PUTNOISE, variant_id=variant_id
+                    ),
+                    next(early_slots_iter),
                 )
-                tasks.append(
-                    self._process_message_with_jitter(
-                        session,
-                        self._message(
-                            team_id, tick, CheckerMethod.GETNOISE, variant_id=variant_id
-                        ),
-                        next(late_slots_iter),
-                    )
+            )
+            tasks.append(
+                self._process_message_with_jitter(
+                    session,
+                    self._message(
+                        team_id, tick, CheckerMethod.GETNOISE, variant_id=variant_id
+                    ),
+                    next(late_slots_iter),
                 )
+            )
 
-            for variant_id in range(info.havoc_variants):
-                tasks.append(
-                    self._process_message_with_jitter(
-                        session,
-                        self._message(
-                            team_id, tick, CheckerMethod.HAVOC, variant_id=variant_id
-                        ),
-                        next(unconstrained_slots_iter),
-                    )
+        for variant_id in range(info.havoc_variants):
+            tasks.append(
+                self._process_message_with_jitter(
+                    session,
+                    self._message(
+                        team_id, tick, CheckerMethod.HAVOC, variant_id=variant_id
+                    ),
+                    next(unconstrained_slots_iter),
                 )
+            )
 
-            await asyncio.gather(*tasks)
+        await asyncio.gather(*tasks)
 
         messages = (
             self.messages.values() if self.messages else self.recovery_messages.values()
         )
         self.output.sort()
-        return CheckerRunOutput(
+        return self.timer.attach(CheckerRunOutput(
             self.status,
             message="\n".join(set(messages)),
             output="\n".join(self.output),
             data=self.custom_results,
-        )
+        ))
 
     async def _process_message_with_jitter(
         self, session: ClientSession, msg: CheckerTaskMessage, delay: float
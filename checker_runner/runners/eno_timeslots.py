@@ -0,0 +1,88 @@
+"""
+Start times of the tasks of an Eno check within a tick.
+
+All tasks of a check start in evenly spaced slots (one slot per task), from the start of the tick until
+timeout + TIME_BUFFER seconds before its end. Every putflag/putnoise (early) task is paired with its getflag/getnoise (late) task,
+the late task must start at least one timeout later (including the jitter both tasks get within their slot).
+Getflags for past ticks and havocs are unconstrained.
+
+The slot template only depends on tick length, variants and timeout - it is computed once (plan_timeslots is cached),
+each check only shuffles the pairs / unconstrained slots and adds jitter (TimeslotPlan.delays).
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from functools import lru_cache
+
+TIME_BUFFER = 5  # seconds, all tasks should have finished this long before the tick ends
+
+_random = random.Random()
+
+
+@dataclass(frozen=True)
+class TimeslotPlan:
+    interval: float  # seconds between two slots
+    early: tuple[int, ...]  # slot index of each early task, early[i] is paired with late[i]
+    late: tuple[int, ...]
+    unconstrained: tuple[int, ...]
+    valid: bool  # False if the tick is too short to keep early and late tasks a timeout apart
+
+    def delays(self, rng: random.Random | None = None) -> tuple[list[float], list[float], list[float]]:
+        """
+        :param rng: source of per-check randomness
+        :return: start offsets (in seconds) of (early, late, unconstrained) tasks. early[i] and late[i] belong to the same task chain.
+        """
+        rng = rng or _random
+        pairs = list(zip(self.early, self.late))
+        rng.shuffle(pairs)
+        unconstrained = list(self.unconstrained)
+        rng.shuffle(unconstrained)
+        return (
+            [(e + rng.random()) * self.interval for e, _ in pairs],
+            [(late + rng.random()) * self.interval for _, late in pairs],
+            [(u + rng.random()) * self.interval for u in unconstrained],
+        )
+
+
+def _pair_capacity(slots: int, shift: int) -> int:
+    """
+    Number of (early, late) pairs in the pattern "shift slots early, shift slots late, shift slots early, ..." with late = early + shift
+    """
+    return (slots // (2 * shift)) * shift + max(0, slots % (2 * shift) - shift)
+
+
+@lru_cache(maxsize=256)
+def plan_timeslots(tick_length: float, flag_variants: int, noise_variants: int, havoc_variants: int, past_ticks: int,
+                   task_timeout: float) -> TimeslotPlan:
+    """
+    Compute the slot template for one check.
+    Early and late tasks alternate in blocks of "shift" slots, late = early + shift. The smallest shift that keeps paired tasks
+    a timeout apart is used (spreading early and late tasks over the whole tick), pairs are evenly picked from all possible pairs.
+    :param past_ticks: number of past ticks that get checked (getflag)
+    :param task_timeout: in seconds
+    """
+    pair_count = flag_variants + noise_variants
+    slots = (2 + past_ticks) * flag_variants + 2 * noise_variants + havoc_variants
+    if slots == 0:
+        return TimeslotPlan(0.0, (), (), (), True)
+    last_start = max(0.0, tick_length - TIME_BUFFER - task_timeout)
+    interval = last_start / slots
+
+    # task start = (slot + random()) * interval, start(late) - start(early) >= (shift - 1) * interval must be >= timeout
+    min_shift = math.ceil(task_timeout / interval) + 1 if interval > 0 else slots
+    # with shift = slots - pair_count all early tasks come first, all late tasks last - the largest possible distance
+    max_shift = max(1, slots - pair_count)
+    valid = min_shift <= max_shift
+    shift = max_shift
+    for candidate in range(min(min_shift, max_shift), max_shift):
+        if _pair_capacity(slots, candidate) >= pair_count:
+            shift = candidate
+            break
+
+    possible_early = [i for i in range(slots - shift) if (i // shift) % 2 == 0]
+    early = tuple(possible_early[i * len(possible_early) // pair_count] for i in range(pair_count))
+    late = tuple(e + shift for e in early)
+    used = set(early) | set(late)
+    unconstrained = tuple(i for i in range(slots) if i not in used)
+    return TimeslotPlan(interval, early, late, unconstrained, valid)
@@ -1,4 +1,7 @@
+import asyncio
 import importlib
+import inspect
+import json
 import os
 import subprocess
 import sys
@@ -7,7 +10,7 @@ from typing import Type, ClassVar
 
 from celery.exceptions import SoftTimeLimitExceeded
 
-from checker_runner.checker_execution import CheckerRunner, CheckerRunOutput, set_process_needs_restart
+from checker_runner.checker_execution import CheckerRunner, CheckerRunOutput, PhaseTimer, set_process_needs_restart
 from controlserver.models import db_session_2, Service
 from gamelib.exceptions import handle_checker_exceptions
 from saarctf_commons.db_utils import retry_on_sql_error
@@ -61,31 +64,39 @@ class SaarctfServiceRunner(CheckerRunner):
             module = importlib.import_module(fname)
         return getattr(module, clsname)
 
-    def _execute_checker_unchecked(self, service_id: int, team_id: int, tick: int) -> CheckerRunOutput:
+    @staticmethod
+    def _checker_phases(tick: int) -> list[tuple[str, str, int]]:
+        """
+        :return: (log title, method name, tick argument) for each checker method called in this tick, in order
+        """
+        phases = [("check_integrity", "check_integrity", tick), (f"store_flags({tick})", "store_flags", tick)]
+        if tick > 1:
+            phases.append((f"retrieve_flags({tick - 1})", "retrieve_flags", tick - 1))
+        elif tick <= -1:
+            # Test run - retrieve the flag we just have set
+            phases.append((f"retrieve_flags({tick})", "retrieve_flags", tick))
+        return phases
+
+    def _execute_checker_unchecked(self, service_id: int, team_id: int, tick: int, timer: PhaseTimer | None = None) -> CheckerRunOutput:
         """
         Run a given checker script against a single team.
         :param service_id:
         :param team_id:
         :param tick:
+        :param timer: receives the duration of each phase
         :return: (db-status, message) The (db) status of this execution, and an error message (if applicable)
         """
+        timer = timer or PhaseTimer()
         team = gamelib.Team(team_id, '#' + str(team_id), config.NETWORK.team_id_to_vulnbox_ip(team_id))
         service_config = self.get_service_config(service_id)
         gamelogger.GameLogger.reset()
         checker: gamelib.ServiceInterface = self.get_checker_class()(service_config)
         checker.initialize_team(team)
         try:
-            gamelogger.GameLogger.log("----- check_integrity -----")
-            checker.check_integrity(team, tick)
-            gamelogger.GameLogger.log(f"----- store_flags({tick}) -----")
-            checker.store_flags(team, tick)
-            if tick > 1:
-                gamelogger.GameLogger.log(f"----- retrieve_flags({tick - 1}) -----")
-                checker.retrieve_flags(team, tick - 1)
-            elif tick <= -1:
-                # Test run - retrieve the flag we just have set
-                gamelogger.GameLogger.log(f"----- retrieve_flags({tick}) -----")
-                checker.retrieve_flags(team, tick)
+            for title, method, method_tick in self._checker_phases(tick):
+                gamelogger.GameLogger.log(f"----- {title} -----")
+                with timer.measure(method):
+                    getattr(checker, method)(team, method_tick)
         finally:
             try:
                 checker.finalize_team(team)
@@ -95,8 +106,12 @@ class SaarctfServiceRunner(CheckerRunner):
         return CheckerRunOutput("SUCCESS")
 
     def execute_checker(self, team_id: int, tick: int) -> CheckerRunOutput:
+        timer = PhaseTimer()
+        return timer.attach(self._execute_checker_handled(team_id, tick, timer))
+
+    def _execute_checker_handled(self, team_id: int, tick: int, timer: PhaseTimer) -> CheckerRunOutput:
         try:
-            result = handle_checker_exceptions(lambda: self._execute_checker_unchecked(self.service_id, team_id, tick))
+            result = handle_checker_exceptions(lambda: self._execute_checker_unchecked(self.service_id, team_id, tick, timer))
             if isinstance(result, tuple):
                 return CheckerRunOutput(result[0], message=result[1])
             return result
@@ -112,6 +127,70 @@ class SaarctfServiceRunner(CheckerRunner):
             traceback.print_exc()
             return CheckerRunOutput("CRASHED")
 
+    def is_async_checker(self) -> bool:
+        """
+        Checkers opt in to concurrent execution as coroutines by implementing check_integrity/store_flags/retrieve_flags with "async def".
+        """
+        cls = self.get_checker_class()
+        return all(inspect.iscoroutinefunction(getattr(cls, method, None)) for method in ("check_integrity", "store_flags", "retrieve_flags"))
+
+    async def _execute_checker_unchecked_async(self, service_id: int, team_id: int, tick: int, timer: PhaseTimer) -> CheckerRunOutput:
+        """
+        Like _execute_checker_unchecked, for checkers with async interface
+        """
+        team = gamelib.Team(team_id, '#' + str(team_id), config.NETWORK.team_id_to_vulnbox_ip(team_id))
+        # might need database access on first use
+        service_config, checker_class = await asyncio.to_thread(lambda: (self.get_service_config(service_id), self.get_checker_class()))
+        checker: gamelib.ServiceInterface = checker_class(service_config)
+        if inspect.isawaitable(result := checker.initialize_team(team)):
+            await result
+        try:
+            for title, method, method_tick in self._checker_phases(tick):
+                gamelogger.GameLogger.log(f"----- {title} -----")
+                # other checks share this thread, CPU time is not meaningful
+                with timer.measure(method, cpu=False):
+                    await getattr(checker, method)(team, method_tick)
+        finally:
+            try:
+                if inspect.isawaitable(result := checker.finalize_team(team)):
+                    await result
+            except:
+                traceback.print_exc()
+
+        return CheckerRunOutput("SUCCESS")
+
+    async def execute_checker_concurrent(self, team_id: int, tick: int, timeout: float) -> CheckerRunOutput:
+        if not await asyncio.to_thread(self.is_async_checker):
+            return await super().execute_checker_concurrent(team_id, tick, timeout)
+
+        timer = PhaseTimer()
+        return timer.attach(await self._execute_checker_concurrent_handled(team_id, tick, timeout, timer))
+
+    async def _execute_checker_concurrent_handled(self, team_id: int, tick: int, timeout: float, timer: PhaseTimer) -> CheckerRunOutput:
+        from checker_runner.concurrent_execution import run_with_timeout, CheckerTimeout
+
+        try:
+            return await run_with_timeout(self._execute_checker_unchecked_async(self.service_id, team_id, tick, timer), timeout)
+        except CheckerTimeout:
+            return CheckerRunOutput("TIMEOUT", message="Timeout, service too slow")
+        except MemoryError:
+            set_process_needs_restart()
+            traceback.print_exc()
+            return CheckerRunOutput("CRASHED")
+        except Exception as e:
+            # map gamelib exceptions to states, like the synchronous version
+            def reraise() -> CheckerRunOutput:
+                raise e
+
+            try:
+                result = handle_checker_exceptions(reraise)
+            except:
+                traceback.print_exc()
+                return CheckerRunOutput("CRASHED")
+            if isinstance(result, tuple):
+                return CheckerRunOutput(result[0], message=result[1])
+            return result
+
     def execute_checker_subprocess(self, team_id: int, tick: int, timeout: int) \
         -> CheckerRunOutput:
         """
@@ -124,6 +203,8 @@ class SaarctfServiceRunner(CheckerRunner):
         :param timeout: Process timeout in seconds
         :return: (db-status, message, output) The (db) status of this execution, an error message (if applicable), and the console output
         """
+        if config.RUNNER.forkserver:
+            return self.execute_checker_forkserver(team_id, tick, timeout)
         try:
             cmd = [sys.executable, os.path.abspath(__file__),
                    self.package or '', self.script, str(self.service_id), str(team_id), str(tick)]
@@ -131,9 +212,7 @@ class SaarctfServiceRunner(CheckerRunner):
                 cmd, stderr=subprocess.STDOUT, timeout=timeout,
                 cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             ).decode('utf-8')
-            p = output.rindex(SEPARATOR)
-            status, message = output[p + len(SEPARATOR) + 1:].split('|', 1)
-            return CheckerRunOutput(status, message=(message.strip() or None), output=output)
+            return self._parse_subprocess_output(output)
         except subprocess.TimeoutExpired as e:
             return CheckerRunOutput('TIMEOUT', message='Timeout, service too slow', output=e.output.decode('utf-8'))
         except subprocess.CalledProcessError as e:
@@ -141,6 +220,46 @@ class SaarctfServiceRunner(CheckerRunner):
         except subprocess.SubprocessError as e:
             return CheckerRunOutput("CRASHED", output=str(e))
 
+    def execute_checker_forkserver(self, team_id: int, tick: int, timeout: int) -> CheckerRunOutput:
+        """
+        Like execute_checker_subprocess, but the process is forked from a warm zygote (see forkserver.py).
+        """
+        from checker_runner.forkserver import ForkServer
+
+        try:
+            response = ForkServer.get().run(self.package or '', self.script, self.service_id, team_id, tick, timeout)
+        except (OSError, ValueError) as e:
+            ForkServer.reset()
+            return CheckerRunOutput("CRASHED", output=f"Forkserver failed: {e!r}")
+        if response['timeout']:
+            return CheckerRunOutput('TIMEOUT', message='Timeout, service too slow', output=response['output'])
+        if response['exitcode'] != 0:
+            return CheckerRunOutput("CRASHED", output=response['output'])
+        return self._parse_subprocess_output(response['output'])
+
+    @staticmethod
+    def print_subprocess_result(result: CheckerRunOutput) -> None:
+        """
+        Report the result of a checker subprocess to the worker (on stdout): separator, data (json), status|message
+        """
+        print(SEPARATOR)
+        print(json.dumps(result.data))
+        print(result.status + "|" + (result.message or ""))
+
+    @staticmethod
+    def _parse_subprocess_output(output: str) -> CheckerRunOutput:
+        try:
+            p = output.rindex(SEPARATOR)
+            report = output[p + len(SEPARATOR) + 1:]
+            data = {}
+            if report.startswith('{'):
+                data_line, report = report.split('\n', 1)
+                data = json.loads(data_line)
+            status, message = report.split('|', 1)
+        except ValueError:
+            return CheckerRunOutput("CRASHED", output=output)
+        return CheckerRunOutput(status, message=(message.strip() or None), output=output, data=data)
+
 
 if __name__ == "__main__":
     print("(subprocess invoked)")
@@ -152,6 +271,5 @@ if __name__ == "__main__":
     service_id = int(sys.argv[3])
     run = SaarctfServiceRunner(service_id, sys.argv[1], sys.argv[2], None)  # TODO None
     result = run.execute_checker(int(sys.argv[4]), int(sys.argv[5]))
-    print(SEPARATOR)
-    print(result.status + "|" + (result.message or ""))
+    run.print_subprocess_result(result)
     sys.exit(0)
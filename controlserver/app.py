@@ -8,9 +8,11 @@ You can execute this file to start the dev server.
 import os
 import sys
 import threading
+from typing import Any
 
 from controlserver.timer import init_cp_timer, run_master_timer
 from saarctf_commons.metric_utils import setup_default_metrics
+from saarctf_commons.prometheus_utils import setup_prometheus
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -18,7 +20,7 @@ from checker_runner.runner import celery_worker
 from saarctf_commons.redis import NamedRedisConnection
 from saarctf_commons.config import config, load_default_config
 
-from flask import Flask
+from flask import Flask, g, request
 from markupsafe import Markup
 
 
@@ -69,6 +71,20 @@ def _register_processors(app: Flask) -> None:
         return "{:,}".format(i).replace(",", " ")
 
 
+def _register_profiling(app: Flask) -> None:
+    from saarctf_commons.prometheus_utils import set_component, reset_component
+
+    @app.before_request
+    def set_request_component() -> None:
+        # SQL statistics / DB and redis counters per route
+        g.component_token = set_component(f"cp:{request.endpoint}")
+
+    @app.teardown_request
+    def reset_request_component(exception: Any = None) -> None:
+        if "component_token" in g:
+            reset_component(g.pop("component_token"))
+
+
 def start_timer_if_necessary() -> None:
     """
     This function must be called once per game, and only once. You do not want multiple timers running in different processes.
@@ -89,6 +105,7 @@ def create_app() -> Flask:
     NamedRedisConnection.set_clientname("controlserver")
     celery_worker.init()
     setup_default_metrics()
+    setup_prometheus("controlserver", serve=False)  # served at /metrics
 
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.urandom(12).hex()
@@ -97,6 +114,7 @@ def create_app() -> Flask:
     _register_endpoints(app)
 
     _register_processors(app)
+    _register_profiling(app)
 
     # init models
     from controlserver.models import init_database
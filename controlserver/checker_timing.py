@@ -0,0 +1,75 @@
+"""
+Aggregated per-phase timings of checker scripts (recorded by the runners in CheckerResult.data["timings"]).
+
+Per service and tick, each phase (check_integrity, store_flags, retrieve_flags - or the eno methods putflag, getflag, ...)
+gets median and 95th percentile of wall-clock and CPU time.
+"""
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session, scoped_session
+
+from controlserver.models import CheckerResult
+from saarctf_commons.metric_utils import Metrics, Value
+
+
+def percentile(values: list[float], p: float) -> float | None:
+    """
+    Nearest-rank percentile
+    :param values: sorted list
+    :param p: in [0, 100]
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+@dataclass
+class PhaseTimingStats:
+    count: int
+    wall_p50: float | None
+    wall_p95: float | None
+    cpu_p50: float | None
+    cpu_p95: float | None
+
+    @classmethod
+    def from_timings(cls, wall: list[float], cpu: list[float]) -> 'PhaseTimingStats':
+        wall.sort()
+        cpu.sort()
+        return PhaseTimingStats(len(wall), percentile(wall, 50), percentile(wall, 95), percentile(cpu, 50), percentile(cpu, 95))
+
+
+def get_phase_timing_stats(session: Session | scoped_session, tick: int) -> dict[int, dict[str, PhaseTimingStats]]:
+    """
+    :return: {service_id: {phase: stats}}, phases in order of first appearance
+    """
+    wall: dict[int, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    cpu: dict[int, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    for service_id, data in session.query(CheckerResult.service_id, CheckerResult.data).filter(CheckerResult.tick == tick):
+        if not data or not isinstance(data.get('timings'), dict):
+            continue
+        for phase, timing in data['timings'].items():
+            wall[service_id][phase].append(timing['wall'])
+            if 'cpu' in timing:
+                cpu[service_id][phase].append(timing['cpu'])
+    return {
+        service_id: {phase: PhaseTimingStats.from_timings(walls, cpu[service_id][phase]) for phase, walls in phases.items()}
+        for service_id, phases in wall.items()
+    }
+
+
+def record_phase_timing_metrics(session: Session, tick: int) -> None:
+    """
+    Report the timing statistics of a finished tick to Metrics (one record per service and phase)
+    """
+    if not Metrics.is_initialized():
+        return
+    for service_id, phases in get_phase_timing_stats(session, tick).items():
+        for phase, stats in phases.items():
+            values: dict[str, Value] = {'tick': tick, 'count': stats.count}
+            for key in ('wall_p50', 'wall_p95', 'cpu_p50', 'cpu_p95'):
+                if (value := getattr(stats, key)) is not None:
+                    values[key] = value
+            Metrics.record_many('checker_phase_timing', values, service_id=service_id, phase=phase)
@@ -6,22 +6,36 @@ Each package has an identifier for it's content - two folders with the same cont
 Files in a package are identified by their MD5 hash.
 
 Packages can't be updated, but they do deduplication of content. Only new or changed files will be stored / retrieved.
+Uploads hash all files first, an existing package is not touched again. New files are inserted in bulk, large files are streamed in chunks.
 
 Large file storage (LFS): When loading a package, large files are stored in a seperate directory and symlink'ed to their destination.
 If a large file is contained in multiple packages, it requires disk space only once.
+Smaller files that already exist in another package folder (next to the loaded one) are hardlinked from there.
 """
 
 import hashlib
 import json
 import os
 import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple
 
-from controlserver.models import CheckerFilesystem, CheckerFile, db_session
+from sqlalchemy import select, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from controlserver.models import CheckerFilesystem, CheckerFile, db_session_2
 
 
 class DBFilesystem:
+    LFS_MIN_SIZE = 500000
+    WRITE_THREADS = 8
+    HASH_THREADS = 8
+    BLOB_CHUNK_SIZE = 16 * 1024 * 1024  # larger files are uploaded chunk by chunk
+    INSERT_BATCH_SIZE = 64 * 1024 * 1024  # bytes per bulk insert
+    package_pattern = re.compile(r'^[0-9a-f]{32}$')
     ignore_patterns = [
         re.compile(r'^__pycache__$'),
         re.compile(r'\.pyc$'),
@@ -43,38 +57,21 @@ class DBFilesystem:
         :param folder:
         :return: (package, is_new)
         """
-        filesystem: List[CheckerFilesystem] = []  # for the db
-        file_information = []  # for hash calculation
+        entries: list[tuple[str, str | None]] = []  # (path, filename - None for directories)
         for root, subdirs, files in os.walk(folder, followlinks=True):
             # add directories
             subdirs[:] = [dir for dir in subdirs if not self.is_ignored(dir)]
             for dir in subdirs:
                 path = dir if root == folder else root[len(folder) + 1:] + '/' + dir
-                filesystem.append(CheckerFilesystem(path=path))
-                file_information.append([path, 'dir'])
+                entries.append((path, None))
 
             # add files
             for file in files:
                 if self.is_ignored(file):
                     continue
-                fname = root + '/' + file
                 path = file if root == folder else root[len(folder) + 1:] + '/' + file
-                hash = self.store_file_in_database(fname)
-                filesystem.append(CheckerFilesystem(path=path, file_hash=hash))
-                file_information.append([path, hash])
-
-        file_information.sort(key=lambda x: x[0])
-        package = hashlib.md5(json.dumps(file_information).encode('utf8'), usedforsecurity=False).hexdigest()
-        # package already exists?
-        if CheckerFilesystem.query.filter(CheckerFilesystem.package == package).count() > 0:
-            return (package, False)
-        # new package
-        for fs in filesystem:
-            fs.package = package
-        session = db_session()
-        session.add_all(filesystem)
-        session.commit()
-        return (package, True)
+                entries.append((path, root + '/' + file))
+        return self._store_package(entries)
 
     def move_single_files_to_package(self, fnames: list[Path]) -> tuple[str, bool]:
         """
@@ -82,47 +79,99 @@ class DBFilesystem:
         :param fnames:
         :return: (package, is_new)
         """
-        filesystem: List[CheckerFilesystem] = []  # for the db
-        file_information = []  # for hash calculation
-        # add files
-        for fname in fnames:
-            path = fname.name
-            hash = self.store_file_in_database(str(fname))
-            filesystem.append(CheckerFilesystem(path=path, file_hash=hash))
-            file_information.append([path, hash])
+        return self._store_package([(fname.name, str(fname)) for fname in fnames])
+
+    def _store_package(self, entries: list[tuple[str, str | None]]) -> tuple[str, bool]:
+        """
+        Hash all files, and store the package (and the files that are not yet in the database) in one transaction.
+        :param entries: (path in package, filename - None for directories)
+        :return: (package, is_new)
+        """
+        with ThreadPoolExecutor(self.HASH_THREADS) as pool:
+            hashes = list(pool.map(lambda entry: self.hash_file(entry[1]) if entry[1] else None, entries))
 
+        file_information = [[path, file_hash or 'dir'] for (path, _), file_hash in zip(entries, hashes)]  # for hash calculation
         file_information.sort(key=lambda x: x[0])
         package = hashlib.md5(json.dumps(file_information).encode('utf8'), usedforsecurity=False).hexdigest()
-        # package already exists?
-        if CheckerFilesystem.query.filter(CheckerFilesystem.package == package).count() > 0:
-            return (package, False)
-        # new package
-        for fs in filesystem:
-            fs.package = package
-        session = db_session()
-        session.add_all(filesystem)
-        session.commit()
+        with db_session_2() as session:
+            # package already exists?
+            if session.scalar(select(CheckerFilesystem.id).where(CheckerFilesystem.package == package).limit(1)) is not None:
+                return (package, False)
+            # new package
+            self._store_files(session, {file_hash: fname for (_, fname), file_hash in zip(entries, hashes) if fname and file_hash})
+            session.execute(insert(CheckerFilesystem), [
+                {'package': package, 'path': path, 'file_hash': file_hash} for (path, _), file_hash in zip(entries, hashes)
+            ])
+            session.commit()
         return (package, True)
 
+    def hash_file(self, fname: str) -> str:
+        """
+        :return: the md5 hash of the file
+        """
+        with open(fname, 'rb') as f:
+            return hashlib.file_digest(f, lambda: hashlib.md5(usedforsecurity=False)).hexdigest()
+
+    def _store_files(self, session: Session, files: dict[str, str]) -> None:
+        """
+        Insert all files that are not in the database yet (without commit).
+        Small files are inserted in batches of up to INSERT_BATCH_SIZE bytes, larger files in chunks of BLOB_CHUNK_SIZE.
+        :param files: {hash: filename}
+        """
+        if not files:
+            return
+        existing = set(session.scalars(select(CheckerFile.file_hash).where(CheckerFile.file_hash.in_(list(files)))))
+        batch: list[dict] = []
+        batch_size = 0
+        for file_hash, fname in files.items():
+            if file_hash in existing:
+                continue
+            if os.path.getsize(fname) > self.BLOB_CHUNK_SIZE:
+                self._store_large_file(session, file_hash, fname)
+            else:
+                with open(fname, 'rb') as f:
+                    batch.append({'file_hash': file_hash, 'content': f.read()})
+                batch_size += len(batch[-1]['content'])
+                if batch_size >= self.INSERT_BATCH_SIZE:
+                    session.execute(insert(CheckerFile).on_conflict_do_nothing(index_elements=[CheckerFile.file_hash]), batch)
+                    batch = []
+                    batch_size = 0
+            print('Stored {} as {} in db'.format(fname, file_hash))
+        if batch:
+            session.execute(insert(CheckerFile).on_conflict_do_nothing(index_elements=[CheckerFile.file_hash]), batch)
+
+    def _store_large_file(self, session: Session, file_hash: str, fname: str) -> None:
+        """
+        Stream the file into a temporary large object (lo_put writes each chunk once), then insert its content in one statement.
+        Appending to the bytea column instead would rewrite the whole value for every chunk.
+        """
+        oid = session.scalar(select(func.lo_create(0)))
+        with open(fname, 'rb') as f:
+            offset = 0
+            while chunk := f.read(self.BLOB_CHUNK_SIZE):
+                session.execute(select(func.lo_put(oid, offset, chunk)))
+                offset += len(chunk)
+        session.execute(insert(CheckerFile).from_select(['file_hash', 'content'], select(literal(file_hash), func.lo_get(oid)))
+                        .on_conflict_do_nothing(index_elements=[CheckerFile.file_hash]))
+        session.execute(select(func.lo_unlink(oid)))
+
     def store_file_in_database(self, fname: str) -> str:
         """
         Move a file into the database (if it's not already there)
         :param fname:
         :return: the md5 hash of the file
         """
-        with open(fname, 'rb') as f:
-            data = f.read()
-        hash = hashlib.md5(data, usedforsecurity=False).hexdigest()
-        if CheckerFile.query.filter(CheckerFile.file_hash == hash).count() == 0:
-            session = db_session()
-            session.add(CheckerFile(file_hash=hash, content=data))
+        file_hash = self.hash_file(fname)
+        with db_session_2() as session:
+            self._store_files(session, {file_hash: fname})
             session.commit()
-            print('Stored {} as {} in db'.format(fname, hash))
-        return hash
+        return file_hash
 
     def load_package_to_folder(self, package: str, folder: Path, lfs_path: Path | None = None) -> bool:
         """
-        Load a package from DB and copy its content to a folder
+        Load a package from DB and copy its content to a folder.
+        Contents are fetched in one streamed query (each distinct file once) and written in parallel.
+        Files already present in LFS or in other package folders next to "folder" are not fetched.
         :param package:
         :param folder:
         :param lfs_path: (optional) folder to store/locate large files
@@ -134,25 +183,78 @@ class DBFilesystem:
         base.mkdir(exist_ok=True, parents=True)
         if lfs_path:
             lfs_path.mkdir(exist_ok=True, parents=True)
-        filesystem: List[CheckerFilesystem] = CheckerFilesystem.query.filter(CheckerFilesystem.package == package)\
-            .order_by(CheckerFilesystem.path).all()
-        for fs in filesystem:
-            if fs.file_hash:
-                # Check if file in LFS
-                if lfs_path and os.path.exists(lfs_path / fs.file_hash):
-                    os.symlink(lfs_path / fs.file_hash, base / fs.path)
+
+        with db_session_2() as session:
+            files: dict[str, list[str]] = {}  # hash => paths
+            filesystem = session.execute(select(CheckerFilesystem.path, CheckerFilesystem.file_hash)
+                                         .where(CheckerFilesystem.package == package).order_by(CheckerFilesystem.path))
+            for path, file_hash in filesystem:
+                if file_hash:
+                    files.setdefault(file_hash, []).append(path)
                 else:
-                    file: CheckerFile = CheckerFile.query.filter(CheckerFile.file_hash == fs.file_hash).one()
-                    if lfs_path and len(file.content) > 500000:
-                        # write to LFS
-                        with open(lfs_path / fs.file_hash, 'wb') as f:
-                            f.write(file.content)
-                        os.symlink(lfs_path / fs.file_hash, base / fs.path)
-                        os.chmod(lfs_path / fs.file_hash, 0o400)
-                    else:
-                        with open(base / fs.path, 'wb') as f:
-                            f.write(file.content)
-            else:
-                os.makedirs(base / fs.path, exist_ok=True)
+                    os.makedirs(base / path, exist_ok=True)
+
+            # Check if file in LFS
+            if lfs_path:
+                for file_hash in [file_hash for file_hash in files if os.path.exists(lfs_path / file_hash)]:
+                    for path in files.pop(file_hash):
+                        os.symlink(lfs_path / file_hash, base / path)
+            # Check if file in another package
+            for file_hash, source in self._find_local_copies(session, folder, list(files)).items():
+                for path in files.pop(file_hash):
+                    self._link_or_copy(source, base / path)
+
+            if files:
+                with ThreadPoolExecutor(self.WRITE_THREADS) as pool:
+                    futures = []
+                    contents = session.execute(select(CheckerFile.file_hash, CheckerFile.content)
+                                               .where(CheckerFile.file_hash.in_(list(files)))
+                                               .execution_options(yield_per=16))
+                    for file_hash, content in contents:
+                        futures.append(pool.submit(self._write_file, base, files.pop(file_hash), file_hash, content, lfs_path))
+                    for future in futures:
+                        future.result()
+            if files:
+                raise Exception(f'Package {package}: {len(files)} files missing in database')
         os.rename(base, folder)
         return True
+
+    def _find_local_copies(self, session: Session, folder: Path, hashes: list[str]) -> dict[str, Path]:
+        """
+        :return: {hash: path of a regular file with this content in another package folder next to "folder"}
+        """
+        if not hashes or not folder.parent.exists():
+            return {}
+        local_packages = [p.name for p in folder.parent.iterdir() if self.package_pattern.match(p.name) and p != folder and p.is_dir()]
+        if not local_packages:
+            return {}
+        copies: dict[str, Path] = {}
+        candidates = session.execute(select(CheckerFilesystem.file_hash, CheckerFilesystem.package, CheckerFilesystem.path)
+                                     .where(CheckerFilesystem.package.in_(local_packages), CheckerFilesystem.file_hash.in_(hashes)))
+        for file_hash, package, path in candidates:
+            source = folder.parent / package / path
+            if file_hash not in copies and source.is_file() and not source.is_symlink():
+                copies[file_hash] = source
+        return copies
+
+    @staticmethod
+    def _link_or_copy(source: Path, target: Path) -> None:
+        try:
+            os.link(source, target)
+        except OSError:
+            # different filesystem / no hardlink support
+            shutil.copyfile(source, target)
+
+    def _write_file(self, base: Path, paths: list[str], file_hash: str, content: bytes, lfs_path: Path | None) -> None:
+        if lfs_path and len(content) > self.LFS_MIN_SIZE:
+            # write to LFS
+            with open(lfs_path / file_hash, 'wb') as f:
+                f.write(content)
+            os.chmod(lfs_path / file_hash, 0o400)
+            for path in paths:
+                os.symlink(lfs_path / file_hash, base / path)
+        else:
+            with open(base / paths[0], 'wb') as f:
+                f.write(content)
+            for path in paths[1:]:
+                self._link_or_copy(base / paths[0], base / path)
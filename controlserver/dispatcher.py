@@ -5,6 +5,12 @@
 
 
 For each tick, a single "Task Group" is created, which can be used to manage all tasks of one tick together.
+The plan of a tick (combinations, tasks, order) is prepared during the second half of the previous tick,
+at tick start only changes (VPN state, enabled services) are applied before publishing.
+If retries are enabled (config.RUNNER.retry), workers report transient failures to Redis, and the dispatcher
+re-dispatches them as individual tasks while the tick has enough time left. Retries write to the same CheckerResult.
+Services with runner_config["batch"] (Eno) get one task per shard of teams instead of one per team,
+dispatcher:taskmap:<group id> maps the combinations to these tasks.
 
 """
 
@@ -13,6 +19,7 @@ import json
 import random
 import time
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 from typing import TypeAlias, Any
 
@@ -23,12 +30,15 @@ from celery.result import GroupResult, AsyncResult
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from checker_runner.checker_execution import RetryPolicy
 from checker_runner.runner import celery_worker
+from controlserver.checker_timing import record_phase_timing_metrics
 from controlserver.flag_id_file import FlagIDFileGenerator
 from controlserver.logger import log
-from controlserver.models import Team, Service, LogMessage, CheckerResult, db_session, db_session_2
+from controlserver.models import Team, Service, LogMessage, CheckerResult, CheckerResultOutput, CheckerTickSummary, db_session, db_session_2
 from controlserver.utils.import_factory import ImportFactory
 from saarctf_commons.config import config
+from saarctf_commons.prometheus_utils import DISPATCH_SECONDS, COLLECT_SECONDS
 from saarctf_commons.redis import get_redis_connection
 
 DispatchRef: TypeAlias = str
@@ -36,8 +46,25 @@ Tick: TypeAlias = int
 TeamID: TypeAlias = int
 ServiceID: TypeAlias = int
 
+# retries must finish at least this many seconds before the tick ends
+RETRY_SAFETY_MARGIN: float = 5.0
+
+
+@dataclass
+class DispatchPlan:
+    """All tasks of one tick, prepared before the tick starts"""
+    tick: Tick
+    combinations: list[tuple[Team, Service, Tick]]
+    tasks: list[Any] | None  # dispatcher-specific, one per combination (see _prepare)
+    order: str  # JSON for dispatcher:order:<tick>
+    service_fingerprints: dict[ServiceID, tuple]
+
 
 class GenericDispatcher(ABC):
+    def __init__(self) -> None:
+        self._plan: DispatchPlan | None = None
+        self._flag_id_generator = FlagIDFileGenerator()  # keeps flag IDs of previous ticks cached
+
     @abstractmethod
     def _dispatch(self, combinations: list[tuple[Team, Service, Tick]], **overrides: Any) -> DispatchRef:
         raise NotImplementedError()
@@ -50,24 +77,117 @@ class GenericDispatcher(ABC):
     def _collect(self, ref: DispatchRef, combinations: list[tuple[TeamID, ServiceID, Tick]]) -> None:
         raise NotImplementedError()
 
+    def _prepare(self, combinations: list[tuple[Team, Service, Tick]]) -> list[Any] | None:
+        """
+        Optional: precompute everything _dispatch_prepared needs to publish these combinations quickly.
+        :return: one entry per combination, or None if this dispatcher can't prepare anything.
+        """
+        return None
+
+    def _dispatch_prepared(self, combinations: list[tuple[Team, Service, Tick]], tasks: list[Any] | None) -> DispatchRef:
+        return self._dispatch(combinations)
+
+    @abstractmethod
+    def _dispatch_retry(self, team: Team, service: Service, tick: Tick, attempt: int, eta: float, deadline: float) -> DispatchRef:
+        """
+        Dispatch a single check again.
+        :param attempt: number of this attempt (1 = first retry)
+        :param eta: timestamp when the retry should start
+        :param deadline: timestamp when the retry must have finished
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _revoke_retries(self, refs: list[DispatchRef]) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _collect_retries(self, tick: Tick, retries: dict[DispatchRef, tuple[TeamID, ServiceID]]) -> None:
+        """
+        Like _collect: retries that are still running (or crashed) get a TIMEOUT / CRASHED result.
+        Retries that never started keep the result of the previous attempt.
+        :param retries: ref => (team id, service id) of all retries of this tick
+        """
+        raise NotImplementedError()
+
+    def _query_targets(self, session: Session) -> tuple[list[Team], list[Service]]:
+        if config.DISPATCHER_CHECK_VPN_STATUS:
+            teams = session.query(Team) \
+                .filter((Team.vpn_connected == True) | (Team.vpn2_connected == True) | (Team.wg_vulnbox_connected == True)) \
+                .all()
+        else:
+            teams = session.query(Team).all()
+        services = session.query(Service).order_by(Service.id).filter(Service.checker_enabled == True).all()
+        return teams, services
+
+    @staticmethod
+    def _service_fingerprint(service: Service) -> tuple:
+        # everything a prepared task might depend on
+        return (service.checker_runner, service.package, service.checker_script, service.checker_timeout, service.checker_subprocess,
+                service.checker_route, json.dumps(service.runner_config, sort_keys=True))
+
+    def _create_plan(self, tick: Tick, teams: list[Team], services: list[Service]) -> DispatchPlan:
+        combinations = [(t, s, tick) for t, s in itertools.product(teams, services)]
+        random.shuffle(combinations)
+        return DispatchPlan(
+            tick=tick,
+            combinations=combinations,
+            tasks=self._prepare(combinations),
+            order=json.dumps([(team.id, service.id, tick) for team, service, tick in combinations]),
+            service_fingerprints={s.id: self._service_fingerprint(s) for s in services}
+        )
+
+    def _update_plan(self, plan: DispatchPlan, teams: list[Team], services: list[Service]) -> None:
+        """
+        Apply all changes since the plan has been prepared: teams (dis)connected, services enabled/disabled/changed.
+        New combinations are inserted at random positions.
+        """
+        team_ids = {t.id for t in teams}
+        fingerprints = {s.id: self._service_fingerprint(s) for s in services}
+        keep = [i for i, (team, service, _) in enumerate(plan.combinations)
+                if team.id in team_ids and service.id in fingerprints and plan.service_fingerprints.get(service.id) == fingerprints[service.id]]
+        known = {(plan.combinations[i][0].id, plan.combinations[i][1].id) for i in keep}
+        added = [(t, s, plan.tick) for t, s in itertools.product(teams, services) if (t.id, s.id) not in known]
+        if len(keep) == len(plan.combinations) and not added:
+            return
+
+        combinations = [plan.combinations[i] for i in keep]
+        tasks = [plan.tasks[i] for i in keep] if plan.tasks is not None else None
+        added_tasks = self._prepare(added) if added else None
+        for i, combination in enumerate(added):
+            pos = random.randint(0, len(combinations))
+            combinations.insert(pos, combination)
+            if tasks is not None and added_tasks is not None:
+                tasks.insert(pos, added_tasks[i])
+        plan.combinations = combinations
+        plan.tasks = tasks
+        plan.order = json.dumps([(team.id, service.id, tick) for team, service, tick in combinations])
+        plan.service_fingerprints = fingerprints
+
+    def prepare_checker_scripts(self, tick: Tick) -> None:
+        """
+        Precompute the dispatch plan of an upcoming tick, should be called in the (idle) second half of the previous tick.
+        :param tick:
+        """
+        with db_session_2() as session:
+            teams, services = self._query_targets(session)
+            self._plan = self._create_plan(tick, teams, services)
+
+    @DISPATCH_SECONDS.time()
     def dispatch_checker_scripts(self, tick: Tick) -> None:
+        plan, self._plan = self._plan, None
         with db_session_2() as session:
             with get_redis_connection() as redis:
-                if config.DISPATCHER_CHECK_VPN_STATUS:
-                    teams = session.query(Team) \
-                        .filter((Team.vpn_connected == True) | (Team.vpn2_connected == True) | (Team.wg_vulnbox_connected == True)) \
-                        .all()
+                teams, services = self._query_targets(session)
+                if plan is None or plan.tick != tick:
+                    plan = self._create_plan(tick, teams, services)
                 else:
-                    teams = session.query(Team).all()
-                services = session.query(Service).order_by(Service.id).filter(Service.checker_enabled == True).all()
-                combinations = [(t, s, tick) for t, s in itertools.product(teams, services)]
-                if len(combinations) > 0:
-                    random.shuffle(combinations)
-                    ref = self._dispatch(combinations)
-                    combination_ids = [(team.id, service.id, tick) for team, service, tick in combinations]
-                    redis.set(f'dispatcher:order:{tick}', json.dumps(combination_ids))
+                    self._update_plan(plan, teams, services)
+                if len(plan.combinations) > 0:
+                    ref = self._dispatch_prepared(plan.combinations, plan.tasks)
+                    redis.set(f'dispatcher:order:{tick}', plan.order)
                     redis.set(f'dispatcher:ref:{tick}', ref)
-                    FlagIDFileGenerator().generate_and_save(teams, services, tick)
+                    self._flag_id_generator.generate_and_save(teams, services, tick)
 
     def dispatch_test_script(self, team: Team, service: Service, tick: Tick, package: str | None = None) -> tuple[DispatchRef, CheckerResult]:
         session = db_session()  # operation called from cp only
@@ -101,12 +221,88 @@ class GenericDispatcher(ABC):
                 return [(t, s) for t, s, _ in json.loads(data)]
             return []
 
+    def process_retry_requests(self, tick: Tick) -> int:
+        """
+        Re-dispatch the checks that workers reported as transiently failed, if their predicted runtime fits into the rest of the tick.
+        :param tick:
+        :return: number of dispatched retries
+        """
+        from controlserver.timer import Timer
+
+        with get_redis_connection() as redis:
+            pipe = redis.pipeline()
+            pipe.lrange(f'dispatcher:retry_requests:{tick}', 0, -1)
+            pipe.delete(f'dispatcher:retry_requests:{tick}')
+            requests = [json.loads(r) for r in pipe.execute()[0]]
+        if not requests or tick != Timer.current_tick or Timer.tick_end is None:
+            return 0
+
+        refs: list[DispatchRef] = []
+        targets: dict[DispatchRef, str] = {}
+        with db_session_2() as session:
+            services = {s.id: s for s in session.query(Service).filter(Service.checker_enabled == True).all()}
+            teams = {t.id: t for t in session.query(Team).filter(Team.id.in_({r['team_id'] for r in requests})).all()}
+            for request in requests:
+                service = services.get(request['service_id'])
+                team = teams.get(request['team_id'])
+                if not service or not team or not RetryPolicy.for_service(service.runner_config).allows(request['status'], request['attempt']):
+                    continue
+                eta = time.time() + config.RUNNER.retry.delay
+                deadline = Timer.tick_end - RETRY_SAFETY_MARGIN
+                if eta + self._predict_retry_runtime(service, request) > deadline:
+                    continue
+                ref = self._dispatch_retry(team, service, tick, request['attempt'] + 1, eta, deadline)
+                refs.append(ref)
+                targets[ref] = json.dumps([team.id, service.id])
+        if refs:
+            with get_redis_connection() as redis:
+                pipe = redis.pipeline(transaction=False)
+                pipe.rpush(f'dispatcher:retry_refs:{tick}', *refs)
+                pipe.expire(f'dispatcher:retry_refs:{tick}', 3600)
+                pipe.hset(f'dispatcher:retry_targets:{tick}', mapping=targets)  # type: ignore[arg-type]
+                pipe.expire(f'dispatcher:retry_targets:{tick}', 3600)
+                pipe.execute()
+        return len(refs)
+
+    @staticmethod
+    def _predict_retry_runtime(service: Service, request: dict) -> float:
+        # a check that timed out will likely need its full timeout again, other failures usually fail as fast as before
+        if request['status'] == 'TIMEOUT':
+            return float(service.checker_timeout)
+        return min(float(service.checker_timeout), max(float(request['runtime']), 1.0))
+
+    def run_retry_loop(self, tick: Tick, interval: float = 1.0) -> None:
+        """
+        Process retry requests until the end of the given tick is near.
+        :param tick:
+        :param interval: seconds between two polls
+        """
+        from controlserver.timer import Timer
+
+        retries = 0
+        while tick == Timer.current_tick and Timer.tick_end is not None and time.time() < Timer.tick_end - RETRY_SAFETY_MARGIN:
+            retries += self.process_retry_requests(tick)
+            time.sleep(interval)
+        if retries > 0:
+            log('dispatcher', f'Retried {retries} failed checker scripts in tick {tick}')
+
+    def _get_retry_refs(self, tick: Tick) -> list[DispatchRef]:
+        with get_redis_connection() as redis:
+            return [ref.decode() for ref in redis.lrange(f'dispatcher:retry_refs:{tick}', 0, -1)]
+
+    def _get_retry_targets(self, tick: Tick) -> dict[DispatchRef, tuple[TeamID, ServiceID]]:
+        with get_redis_connection() as redis:
+            return {ref.decode(): tuple(json.loads(target)) for ref, target in redis.hgetall(f'dispatcher:retry_targets:{tick}').items()}
+
     def revoke_checker_scripts(self, tick: Tick) -> None:
         with get_redis_connection() as redis:
             ref: bytes | None = redis.get(f'dispatcher:ref:{tick}')
         if ref:
             self._revoke(ref.decode())
+        if retry_refs := self._get_retry_refs(tick):
+            self._revoke_retries(retry_refs)
 
+    @COLLECT_SECONDS.time()
     def collect_checker_results(self, tick: Tick) -> None:
         if tick <= 0:
             return
@@ -118,6 +314,8 @@ class GenericDispatcher(ABC):
 
         if ref:
             self._collect(ref.decode(), combinations)
+        if retry_targets := self._get_retry_targets(tick):
+            self._collect_retries(tick, retry_targets)
 
         with db_session_2() as session:
             # Log checker script errors
@@ -129,6 +327,11 @@ class GenericDispatcher(ABC):
                 service = session.query(Service).filter(Service.id == service_id).first()
                 log('dispatcher', f'Checker scripts for {service.name if service else service_id} produced {count} errors in tick {tick}',
                     level=LogMessage.ERROR)
+            record_phase_timing_metrics(session, tick)
+            # results of the previous tick might have arrived late (run_over_time)
+            for summary_tick in (tick - 1, tick) if tick > 1 else (tick,):
+                CheckerTickSummary.update(session, summary_tick)
+            session.commit()
 
     def collect_test_results_many(self, team: Team, service: Service, ticks: list[Tick], ref: DispatchRef) -> None:
         if ref:
@@ -137,18 +340,89 @@ class GenericDispatcher(ABC):
 
 class CeleryDispatcher(GenericDispatcher):
     def _dispatch(self, combinations: list[tuple[Team, Service, Tick]], **overrides: Any) -> DispatchRef:
-        taskgroup_sig: Signature = group([self._create_celery_task(team, service, tick, **overrides) for team, service, tick in combinations])
+        return self._dispatch_prepared(combinations, [self._create_celery_task(team, service, tick, **overrides) for team, service, tick in combinations])
+
+    def _prepare(self, combinations: list[tuple[Team, Service, Tick]]) -> list[Any] | None:
+        return [self._create_celery_task(team, service, tick) for team, service, tick in combinations]
+
+    def _dispatch_prepared(self, combinations: list[tuple[Team, Service, Tick]], tasks: list[Any] | None) -> DispatchRef:
+        if tasks is None:
+            return self._dispatch(combinations)
+        tasks, taskmap = self._batch_tasks(combinations, tasks)
+        taskgroup_sig: Signature = group(tasks)
         taskgroup: GroupResult = taskgroup_sig.apply_async()
         taskgroup.save()
+        if taskmap is not None:
+            with get_redis_connection() as redis:
+                redis.set(f'dispatcher:taskmap:{taskgroup.id}', json.dumps(taskmap), ex=24 * 3600)
         return taskgroup.id
 
-    def _create_celery_task(self, team: Team, service: Service, tick: int, package: str | None = None, route: str | None = None, **kwargs: Any) -> Task:
+    def _batch_tasks(self, combinations: list[tuple[Team, Service, Tick]], tasks: list[Any]) -> tuple[list[Any], dict | None]:
+        """
+        Replace the tasks of services with runner_config["batch"] by one task per shard of teams (per service and tick).
+        "batch": true puts all teams in one shard, "batch": <n> at most n teams.
+        :return: the tasks to publish, and the taskmap (None if nothing has been batched):
+                 {"tasks": task index of each combination, "batches": indices of batch tasks}
+        """
+        shards: dict[tuple[ServiceID, Tick], list[list[int]]] = {}  # => combination indices
+        published: list[Any] = []
+        task_indices: list[int] = []
+        for i, (team, service, tick) in enumerate(combinations):
+            batch = (service.runner_config or {}).get('batch')
+            if not batch or service.checker_subprocess:
+                task_indices.append(len(published))
+                published.append(tasks[i])
+                continue
+            service_shards = shards.setdefault((service.id, tick), [])
+            if not service_shards or (batch is not True and len(service_shards[-1]) >= int(batch)):
+                service_shards.append([])
+            service_shards[-1].append(i)
+            task_indices.append(-1)
+        if not shards:
+            return tasks, None
+
+        batches = []
+        for service_shards in shards.values():
+            for shard in service_shards:
+                for i in shard:
+                    task_indices[i] = len(published)
+                batches.append(len(published))
+                published.append(self._create_celery_batch_task([combinations[i] for i in shard], tasks[shard[0]]))
+        return published, {'tasks': task_indices, 'batches': batches}
+
+    @staticmethod
+    def _create_celery_batch_task(combinations: list[tuple[Team, Service, Tick]], template: Signature) -> Signature:
+        """
+        :param template: the regular task of the first combination (for package, queue and time limits)
+        """
+        _, service, tick = combinations[0]
+        return celery_worker.run_checkerscript_batch.signature(
+            (
+                service.checker_runner,
+                template.args[1],
+                service.checker_script,
+                service.id,
+                [team.id for team, _, _ in combinations],
+                tick,
+                service.runner_config,
+            ),
+            # batch tasks schedule their requests over the whole tick themselves, they never get an eta
+            **{k: v for k, v in template.options.items() if k in ('queue', 'time_limit', 'soft_time_limit', 'priority')}
+        )
+
+    def _create_celery_task(self, team: Team, service: Service, tick: int, package: str | None = None, route: str | None = None,
+                            timeout: int | None = None, **kwargs: Any) -> Task:
+        default_queue = 'celery'
         if service.checker_subprocess:
             run_func = celery_worker.run_checkerscript_external
-            timeout = service.checker_timeout + 5
+            timeout = (timeout or service.checker_timeout) + 5
+        elif (service.runner_config or {}).get('concurrent'):
+            run_func = celery_worker.run_checkerscript_concurrent
+            timeout = timeout or service.checker_timeout
+            default_queue = config.RUNNER.concurrent.queue
         else:
             run_func = celery_worker.run_checkerscript
-            timeout = service.checker_timeout
+            timeout = timeout or service.checker_timeout
         return run_func.signature(
             (
                 service.checker_runner,
@@ -161,10 +435,35 @@ class CeleryDispatcher(GenericDispatcher):
             ),
             time_limit=timeout + 5, soft_time_limit=timeout,
             countdown=150 if service.checker_script == 'pendingtest' else None,
-            queue=route or service.checker_route or 'celery',
+            queue=route or service.checker_route or default_queue,
             **kwargs
         )
 
+    def _dispatch_retry(self, team: Team, service: Service, tick: Tick, attempt: int, eta: float, deadline: float) -> DispatchRef:
+        retry_config = config.RUNNER.retry
+        # retries must not run past the tick end - shorten their time limit if necessary
+        timeout = max(1, min(service.checker_timeout, int(deadline - eta) - (10 if service.checker_subprocess else 5)))
+        task = self._create_celery_task(
+            team, service, tick, route=retry_config.queue, timeout=timeout,
+            kwargs={'attempt': attempt}, priority=celery_worker.broker_priority(retry_config.priority),
+            eta=datetime.fromtimestamp(eta, timezone.utc), expires=datetime.fromtimestamp(deadline, timezone.utc)
+        )
+        return task.apply_async().id
+
+    def _revoke_retries(self, refs: list[DispatchRef]) -> None:
+        celery_worker.app.control.revoke(refs)
+
+    def _collect_retries(self, tick: Tick, retries: dict[DispatchRef, tuple[TeamID, ServiceID]]) -> None:
+        with db_session_2() as session:
+            for ref, (team_id, service_id) in retries.items():
+                result = AsyncResult(ref, app=celery_worker.app)
+                status = self._get_celery_status(result)
+                if status in (states.STARTED, states.FAILURE):
+                    self._store_unfinished_result(session, team_id, service_id, tick, result, status)
+                if status in states.READY_STATES:
+                    result.forget()
+            session.commit()
+
     def _ref_to_group(self, ref: DispatchRef) -> GroupResult:
         return GroupResult.restore(ref, app=celery_worker.app)
 
@@ -175,13 +474,28 @@ class CeleryDispatcher(GenericDispatcher):
     def _collect(self, ref: DispatchRef, combinations: list[tuple[TeamID, ServiceID, Tick]]) -> None:
         collect_time = time.time()
         taskgroup = self._ref_to_group(ref)
+        with get_redis_connection() as redis:
+            data = redis.get(f'dispatcher:taskmap:{ref}')
+            taskmap = json.loads(data) if data else None
 
         with db_session_2() as session:
             stats = {states.SUCCESS: 0, states.STARTED: 0, states.REVOKED: 0, states.FAILURE: 0}
             if taskgroup and combinations:
-                for (team_id, service_id, tick), result in zip(combinations, taskgroup.results):
-                    status = self._handle_celery_result(session, team_id, service_id, tick, result)
-                    stats[status] += 1
+                if taskmap is None:
+                    for (team_id, service_id, tick), result in zip(combinations, taskgroup.results):
+                        status = self._handle_celery_result(session, team_id, service_id, tick, result)
+                        stats[status] += 1
+                else:
+                    batches: dict[int, list[tuple[TeamID, ServiceID, Tick]]] = {i: [] for i in taskmap['batches']}
+                    for (team_id, service_id, tick), task_index in zip(combinations, taskmap['tasks']):
+                        if task_index in batches:
+                            batches[task_index].append((team_id, service_id, tick))
+                        else:
+                            status = self._handle_celery_result(session, team_id, service_id, tick, taskgroup.results[task_index])
+                            stats[status] += 1
+                    for task_index, batch_combinations in batches.items():
+                        for status in self._handle_celery_batch_result(session, batch_combinations, taskgroup.results[task_index]):
+                            stats[status] += 1
                 session.commit()
 
                 if combinations[0][2] >= 0:
@@ -206,13 +520,46 @@ class CeleryDispatcher(GenericDispatcher):
             return collect_time - last_finished.timestamp()
         return 0.0
 
-    def _handle_celery_result(self, session: Session, team_id: int, service_id: int, tick: Tick, result: AsyncResult) -> str:
+    @staticmethod
+    def _get_celery_status(result: AsyncResult) -> str:
         try:
             status = result.status
         except WorkerLostError:
             status = states.FAILURE
         if status == states.RETRY or status == states.PENDING:
             status = states.REVOKED
+        return status
+
+    def _handle_celery_result(self, session: Session, team_id: int, service_id: int, tick: Tick, result: AsyncResult) -> str:
+        status = self._get_celery_status(result)
+        if status == states.SUCCESS:
+            result.forget()
+        else:
+            self._store_unfinished_result(session, team_id, service_id, tick, result, status)
+        return status
+
+    def _handle_celery_batch_result(self, session: Session, combinations: list[tuple[TeamID, ServiceID, Tick]],
+                                    result: AsyncResult) -> list[str]:
+        """
+        A batch task stores the result of each team once it is finished. Only the other teams get a TIMEOUT / CRASHED / REVOKED result.
+        :return: the status of each combination
+        """
+        status = self._get_celery_status(result)
+        if status == states.SUCCESS:
+            result.forget()
+            return [status] * len(combinations)
+        finished = set(session.query(CheckerResult.team_id, CheckerResult.service_id, CheckerResult.tick)
+                       .filter(CheckerResult.celery_id == result.id).all())
+        statuses = []
+        for team_id, service_id, tick in combinations:
+            if (team_id, service_id, tick) in finished:
+                statuses.append(states.SUCCESS)
+            else:
+                self._store_unfinished_result(session, team_id, service_id, tick, result, status)
+                statuses.append(status)
+        return statuses
+
+    def _store_unfinished_result(self, session: Session, team_id: int, service_id: int, tick: Tick, result: AsyncResult, status: str) -> None:
         if status == states.FAILURE:
             # timeout or critical (exception)
             r = result.get(propagate=False)
@@ -229,7 +576,8 @@ class CeleryDispatcher(GenericDispatcher):
                     db_result.output = old_result.output + '\n' + repr(type(r)) + ' ' + repr(r)
                 else:
                     db_result.output = repr(type(r)) + ' ' + repr(r)
-            session.execute(CheckerResult.upsert().values(db_result.props_dict()))
+            session.execute(CheckerResult.upsert(db_result).values(db_result.props_dict()))
+            session.execute(CheckerResultOutput.upsert().values(db_result.output_props_dict()))
         elif status == states.STARTED:
             # result is here too late
             db_result = CheckerResult(tick=tick, service_id=service_id, team_id=team_id, celery_id=result.id)
@@ -237,34 +585,44 @@ class CeleryDispatcher(GenericDispatcher):
             db_result.message = 'Service not checked completely'
             db_result.output = 'Still running after tick end...'
             db_result.run_over_time = True
-            session.execute(CheckerResult.upsert().values(db_result.props_dict()))
+            session.execute(CheckerResult.upsert(db_result).values(db_result.props_dict()))
+            session.execute(CheckerResultOutput.upsert().values(db_result.output_props_dict()))
         elif status == states.REVOKED:
             # never tried to run this task
             db_result = CheckerResult(tick=tick, service_id=service_id, team_id=team_id, celery_id=result.id)
             db_result.status = 'REVOKED'
             db_result.message = 'Service not checked'
             db_result.output = 'Not started before the tick ended'
-            session.execute(CheckerResult.upsert().values(db_result.props_dict()))
-        elif status == states.SUCCESS:
-            result.forget()
-        return status
+            session.execute(CheckerResult.upsert(db_result).values(db_result.props_dict()))
+            session.execute(CheckerResultOutput.upsert().values(db_result.output_props_dict()))
 
 
 class DelayingCeleryDispatcher(CeleryDispatcher):
-    def _dispatch(self, combinations: list[tuple[Team, Service, Tick]], **overrides: Any) -> DispatchRef:
+    def _dispatch_prepared(self, combinations: list[tuple[Team, Service, Tick]], tasks: list[Any] | None) -> DispatchRef:
+        if tasks is not None:
+            etas = self._get_etas(combinations)
+            if etas is not None:
+                for task, eta in zip(tasks, etas):
+                    task.set(eta=eta)
+        return super()._dispatch_prepared(combinations, tasks)
+
+    def _get_etas(self, combinations: list[tuple[Team, Service, Tick]]) -> list[datetime] | None:
+        """
+        :return: the start time for each combination, or None if it should not be delayed
+        """
         # special handling only if all combinations are from one tick
         ticks = set(t for _, _, t in combinations)
         if len(ticks) != 1 or (tick := next(iter(ticks))) < 0:
-            return super()._dispatch(combinations, **overrides)
+            return None
 
         # ... and this tick has times, and we're in this tick atm
         from controlserver.timer import Timer
         now = time.time()
         if tick != Timer.current_tick or Timer.tick_start is None or Timer.tick_end is None or not (Timer.tick_start <= now < Timer.tick_end):
-            return super()._dispatch(combinations, **overrides)
+            return None
         # sanity check: we should not delay things for too long
         if Timer.tick_end - now >= 900:
-            return super()._dispatch(combinations, **overrides)
+            return None
 
         # get the "spreading" right
         counts: dict[int, int] = {}  # ID => # elements
@@ -274,22 +632,17 @@ class DelayingCeleryDispatcher(CeleryDispatcher):
             if service.id not in factors:
                 factors[service.id] = Timer.tick_end - Timer.tick_start - service.checker_timeout - (15 if service.checker_subprocess else 10)
 
-        # build tasks with delay
-        tasks = []
+        # compute delays
+        etas: list[datetime] = []
         seen = {k: 0 for k in counts.keys()}
         start = datetime.fromtimestamp(Timer.tick_start, timezone.utc)
         for team, service, tick in combinations:
             delay = factors[service.id] * seen[service.id] / counts[service.id]
             if delay < 3:
                 delay = 0
-            tasks.append(self._create_celery_task(team, service, tick, eta=start + timedelta(seconds=delay), **overrides))
+            etas.append(start + timedelta(seconds=delay))
             seen[service.id] += 1
-
-        # task to taskgroup, as usual
-        taskgroup_sig: Signature = group(tasks)
-        taskgroup: GroupResult = taskgroup_sig.apply_async()
-        taskgroup.save()
-        return taskgroup.id
+        return etas
 
 
 class DispatcherFactory(ImportFactory[GenericDispatcher]):
@@ -1,6 +1,9 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, Response
 from flask.typing import ResponseReturnValue
-from saarctf_commons.metric_utils import Metrics
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from saarctf_commons.metric_utils import Metrics, MetricPoint
+from saarctf_commons.prometheus_utils import generate_metrics
 
 app = Blueprint("metrics", __name__)
 
@@ -8,11 +11,13 @@ app = Blueprint("metrics", __name__)
 @app.route("/metrics/write", methods=["POST"])
 def metrics_write() -> ResponseReturnValue:
     data = request.get_json()
-    for record in data:
-        Metrics.record_many(
-            record["metric"],
-            record["values"],
-            record.get("ts", None),
-            **record.get("attributes", {}),
-        )
+    Metrics.record_batch(
+        MetricPoint(record["metric"], record["values"], record.get("ts", None), record.get("attributes", {}))
+        for record in data
+    )
     return "OK"
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_prometheus() -> ResponseReturnValue:
+    return Response(generate_metrics(), content_type=CONTENT_TYPE_LATEST)
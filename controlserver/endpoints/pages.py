@@ -14,13 +14,14 @@ from typing import List, Optional, Tuple, Any, cast
 
 from flask import Blueprint, render_template, jsonify, request, Response
 from flask.typing import ResponseReturnValue
-from sqlalchemy import distinct, Integer, text, func
+from sqlalchemy import distinct, text, func
 from sqlalchemy.orm.exc import NoResultFound
 
 from checker_runner.runner import celery_worker
+from controlserver.checker_timing import get_phase_timing_stats
 from controlserver.db_filesystem import DBFilesystem
 from controlserver.models import db_session, Service, Team, LogMessage, TeamTrafficStats, \
-    CheckerFile, CheckerFilesystem, CheckerResult
+    CheckerFile, CheckerFilesystem, CheckerResult, CheckerTickSummary
 from controlserver.scoring.scoreboard import default_scoreboards
 from controlserver.service_mgr import ServiceRepoManager
 from controlserver.vpncontrol import VPNControl, VpnStatus
@@ -352,19 +353,15 @@ def checker_status(tick: int | None = None) -> ResponseReturnValue:
         tick = Timer.current_tick
 
     session = db_session()
-    count = session.query(func.count(CheckerResult.id)).filter(CheckerResult.tick == tick) \
-        .filter(CheckerResult.status != 'PENDING').filter(CheckerResult.status != 'REVOKED').scalar()
     dispatcher = DispatcherFactory.build(config.RUNNER.dispatcher)
     combinations = dispatcher.get_tick_combinations(tick)
     if not combinations:
         return render_template('404.html', message='Round {} has not yet been dispatched.'.format(tick)), 404
     services = Service.query.order_by(Service.name).all()
 
-    # Big table statistics
-    results: List[CheckerResult] = session.query(CheckerResult.service_id, CheckerResult.status, CheckerResult.time,
-                                                 CheckerResult.finished,
-                                                 CheckerResult.run_over_time) \
-        .filter(CheckerResult.tick == tick).order_by(CheckerResult.finished).all()
+    # Big table statistics (summary table once the tick has been collected)
+    summaries = session.query(CheckerTickSummary).filter(CheckerTickSummary.tick == tick).all() \
+        or CheckerTickSummary.compute(session, tick)
     stats_dispatched: dict[int, int] = defaultdict(lambda: 0)  # service => count
     stats_results: dict[int, int] = defaultdict(lambda: 0)  # service => count of results
     stats_finished: dict[int, int] = defaultdict(lambda: 0)  # service => count of non-pending results
@@ -375,24 +372,27 @@ def checker_status(tick: int | None = None) -> ResponseReturnValue:
     total_status: dict[str, int] = defaultdict(lambda: 0)
     for team_id, service_id in combinations:
         stats_dispatched[service_id] += 1
-    for result in results:
-        stats_results[result.service_id] += 1
-        if result.status != "REVOKED" and result.status != "PENDING":
-            stats_finished[result.service_id] += 1
-        if result.time:
-            stats_time[result.service_id] += result.time  # type: ignore[operator]
-            stats_time_count[result.service_id] += 1
-        stats_status[result.service_id][result.status] += 1
-        total_status[result.status] += 1
-        if result.run_over_time:
-            stats_toolate[result.service_id] += 1
+    for summary in summaries:
+        stats_results[summary.service_id] = summary.results
+        stats_finished[summary.service_id] = summary.results - summary.status_counts.get('REVOKED', 0) \
+            - summary.status_counts.get('PENDING', 0)
+        stats_time[summary.service_id] = summary.time_sum
+        stats_time_count[summary.service_id] = summary.time_count
+        for status, status_count in summary.status_counts.items():
+            stats_status[summary.service_id][status] += status_count
+            total_status[status] += status_count
+        stats_toolate[summary.service_id] = sum(summary.late_counts.values())
+    count = sum(stats_finished.values())
     for service in services:
         stats_status[service.id]['PENDING'] += stats_dispatched[service.id] - stats_results[service.id]
         total_status['PENDING'] += stats_dispatched[service.id] - stats_results[service.id]
     total_time = sum(stats_time.values())
     total_time_count = sum(stats_time_count.values())
+    phase_timings = get_phase_timing_stats(session, tick)
 
     # graph data
+    results = session.query(CheckerResult.status, CheckerResult.finished, CheckerResult.run_over_time) \
+        .filter(CheckerResult.tick == tick).order_by(CheckerResult.finished).all()
     redis = get_redis_connection()
     bucketsize = 5
     tick_start = int(redis.get(f'round:{tick}:start') or 0)
@@ -446,6 +446,7 @@ def checker_status(tick: int | None = None) -> ResponseReturnValue:
         total_time=total_time,
         total_time_count=total_time_count,
         total_status=total_status,
+        phase_timings=phase_timings,
         status_format={
             "SUCCESS": "success",
             "FLAGMISSING": "info",
@@ -463,6 +464,9 @@ def checker_status(tick: int | None = None) -> ResponseReturnValue:
     )
 
 
+_STATUS_OK = ('SUCCESS', 'FLAGMISSING', 'MUMBLE', 'OFFLINE', 'RECOVERING')
+
+
 @app.route("/checker_status/overview/")
 @app.route("/checker_status/overview/all")
 @app.route("/checker_status/overview")
@@ -477,23 +481,13 @@ def checker_status_overview() -> ResponseReturnValue:
     last_tick = Timer.current_tick
     redis = get_redis_connection()
     session = db_session()
-    results_ok = session.query(CheckerResult.tick, func.count(CheckerResult.id),
-                               func.sum(CheckerResult.run_over_time.cast(Integer))).group_by(
-        CheckerResult.tick) \
-        .filter(CheckerResult.tick >= first_tick).filter(CheckerResult.tick <= last_tick) \
-        .filter(CheckerResult.status.in_(['SUCCESS', 'FLAGMISSING', 'MUMBLE', 'OFFLINE', 'RECOVERING'])).all()
-    results_warn = session.query(CheckerResult.tick, func.count(CheckerResult.id)).group_by(CheckerResult.tick) \
-        .filter(CheckerResult.tick >= first_tick).filter(CheckerResult.tick <= last_tick) \
-        .filter(CheckerResult.status == 'TIMEOUT').all()
-    results_error = session.query(CheckerResult.tick, func.count(CheckerResult.id)).group_by(CheckerResult.tick) \
-        .filter(CheckerResult.tick >= first_tick).filter(CheckerResult.tick <= last_tick) \
-        .filter(CheckerResult.status == 'CRASHED').all()
-    results_revoked = session.query(CheckerResult.tick, func.count(CheckerResult.id)).group_by(CheckerResult.tick) \
-        .filter(CheckerResult.tick >= first_tick).filter(CheckerResult.tick <= last_tick) \
-        .filter(CheckerResult.status == 'REVOKED').all()
-    results_last_finished = session.query(CheckerResult.tick, func.max(CheckerResult.finished)).group_by(
-        CheckerResult.tick) \
-        .filter(CheckerResult.tick >= first_tick).filter(CheckerResult.tick <= last_tick).all()
+    summaries = session.query(CheckerTickSummary) \
+        .filter(CheckerTickSummary.tick >= first_tick).filter(CheckerTickSummary.tick <= last_tick).all()
+    # ticks that have not been collected yet
+    summarized = {summary.tick for summary in summaries}
+    for i in range(max(first_tick, last_tick - 1), last_tick + 1):
+        if i not in summarized:
+            summaries += CheckerTickSummary.compute(session, i)
 
     ticks = {}
     for i in range(first_tick, Timer.current_tick + 1):
@@ -512,20 +506,40 @@ def checker_status_overview() -> ResponseReturnValue:
             'tasks_toolate': 0,
             'last_finished': None
         }
-    for i, count, over_time in results_ok:
-        ticks[i]['tasks_ok'] = count - over_time
-        ticks[i]['tasks_toolate'] = over_time
-    for i, count in results_warn:
-        ticks[i]['tasks_warn'] = count
-    for i, count in results_error:
-        ticks[i]['tasks_error'] = count
-    for i, count in results_revoked:
-        ticks[i]['tasks_revoked'] = count
-    for i, last_finished in results_last_finished:
-        ticks[i]['last_finished'] = last_finished
+    for summary in summaries:
+        t = ticks[summary.tick]
+        ok = sum(summary.status_counts.get(status, 0) for status in _STATUS_OK)
+        late = sum(summary.late_counts.get(status, 0) for status in _STATUS_OK)
+        t['tasks_ok'] += ok - late
+        t['tasks_toolate'] += late
+        t['tasks_warn'] += summary.status_counts.get('TIMEOUT', 0)
+        t['tasks_error'] += summary.status_counts.get('CRASHED', 0)
+        t['tasks_revoked'] += summary.status_counts.get('REVOKED', 0)
+        if summary.last_finished and (t['last_finished'] is None or summary.last_finished > t['last_finished']):
+            t['last_finished'] = summary.last_finished
     return render_template('checker_status_overview.html', ticks=ticks, first_tick=first_tick)
 
 
+@app.route("/overview/sql")
+def sql_profiling() -> ResponseReturnValue:
+    """
+    Top SQL statements (by total time) of all processes. ?component=... filters, ?format=json for the raw report.
+    """
+    from saarctf_commons.sql_profiling import BUCKETS, collect_reports, merge_reports, top_statements
+
+    reports = collect_reports()
+    stats = merge_reports(reports)
+    components = sorted({component for component, _ in stats})
+    selected = request.args.get("component")
+    if selected:
+        stats = {key: value for key, value in stats.items() if key[0] == selected}
+    statements = top_statements(stats, int(request.args.get("n", config.SQL_PROFILING.top_n)))
+    if request.args.get("format") == "json":
+        return jsonify({"processes": len(reports), "buckets": BUCKETS, "statements": statements})
+    return render_template("sql_profiling.html", statements=statements, components=components, selected=selected,
+                           processes=len(reports), buckets=BUCKETS, publish_interval=config.SQL_PROFILING.publish_interval)
+
+
 @app.route("/scripts/recreate_scoreboard", methods=["POST"])
 def recreate_scoreboard() -> ResponseReturnValue:
     def recreate_scoreboard_inner() -> None:
@@ -3,6 +3,7 @@ Events like "Start CTF", "New tick", ....
 Everything is based on CTFEvents interface (in timer.py). Events are emitted by the Timer.
 """
 
+import functools
 import threading
 import time
 from abc import ABC, abstractmethod
@@ -15,10 +16,13 @@ from controlserver.logger import log, log_result_of_execution
 from controlserver.models import LogMessage, db_session_2, Tick
 from controlserver.scoring.scoreboard import Scoreboard, default_scoreboards
 from controlserver.scoring.scoring import ScoringCalculation
+from controlserver.utils.task_graph import TaskGraph
 from controlserver.events import CTFEvents
 from controlserver.vpncontrol import VPNControl, VpnStatus
 from saarctf_commons.config import config
 from saarctf_commons.db_utils import retry_on_sql_error
+from saarctf_commons.prometheus_utils import component
+from saarctf_commons.tracing import span, record_tick_span
 
 
 class LogCTFEvents(CTFEvents):
@@ -86,16 +90,20 @@ class DeferredCTFEvents(GenericDeferredCTFEvents):
         self.dispatcher = DispatcherFactory.build(config.RUNNER.dispatcher)
         self.scoring = ScoringCalculation(config.SCORING)
         self.scoreboards: list[Scoreboard] = default_scoreboards(self.scoring, publish=True)
+        self.tick_starts: dict[int, float] = {}  # start of the root span of each running tick
 
     @override
     def _on_start_tick_deferred(self, tick: int, ts: datetime) -> None:
-        log_result_of_execution(
-            "dispatcher",
-            self.dispatcher.dispatch_checker_scripts,
-            args=(tick,),
-            success="Checker scripts dispatched, took {:.3f} sec",
-            error="Couldn't start checker scripts: {} {}",
-        )
+        self.tick_starts[tick] = ts.timestamp()
+        with component("dispatch"), span("dispatch", tick=tick):
+            log_result_of_execution(
+                "dispatcher",
+                self.dispatcher.dispatch_checker_scripts,
+                args=(tick,),
+                success="Checker scripts dispatched, took {:.3f} sec",
+                error="Couldn't start checker scripts: {} {}",
+            )
+        self._schedule_dispatch_preparation(tick + 1)
         if tick == 1:
             for i, scoreboard in enumerate(self.scoreboards, start=1):
                 log_result_of_execution(
@@ -105,47 +113,100 @@ class DeferredCTFEvents(GenericDeferredCTFEvents):
                     success=f"Scoreboard {i} generated, took {{:.1f}} sec",
                     error=f"Scoreboard {i} failed: {{}} {{}}",
                 )
+        if config.RUNNER.retry.enabled:
+            with span("retry_loop", tick=tick):
+                log_result_of_execution(
+                    "dispatcher",
+                    self.dispatcher.run_retry_loop,
+                    args=(tick,),
+                    error="Retrying checker scripts failed: {} {}",
+                    reraise=False,
+                )
+
+    def _schedule_dispatch_preparation(self, tick: int) -> None:
+        """
+        Prepare the dispatch of the given (next) tick in the second half of the current tick
+        """
+        from controlserver.timer import Timer
+
+        if Timer.tick_start is None or Timer.tick_end is None:
+            return
+        delay = max(0.0, (Timer.tick_start + Timer.tick_end) / 2 - time.time())
+        thread = threading.Timer(
+            delay,
+            log_result_of_execution,
+            args=("dispatcher", self.dispatcher.prepare_checker_scripts),
+            kwargs={"args": (tick,), "error": "Couldn't prepare checker scripts: {} {}", "reraise": False},
+        )
+        thread.daemon = True
+        thread.start()
 
     @override
     def _on_end_tick_deferred(self, tick: int, ts: datetime) -> None:
-        time.sleep(1)
-        log_result_of_execution(
+        """
+        Stages run as soon as their dependencies are done: team info (logos) overlaps with revoke/collect/scoring,
+        all scoreboards are rendered concurrently after scoring. Stage timings go to metric "pipeline_stage".
+        The root span of the tick's trace ends with this pipeline.
+        """
+        graph = TaskGraph("end_of_tick", max_workers=2 + 2 * len(self.scoreboards))
+        graph.add("grace", functools.partial(time.sleep, 1))
+        graph.add("revoke", functools.partial(
+            log_result_of_execution,
             "dispatcher",
             self.dispatcher.revoke_checker_scripts,
             args=(tick,),
             error="Couldn't revoke checker scripts: {} {}",
             reraise=False,
-        )
-        log_result_of_execution(
+        ), after=["grace"])
+        graph.add("collect", functools.partial(
+            log_result_of_execution,
             "dispatcher",
             self.dispatcher.collect_checker_results,
             args=(tick,),
             success="Collected checker script results, took {:.3f} sec",
             error="Couldn't collect checker script results: {} {}",
-        )
-        log_result_of_execution(
+        ), after=["revoke"])
+        graph.add("scoring", functools.partial(
+            log_result_of_execution,
             "scoring",
             self.scoring.scoring_and_ranking,
             args=(tick,),
             success="Ranking calculated, took {:.3f} sec",
             error="Ranking calculation failed: {} {}",
-        )
+        ), after=["collect"])
         for i, scoreboard in enumerate(self.scoreboards, start=1):
+            graph.add(f"team_info_{i}", functools.partial(
+                log_result_of_execution,
+                "scoring",
+                scoreboard.update_team_info,
+                args=(),
+                error=f"Team info for scoreboard {i} failed: {{}} {{}}",
+            ))
+            graph.add(f"scoreboard_{i}", functools.partial(
+                log_result_of_execution,
+                "scoring",
+                scoreboard.create_scoreboard,
+                args=(tick, True, True, False),
+                success=f"Scoreboard {i} generated, took {{:.1f}} sec",
+                error=f"Scoreboard {i} failed: {{}} {{}}",
+            ), after=["scoring", f"team_info_{i}"])
+            graph.add(f"scoreboard_{i}_previous", functools.partial(
+                self._create_missing_scoreboard, i, scoreboard, tick - 1
+            ), after=[f"scoreboard_{i}"])
+        with span("end_of_tick", tick=tick):
+            graph.run(tick=tick)
+        record_tick_span(tick, self.tick_starts.pop(tick, ts.timestamp()), time.time())
+
+    @staticmethod
+    def _create_missing_scoreboard(i: int, scoreboard: Scoreboard, tick: int) -> None:
+        if tick >= 0 and not scoreboard.exists(tick, True):
             log_result_of_execution(
                 "scoring",
                 scoreboard.create_scoreboard,
-                args=(tick, True, True),
+                args=(tick, True, False, False),
                 success=f"Scoreboard {i} generated, took {{:.1f}} sec",
                 error=f"Scoreboard {i} failed: {{}} {{}}",
             )
-            if tick > 0 and not scoreboard.exists(tick - 1, True):
-                log_result_of_execution(
-                    "scoring",
-                    scoreboard.create_scoreboard,
-                    args=(tick - 1, True, False),
-                    success=f"Scoreboard {i} generated, took {{:.1f}} sec",
-                    error=f"Scoreboard {i} failed: {{}} {{}}",
-                )
 
     @override
     def on_start_ctf(self) -> None:
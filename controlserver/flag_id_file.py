@@ -1,22 +1,56 @@
+import gzip
+import hashlib
 import json
+import os
+import re
 import traceback
+from pathlib import Path
 from typing import Any
 
 from controlserver.models import Service, Team
 from gamelib import flag_ids, get_flag_regex
 from saarctf_commons.config import config
+from saarctf_commons.custom_flag_ids import load_custom_flag_ids
 from saarctf_commons.redis import get_redis_connection
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 
 class FlagIDFileGenerator:
+    """
+    Generates attack.json. Flag IDs and their serialized form are cached per (service, team, tick),
+    keep an instance around (like the dispatcher does) and each tick only computes the IDs of the newest tick.
+
+    Additional files for teams that attack only some services:
+    - attack_<service>.json: like attack.json, but only this service's flag IDs (and no team list)
+    - attack_index.json: the service files, and size + sha256 of each file (to skip downloads of unchanged files)
+    All files are replaced atomically and have .gz variants (and .br if the brotli package is installed).
+    """
     FLAG_ID_KEY = "flag_ids"
+    INDEX_FILE = "attack_index.json"
 
-    def generate(self, teams: list[Team], services: list[Service], tick: int) -> dict:
+    def __init__(self) -> None:
+        # (service id, team id, tick, index) => flag ID (missing custom flag IDs are not cached)
+        self._flag_ids: dict[tuple[int, int, int, int], str] = {}
+        # (service id, team id, tick) => '"<tick>": <flag ID(s)>' (only if all flag IDs are known)
+        self._fragments: dict[tuple[int, int, int], bytes] = {}
+        # service id => flag ID types the cached entries have been generated with
+        self._flag_id_types: dict[int, str] = {}
+
+    def _generate_header(self, teams: list[Team] | None) -> dict[str, Any]:
         from controlserver.timer import Timer
 
-        data: dict[str, Any] = {
+        header: dict[str, Any] = {
             "flag_regex": get_flag_regex().pattern,
-            "teams": [
+            "current_tick": Timer.current_tick,
+            "current_tick_start": Timer.tick_start,
+            "current_tick_until": Timer.tick_end,
+        }
+        if teams is not None:
+            header["teams"] = [
                 {
                     "id": team.id,
                     "name": team.name,
@@ -26,55 +60,136 @@ class FlagIDFileGenerator:
                     "online": team.vpn_connected or team.vpn2_connected or team.wg_vulnbox_connected,
                 }
                 for team in teams
-            ],
-            self.FLAG_ID_KEY: {},
-            "current_tick": Timer.current_tick,
-            "current_tick_start": Timer.tick_start,
-            "current_tick_until": Timer.tick_end,
-        }
+            ]
+        return header
 
+    def generate(self, teams: list[Team], services: list[Service], tick: int) -> dict:
+        data = self._generate_header(teams)
+        data[self.FLAG_ID_KEY] = {}
         for service in services:
             if service.flag_ids:
                 data[self.FLAG_ID_KEY][service.name] = self.get_service_flag_ids(service, teams, tick)
-
         return data
 
+    def generate_json(self, teams: list[Team], services: list[Service], tick: int) -> bytes:
+        """
+        Same content as json.dumps(generate(...)), but assembled from cached fragments.
+        """
+        return self.generate_files(teams, services, tick)["attack.json"]
+
+    def generate_files(self, teams: list[Team], services: list[Service], tick: int) -> dict[str, bytes]:
+        """
+        :return: {filename: content} of attack.json, all attack_<service>.json and the index (last)
+        """
+        flag_id_parts = {
+            service.name: json.dumps(service.name).encode() + b': ' + self.get_service_flag_ids_json(service, teams, tick)
+            for service in services if service.flag_ids
+        }
+        self._drop_expired(self._min_tick(tick))
+
+        files = {"attack.json": self._assemble(self._generate_header(teams), list(flag_id_parts.values()))}
+        service_header = self._generate_header(None)
+        service_files = {}
+        for service_name, part in flag_id_parts.items():
+            service_files[service_name] = f'attack_{re.sub(r"[^A-Za-z0-9_-]", "_", service_name)}.json'
+            files[service_files[service_name]] = self._assemble(service_header, [part])
+        index = {
+            "current_tick": service_header["current_tick"],
+            "services": service_files,
+            "files": {fname: {"size": len(content), "sha256": hashlib.sha256(content).hexdigest()} for fname, content in files.items()},
+        }
+        files[self.INDEX_FILE] = json.dumps(index).encode()
+        return files
+
+    def _assemble(self, header: dict[str, Any], flag_id_parts: list[bytes]) -> bytes:
+        return json.dumps(header).encode()[:-1] + b', ' + json.dumps(self.FLAG_ID_KEY).encode() + b': {' + b', '.join(flag_id_parts) + b'}}'
+
+    @staticmethod
+    def _min_tick(latest_tick: int) -> int:
+        return max(1, latest_tick - config.SCORING.flags_rounds_valid)
+
     def get_service_flag_ids(self, service: Service, teams: list[Team], latest_tick: int) -> dict:
         data: dict = {}
-        flag_id_types = service.flag_ids.split(",") if service.flag_ids else []
-        min_tick = max(1, latest_tick - config.SCORING.flags_rounds_valid)
-
-        if "custom" in flag_id_types:
-            custom_flag_ids = self._load_custom_flag_ids(service, min_tick, latest_tick)
-        else:
-            custom_flag_ids = {}
+        flag_id_types = self._get_flag_id_types(service)
+        min_tick = self._min_tick(latest_tick)
+        custom_flag_ids = self._load_missing_custom_flag_ids(service, teams, flag_id_types, range(min_tick, latest_tick))
 
         for team in teams:
             data[team.vulnbox_ip] = {}
             for tick in range(min_tick, latest_tick):
-                ids = [(
-                    custom_flag_ids.get((tick, team.id, i), None)
-                    if flag_id_type == 'custom' else
-                    flag_ids.generate_flag_id(flag_id_type, service.id, team.id, tick, i)
-                ) for i, flag_id_type in enumerate(flag_id_types)]
+                ids = self._get_flag_ids(service, flag_id_types, team.id, tick, custom_flag_ids)
                 if len(ids) == 1:
                     data[team.vulnbox_ip][tick] = ids[0]
                 else:
                     data[team.vulnbox_ip][tick] = ids
         return data
 
+    def get_service_flag_ids_json(self, service: Service, teams: list[Team], latest_tick: int) -> bytes:
+        """
+        :return: json.dumps(get_service_flag_ids(...)), assembled from cached fragments
+        """
+        flag_id_types = self._get_flag_id_types(service)
+        ticks = range(self._min_tick(latest_tick), latest_tick)
+        custom_flag_ids = self._load_missing_custom_flag_ids(service, teams, flag_id_types, ticks)
+
+        team_parts = []
+        for team in teams:
+            tick_parts = []
+            for tick in ticks:
+                fragment = self._fragments.get((service.id, team.id, tick))
+                if fragment is None:
+                    ids = self._get_flag_ids(service, flag_id_types, team.id, tick, custom_flag_ids)
+                    fragment = json.dumps(str(tick)).encode() + b': ' + json.dumps(ids[0] if len(ids) == 1 else ids).encode()
+                    if None not in ids:
+                        self._fragments[(service.id, team.id, tick)] = fragment
+                tick_parts.append(fragment)
+            team_parts.append(json.dumps(team.vulnbox_ip).encode() + b': {' + b', '.join(tick_parts) + b'}')
+        return b'{' + b', '.join(team_parts) + b'}'
+
+    def _get_flag_id_types(self, service: Service) -> list[str]:
+        """
+        :return: the flag ID types of this service. Invalidates the cache for this service if they changed.
+        """
+        if self._flag_id_types.get(service.id) != service.flag_ids:
+            self._flag_ids = {k: v for k, v in self._flag_ids.items() if k[0] != service.id}
+            self._fragments = {k: v for k, v in self._fragments.items() if k[0] != service.id}
+            self._flag_id_types[service.id] = service.flag_ids
+        return service.flag_ids.split(",") if service.flag_ids else []
+
+    def _get_flag_ids(self, service: Service, flag_id_types: list[str], team_id: int, tick: int,
+                      custom_flag_ids: dict[tuple[int, int, int], str]) -> list[str | None]:
+        ids: list[str | None] = []
+        for i, flag_id_type in enumerate(flag_id_types):
+            flag_id: str | None = self._flag_ids.get((service.id, team_id, tick, i))
+            if flag_id is None:
+                if flag_id_type == 'custom':
+                    flag_id = custom_flag_ids.get((tick, team_id, i), None)
+                else:
+                    flag_id = flag_ids.generate_flag_id(flag_id_type, service.id, team_id, tick, i)
+                if flag_id is not None:
+                    self._flag_ids[(service.id, team_id, tick, i)] = flag_id
+            ids.append(flag_id)
+        return ids
+
+    def _drop_expired(self, min_tick: int) -> None:
+        self._flag_ids = {k: v for k, v in self._flag_ids.items() if k[2] >= min_tick}
+        self._fragments = {k: v for k, v in self._fragments.items() if k[2] >= min_tick}
+
     def generate_and_save(self, teams: list[Team], services: list[Service], tick: int) -> None:
         """
         Fill a json file with all (still valid) flag IDs generated before tick.
         Excludes flag IDs from the current tick ("tick") until the tick is over.
         """
-        data = self.generate(teams, services, tick)
+        files = self.generate_files(teams, services, tick)
+        variants = {fname: self._compressed_variants(fname, content) for fname, content in files.items()}
         for path in (config.SCOREBOARD_PATH, config.SCOREBOARD_PATH_INTERNAL):
             if path:
-                # (path / "api" / f"attack_round_{tick}.json").write_text(json.dumps(data))
+                # the index is written last, it must not reference files that are not there yet
+                for fname in files:
+                    for variant_name, content in variants[fname].items():
+                        self._write_atomic(path / "api" / variant_name, content)
                 file_path = path / "api" / "attack.json"
                 alternative_path = path / "attack.json"
-                file_path.write_text(json.dumps(data))
                 if not alternative_path.exists():
                     try:
                         alternative_path.symlink_to(file_path.relative_to(alternative_path.parent))
@@ -82,12 +197,39 @@ class FlagIDFileGenerator:
                         traceback.print_exc()
                         pass
 
-    def _load_custom_flag_ids(self, service: Service, min_tick: int, latest_tick: int) -> dict[tuple[int, int, int], str | None]:
-        result = {}
+    @staticmethod
+    def _compressed_variants(fname: str, content: bytes) -> dict[str, bytes]:
+        """
+        :return: {filename: content}, compressed variants first (nginx: gzip_static / brotli_static)
+        """
+        variants = {fname + '.gz': gzip.compress(content, 6)}
+        if brotli is not None:
+            variants[fname + '.br'] = brotli.compress(content, quality=5)
+        variants[fname] = content
+        return variants
+
+    @staticmethod
+    def _write_atomic(path: Path, content: bytes) -> None:
+        """
+        Clients never see a partially written file
+        """
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+
+    def _load_missing_custom_flag_ids(self, service: Service, teams: list[Team], flag_id_types: list[str],
+                                      ticks: range) -> dict[tuple[int, int, int], str]:
+        """
+        Load custom flag IDs only for ticks that still have uncached ones (the checker of the previous tick might still set them)
+        """
+        if "custom" not in flag_id_types:
+            return {}
+        custom_indices = [i for i, flag_id_type in enumerate(flag_id_types) if flag_id_type == 'custom']
+        missing_ticks = [
+            tick for tick in ticks
+            if any((service.id, team.id, tick, i) not in self._flag_ids for team in teams for i in custom_indices)
+        ]
+        if not missing_ticks:
+            return {}
         with get_redis_connection() as conn:
-            for tick in range(min_tick, latest_tick): # excluding latest = current_tick
-                keys = conn.keys(f"custom_flag_ids:{service.id}:{tick}:*")
-                for k, v in zip(keys, conn.mget(keys)):
-                    _, _, tck, teamid, idx = k.decode().split(":")
-                    result[(int(tck), int(teamid), int(idx))] = v.decode("utf-8") if v else None
-        return result
+            return load_custom_flag_ids(conn, service.id, missing_ticks, [(team.id, i) for team in teams for i in custom_indices])
@@ -1,16 +1,29 @@
 """
 Write messages to the central database log.
+
+With log_buffer enabled, #log only queues the message, a background thread (one per process) writes them in batches
+(one multi-row INSERT per batch). Callers never wait for the database:
+- identical messages (component, title, level) waiting in the same batch are merged into one row ("(5x)" in the title)
+- if max_queue messages are waiting, further messages are dropped. The number of dropped messages is logged with the next batch.
+Pending messages are written at exit (atexit) and by #flush_log_messages.
 """
 
+import atexit
 import datetime
 import logging
+import os
+import threading
 import time
 # import sys
 import traceback
-from typing import Callable, Any, ParamSpec
+from dataclasses import dataclass, field
+from typing import Callable, Any, ClassVar, ParamSpec
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from controlserver.models import LogMessage, db_session_2
+from saarctf_commons.config import config
 from saarctf_commons.db_utils import retry_on_sql_error
 
 P = ParamSpec("P")
@@ -21,7 +34,124 @@ py_logger = logging.getLogger("log_messages")
 def log(component: str, title: str, text: str = '', level: int = LogMessage.INFO) -> None:
     msg = title + ('' if not text else '\n' + text)
     py_logger.log(LogMessage.level_to_python(level), msg)
-    _log(component, title, text, level)
+    _store(component, title, text, level)
+
+
+def _store(component: str, title: str, text: str, level: int) -> None:
+    if config.LOG_BUFFER.enabled:
+        LogBuffer.get().add(component, title, text, level)
+    else:
+        _log(component, title, text, level)
+
+
+@dataclass
+class _PendingMessage:
+    created: datetime.datetime
+    texts: list[str]
+    count: int = 1
+    omitted: int = 0  # texts not kept (beyond max_repeated_texts)
+
+
+class LogBuffer:
+    _instance: ClassVar['LogBuffer | None'] = None
+
+    def __init__(self, max_queue: int, batch_size: int, max_delay: float, max_repeated_texts: int) -> None:
+        self.owner_pid = os.getpid()
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.max_repeated_texts = max_repeated_texts
+        self.dropped = 0
+        self._pending: dict[tuple[str, str, int], _PendingMessage] = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def get(cls) -> 'LogBuffer':
+        if cls._instance is None or cls._instance.owner_pid != os.getpid():
+            cls._instance = LogBuffer(config.LOG_BUFFER.max_queue, config.LOG_BUFFER.batch_size,
+                                      config.LOG_BUFFER.max_delay, config.LOG_BUFFER.max_repeated_texts)
+        return cls._instance
+
+    def add(self, component: str, title: str, text: str = '', level: int = LogMessage.INFO) -> None:
+        """
+        Queue a message, never blocks on the database.
+        """
+        key = (component, title, level)
+        with self._condition:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.count += 1
+                if len(pending.texts) < self.max_repeated_texts:
+                    pending.texts.append(text)
+                else:
+                    pending.omitted += 1
+            elif len(self._pending) >= self.max_queue:
+                self.dropped += 1
+                return
+            else:
+                self._pending[key] = _PendingMessage(datetime.datetime.now(), [text])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='LogBuffer', daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._pending) > 0)
+                if len(self._pending) < self.batch_size:
+                    self._condition.wait(self.max_delay)
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write all pending messages (blocking). Errors are printed, the affected messages are lost.
+        """
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+                dropped, self.dropped = self.dropped, 0
+            rows = [self._to_row(key, message) for key, message in pending.items()]
+            if dropped:
+                rows.append({'component': 'logger', 'title': f'{dropped} log messages dropped (queue full)', 'text': '',
+                             'level': LogMessage.WARNING, 'created': datetime.datetime.now()})
+            for i in range(0, len(rows), self.batch_size):
+                try:
+                    self._write(rows[i:i + self.batch_size])
+                except Exception:
+                    traceback.print_exc()
+
+    @staticmethod
+    def _to_row(key: tuple[str, str, int], message: _PendingMessage) -> dict[str, Any]:
+        component, title, level = key
+        if message.count == 1:
+            return {'component': component, 'title': title, 'text': message.texts[0], 'level': level, 'created': message.created}
+        texts = [text for text in message.texts if text]
+        if message.omitted:
+            texts.append(f'... ({message.omitted} more)')
+        return {'component': component, 'title': f'{title} ({message.count}x)', 'text': '\n'.join(texts), 'level': level,
+                'created': message.created}
+
+    @staticmethod
+    @retry_on_sql_error(attempts=2)
+    def _write(rows: list[dict[str, Any]]) -> None:
+        with db_session_2() as session:
+            session.execute(insert(LogMessage).values(rows))
+            session.commit()
+
+
+def flush_log_messages() -> None:
+    """
+    Write all messages queued by this process
+    """
+    if LogBuffer._instance is not None and LogBuffer._instance.owner_pid == os.getpid():
+        LogBuffer._instance.flush()
+
+
+atexit.register(flush_log_messages)
 
 
 @retry_on_sql_error(attempts=2)
@@ -64,7 +194,7 @@ def log_exception(component: str, e: Exception, errormessage: str = '{}: {}') ->
     stacktrace = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
     # print(stacktrace, file=sys.stderr)
     py_logger.exception(msg, exc_info=e)
-    _log(component, msg, stacktrace, level=LogMessage.ERROR)
+    _store(component, msg, stacktrace, LogMessage.ERROR)
 
 
 def log_result_of_execution(component: str, function: Callable[P, Any], args: P.args = (),  # type: ignore[valid-type]
@@ -10,11 +10,15 @@ from controlserver.timer import init_timer, run_master_timer
 from saarctf_commons.config import load_default_config, config
 from saarctf_commons.redis import NamedRedisConnection
 from saarctf_commons.logging_utils import setup_script_logging
+from saarctf_commons.metric_utils import setup_default_metrics
+from saarctf_commons.prometheus_utils import setup_prometheus
 
 if __name__ == "__main__":
     load_default_config()
     config.validate()
     setup_script_logging("timer")
+    setup_default_metrics()
+    setup_prometheus("timer")
     NamedRedisConnection.set_clientname("timer", True)
     init_database()
     init_timer(True)
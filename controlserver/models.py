@@ -14,7 +14,7 @@ from typing import Dict, Any, List
 from flask import Flask, g
 from sqlalchemy import func, UniqueConstraint, ForeignKey, inspect, text, create_engine, Column, Integer, \
     String, LargeBinary, TIMESTAMP, \
-    SmallInteger, BigInteger, Float, Boolean, JSON
+    SmallInteger, BigInteger, Float, Boolean, JSON, ForeignKeyConstraint
 from sqlalchemy.dialects.postgresql import insert, Insert
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import relationship, scoped_session, sessionmaker, Query, Session, DeclarativeBase, Mapped
@@ -23,7 +23,9 @@ import io
 
 from sqlalchemy.orm._orm_constructors import mapped_column
 
+from saarctf_commons.compression import compress_text, decompress_text, truncate_text
 from saarctf_commons.config import config
+from saarctf_commons.sql_profiling import SqlProfiler
 
 
 class Base(DeclarativeBase):
@@ -56,6 +58,7 @@ def init_database(app: Flask | None = None) -> None:
     Database.db_engine = engine
     Database.db_session_factory = session_factory
     Database.db_session = session
+    SqlProfiler.setup()
 
     if app:
         g.db_engine = engine
@@ -520,7 +523,6 @@ class CheckerResult(Base, ModelMixin):
     message = mapped_column(String, nullable=True, server_default=text("NULL"))
     time = mapped_column(Float, nullable=True, server_default=text("NULL"))
     celery_id = mapped_column(String(40), nullable=False)
-    output = mapped_column(String, nullable=True, server_default=text("NULL"))
     finished = mapped_column(TIMESTAMP(timezone=True), nullable=True, server_default=text("NULL"))
     data = mapped_column(JSON, nullable=True, server_default=text("NULL"))
     # true if the task finished, but was too late (already revoked)
@@ -540,10 +542,26 @@ class CheckerResult(Base, ModelMixin):
 
     team = relationship("Team")
     service = relationship("Service")
+    # the (large) output lives in its own table, loaded only if accessed
+    output_row = relationship("CheckerResultOutput", uselist=False, viewonly=True)
 
     if typing.TYPE_CHECKING:
         query: "Query[CheckerResult]"
 
+    @property
+    def output(self) -> str | None:
+        """
+        The (possibly truncated) output of the checker script. Set before saving, loaded from checker_result_outputs otherwise.
+        """
+        if '_output' in self.__dict__:
+            return self.__dict__['_output']
+        row = self.output_row
+        return row.text if row is not None else None
+
+    @output.setter
+    def output(self, value: str | None) -> None:
+        self.__dict__['_output'] = value
+
     def props_dict(self) -> dict[str, Any]:
         return {
             "tick": self.tick,
@@ -553,12 +571,17 @@ class CheckerResult(Base, ModelMixin):
             "message": self.message,
             "time": self.time,
             "celery_id": self.celery_id,
-            "output": self.output,
             "run_over_time": self.run_over_time or False,
             "finished": self.finished,
             "data": self.data,
         }
 
+    def output_props_dict(self) -> dict[str, Any]:
+        """
+        Usage: db_session().execute(CheckerResultOutput.upsert().values(instance.output_props_dict())), after the result itself
+        """
+        return CheckerResultOutput.props_dict_for(self.tick, self.team_id, self.service_id, self.output)
+
     @classmethod
     def upsert(cls, entry: "CheckerResult| None" = None) -> Insert:
         """
@@ -571,7 +594,6 @@ class CheckerResult(Base, ModelMixin):
             "message": stmt.excluded.message,
             "time": stmt.excluded.time,
             "celery_id": stmt.excluded.celery_id,
-            "output": stmt.excluded.output,
             "data": stmt.excluded.data,
         }
         if entry and entry.run_over_time is not None:
@@ -584,6 +606,138 @@ class CheckerResult(Base, ModelMixin):
         return stmt
 
 
+class CheckerResultOutput(Base, ModelMixin):
+    """
+    Output of a checkerscript invocation, stored apart from CheckerResult (queries on results stay small).
+    Long outputs keep only head and tail, and are compressed.
+    """
+
+    __tablename__ = "checker_result_outputs"
+    tick = mapped_column(Integer, primary_key=True)
+    team_id = mapped_column(SmallInteger, primary_key=True)
+    service_id = mapped_column(SmallInteger, primary_key=True)
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ['tick', 'team_id', 'service_id'],
+            ['checker_results.tick', 'checker_results.team_id', 'checker_results.service_id'],
+            ondelete="CASCADE"
+        ),
+    )
+    codec = mapped_column(String(8), nullable=False)
+    size = mapped_column(Integer, nullable=False)  # length of the original output (before truncation)
+    content = mapped_column(LargeBinary, nullable=True)  # NULL if there was no output
+
+    HEAD_SIZE = 64 * 1024
+    TAIL_SIZE = 192 * 1024
+
+    if typing.TYPE_CHECKING:
+        query: "Query[CheckerResultOutput]"
+
+    def __str__(self) -> str:
+        return f'CheckerResultOutput<tick={self.tick}, team_id={self.team_id}, service_id={self.service_id}, size={self.size}>'
+
+    @property
+    def text(self) -> str | None:
+        if self.content is None:
+            return None
+        return decompress_text(self.codec, self.content)
+
+    @classmethod
+    def props_dict_for(cls, tick: int, team_id: int, service_id: int, output: str | None) -> dict[str, Any]:
+        if output is None:
+            codec, content = 'plain', None
+        else:
+            codec, content = compress_text(truncate_text(output, cls.HEAD_SIZE, cls.TAIL_SIZE))
+        return {
+            "tick": tick,
+            "team_id": team_id,
+            "service_id": service_id,
+            "codec": codec,
+            "size": len(output) if output is not None else 0,
+            "content": content,
+        }
+
+    @classmethod
+    def upsert(cls) -> Insert:
+        stmt = insert(CheckerResultOutput)
+        return stmt.on_conflict_do_update(
+            index_elements=[cls.tick, cls.team_id, cls.service_id],
+            set_={"codec": stmt.excluded.codec, "size": stmt.excluded.size, "content": stmt.excluded.content}
+        )
+
+
+class CheckerTickSummary(Base, ModelMixin):
+    """
+    Aggregated checker results per tick and service, maintained by the dispatcher (collect_checker_results)
+    and read by the checker status pages. Backfill: scripts/backfill_checker_summary.py
+    """
+
+    __tablename__ = "checker_tick_summary"
+    tick = mapped_column(Integer, primary_key=True)
+    service_id = mapped_column(SmallInteger, ForeignKey('services.id', ondelete="CASCADE"), primary_key=True)
+    results = mapped_column(Integer, nullable=False)
+    status_counts = mapped_column(JSON, nullable=False)  # status => count
+    late_counts = mapped_column(JSON, nullable=False)  # status => count of results with run_over_time
+    time_count = mapped_column(Integer, nullable=False)  # results with execution time
+    time_min = mapped_column(Float, nullable=True)
+    time_avg = mapped_column(Float, nullable=True)
+    time_max = mapped_column(Float, nullable=True)
+    last_finished = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    if typing.TYPE_CHECKING:
+        query: "Query[CheckerTickSummary]"
+
+    @property
+    def time_sum(self) -> float:
+        return (self.time_avg or 0.0) * self.time_count
+
+    @classmethod
+    def compute(cls, session: Session | scoped_session, tick: int) -> list["CheckerTickSummary"]:
+        """
+        :return: the (unsaved) summaries of a tick, one query on checker_results
+        """
+        rows = session.query(CheckerResult.service_id, CheckerResult.status, CheckerResult.run_over_time, func.count(),
+                             func.count(CheckerResult.time), func.sum(CheckerResult.time), func.min(CheckerResult.time),
+                             func.max(CheckerResult.time), func.max(CheckerResult.finished)) \
+            .filter(CheckerResult.tick == tick) \
+            .group_by(CheckerResult.service_id, CheckerResult.status, CheckerResult.run_over_time).all()
+        summaries: dict[int, CheckerTickSummary] = {}
+        time_sums: dict[int, float] = {}
+        for service_id, status, run_over_time, count, time_count, time_sum, time_min, time_max, finished in rows:
+            summary = summaries.get(service_id)
+            if summary is None:
+                summary = summaries[service_id] = CheckerTickSummary(
+                    tick=tick, service_id=service_id, results=0, status_counts={}, late_counts={}, time_count=0
+                )
+                time_sums[service_id] = 0.0
+            summary.results += count
+            summary.status_counts[status] = summary.status_counts.get(status, 0) + count
+            if run_over_time:
+                summary.late_counts[status] = summary.late_counts.get(status, 0) + count
+            if time_count:
+                summary.time_count += time_count
+                time_sums[service_id] += time_sum
+                summary.time_min = time_min if summary.time_min is None else min(summary.time_min, time_min)
+                summary.time_max = time_max if summary.time_max is None else max(summary.time_max, time_max)
+            if finished is not None and (summary.last_finished is None or finished > summary.last_finished):
+                summary.last_finished = finished
+        for service_id, summary in summaries.items():
+            if summary.time_count:
+                summary.time_avg = time_sums[service_id] / summary.time_count
+        return list(summaries.values())
+
+    @classmethod
+    def update(cls, session: Session, tick: int) -> list["CheckerTickSummary"]:
+        """
+        Recompute the summaries of a tick (caller commits)
+        """
+        summaries = cls.compute(session, tick)
+        session.query(CheckerTickSummary).filter(CheckerTickSummary.tick == tick).delete()
+        session.add_all(summaries)
+        session.flush()
+        return summaries
+
+
 class CheckerResultLite:
     def __init__(self, team_id: int, service_id: int, tick: int, status: str, run_over_time: bool = False,
                  message: str = '') -> None:
@@ -4,6 +4,7 @@ Write the scoreboard to disk.
 
 import os
 import shutil
+import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from contextlib import contextmanager
@@ -28,6 +29,7 @@ from controlserver.models import (
 from controlserver.scoring.scoring import ScoringCalculation
 from saarctf_commons.config import config
 from saarctf_commons.db_utils import retry_on_sql_error
+from saarctf_commons.prometheus_utils import SCOREBOARD_SECONDS
 from saarctf_commons.redis import get_redis_connection
 
 try:
@@ -309,14 +311,16 @@ class Scoreboard:
             session.expunge_all()
 
     @retry_on_sql_error(attempts=3)
-    def create_scoreboard(self, ticknumber: int, has_started: bool = True, is_live: bool = False) -> None:
+    def create_scoreboard(self, ticknumber: int, has_started: bool = True, is_live: bool = False, team_info: bool = True) -> None:
         """
         Write the scoreboard as it is AFTER a given tick
         :param ticknumber:
         :param has_started: True if the game already started. If False, service names will be hidden (by informal tick -1)
         :param is_live: True if that's the most recent tick
+        :param team_info: False if logos and team list are written separately (#update_team_info)
         :return:
         """
+        start = time.monotonic()
         self.__update_team_service_list()
         if ticknumber == 0 and not has_started:
             ticknumber = -1
@@ -341,8 +345,9 @@ class Scoreboard:
         self.check_scoreboard_prepared()
         # render ALL the templates here
         # main scoreboard
-        self.__create_logos()
-        self.__create_team_json()
+        if team_info:
+            self.__create_logos()
+            self.__create_team_json()
         prev_info = previous_info if not frozen_previous_info else frozen_previous_info
         self.__create_json_for_tick(info, prev_info, last_checker_results, scoreboard_is_frozen)
         self.__create_json_for_teams(info, prev_info, scoreboard_is_frozen)
@@ -350,6 +355,7 @@ class Scoreboard:
 
         if is_live:
             self.__create_tick_info_json(info.ticknumber)
+        SCOREBOARD_SECONDS.labels('public' if self.public else 'internal').observe(time.monotonic() - start)
 
     def __create_tick_info_json(self, scoreboard_tick: int | None) -> int:
         """
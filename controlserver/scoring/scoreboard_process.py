@@ -8,6 +8,7 @@ from controlserver.scoring.scoreboard import run_scoreboard_generator
 from controlserver.timer import init_slave_timer
 from saarctf_commons.config import load_default_config, config
 from saarctf_commons.logging_utils import setup_script_logging
+from saarctf_commons.prometheus_utils import setup_prometheus
 from saarctf_commons.redis import NamedRedisConnection
 
 if __name__ == "__main__":
@@ -15,6 +16,7 @@ if __name__ == "__main__":
     config.set_script()
     setup_script_logging("scoreboard")
     NamedRedisConnection.set_clientname("scoreboard", True)
+    setup_prometheus("scoreboard")
     init_database()
     init_slave_timer()
     try:
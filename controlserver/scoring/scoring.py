@@ -28,7 +28,7 @@ from collections import defaultdict
 from typing import Sequence
 
 from sqlalchemy import func, distinct, and_, text
-from sqlalchemy.orm import defer, Session, aliased
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy.sql.functions import count
 
 from controlserver.logger import log_to_session
@@ -55,6 +55,7 @@ from controlserver.scoring.algorithms.algorithm import (
 from controlserver.scoring.algorithms.factory import ScoreAlgorithmFactory, FirstBloodAlgorithmFactory
 from saarctf_commons.config import ScoringConfig
 from saarctf_commons.db_utils import retry_on_sql_error
+from saarctf_commons.prometheus_utils import SCORING_SECONDS
 
 
 class ScoringCalculation:
@@ -74,6 +75,7 @@ class ScoringCalculation:
     def get_considered_services(self, session: Session) -> list[Service]:
         return list(session.query(Service).order_by(Service.id).all())
 
+    @SCORING_SECONDS.time()
     def scoring_and_ranking(self, tick: int) -> None:
         self.calculate_scoring_for_tick(tick)
         self.calculate_ranking_per_tick(tick)
@@ -143,8 +145,7 @@ class ScoringCalculation:
         # TODO queries
         if tick <= 0:
             return defaultdict(lambda: CheckerResult(tick=tick, status='REVOKED'))
-        checker_results: list[CheckerResult] = session.query(CheckerResult).filter(CheckerResult.tick == tick) \
-            .options(defer(CheckerResult.output)).all()
+        checker_results: list[CheckerResult] = session.query(CheckerResult).filter(CheckerResult.tick == tick).all()
         result: dict[TeamServicePair, CheckerResult] = defaultdict(
             lambda: CheckerResult(tick=tick, status='REVOKED')
         )
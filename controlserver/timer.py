@@ -11,12 +11,19 @@ You can listen to all events emitted by this timer using:
 - CTFEvents interface (events.py)
 - Redis messages (subscribe "timing:*")
 
+The master publishes its whole state as one versioned snapshot (hash "timing:snapshot", JSON message on channel "timing:snapshot"),
+written in a single MULTI/EXEC together with the legacy keys/channels (one per field, "timing:currentRound" etc.).
+Versions are assigned from the stored snapshot (WATCH), scripts publishing a snapshot never reuse a version of the master.
+Slaves apply snapshots at once. Legacy messages (for example commands from slaves) are still processed.
+
 """
 
+import json
 import threading
 import time
 from abc import ABC, abstractmethod
 from enum import IntEnum
+from typing import Callable
 
 from redis import Redis, StrictRedis, client
 
@@ -34,11 +41,17 @@ class CTFState(IntEnum):
 
 
 def to_int(x: int | str | bytes | None) -> int | None:
-    if not x or x == b"None":
+    if not x or x == b"None" or x == "None":
         return None
     return int(x)
 
 
+SNAPSHOT_KEY = "timing:snapshot"
+# state fields, legacy key / channel: "timing:<field>"
+TIMER_FIELDS = ["state", "desiredState", "currentRound", "roundStart", "roundEnd", "roundTime", "stopAfterRound", "startAt",
+                "openVulnboxAccessAt"]
+
+
 def redis_set_and_publish(key: str, value: str | bytes | int | None, redis: StrictRedis | None = None) -> None:
     if value is None:
         value = b"None"
@@ -49,6 +62,48 @@ def redis_set_and_publish(key: str, value: str | bytes | int | None, redis: Stri
     redis.publish(key, value)
 
 
+def write_snapshot(snapshot: dict[str, str], fields: list[str] = TIMER_FIELDS,
+                   extra: Callable[[client.Pipeline], None] | None = None) -> dict[str, str]:
+    """
+    Write a snapshot (hash + message) and the legacy keys/channels of the given fields in one MULTI/EXEC,
+    slaves get the snapshot first. The version is assigned here: stored version + 1, the hash is WATCHed,
+    so that two writers (master and a script) never publish the same version.
+    :param extra: adds more commands to the same transaction
+    :return: the snapshot, with its new version
+    """
+
+    def transaction(pipe: client.Pipeline) -> None:
+        snapshot["version"] = str(int(pipe.hget(SNAPSHOT_KEY, "version") or 0) + 1)  # type: ignore[arg-type]
+        pipe.multi()
+        pipe.hset(SNAPSHOT_KEY, mapping=snapshot)  # type: ignore[arg-type]
+        pipe.publish(SNAPSHOT_KEY, json.dumps(snapshot))
+        for field in fields:
+            redis_set_and_publish(f"timing:{field}", snapshot[field], pipe)  # type: ignore[arg-type]
+        if extra:
+            extra(pipe)
+
+    get_redis_connection().transaction(transaction, SNAPSHOT_KEY)
+    return snapshot
+
+
+def publish_timer_state(**updates: str | int | None) -> dict[str, str]:
+    """
+    Change the timer state from outside of the master timer (scripts, tests).
+    The updates are merged into the stored state (snapshot, or legacy keys) and published as the next snapshot version,
+    together with the legacy keys/channels of the updated fields, in one MULTI/EXEC.
+    :param updates: field name => value, see TIMER_FIELDS
+    :return: the new snapshot
+    """
+    timer = CTFTimerSlave()
+    timer.init_from_redis()
+    snapshot = timer.get_snapshot()
+    for field, value in updates.items():
+        if field not in TIMER_FIELDS:
+            raise ValueError(f"Unknown timer field: {field}")
+        snapshot[field] = str(value)
+    return write_snapshot(snapshot, list(updates))
+
+
 class CTFTimerBase(ABC):
     def __init__(self) -> None:
         self.initialized = False
@@ -63,6 +118,7 @@ class CTFTimerBase(ABC):
         self._open_vulnbox_access_at: int | None = None
         self.redis_pubsub: client.PubSub | None = None
         self.listener: list[CTFEvents] = []
+        self._snapshot_version: int = 0
 
     @property
     def current_tick(self) -> int:
@@ -146,8 +202,51 @@ class CTFTimerBase(ABC):
         self._start_at = to_int(start_at)
         self._open_vulnbox_access_at = to_int(open_vulnbox_access_at)
 
+    def get_snapshot(self) -> dict[str, str]:
+        """
+        :return: the state of this timer, in the format of the "timing:snapshot" hash
+        """
+        values: dict[str, str | int | None] = {
+            "version": self._snapshot_version,
+            "state": self.state.name,
+            "desiredState": self.desired_state.name,
+            "currentRound": self._current_tick,
+            "roundStart": self._tick_start,
+            "roundEnd": self._tick_end,
+            "roundTime": self._tick_time,
+            "stopAfterRound": self._stop_after_tick,
+            "startAt": self._start_at,
+            "openVulnboxAccessAt": self._open_vulnbox_access_at,
+        }
+        return {k: str(v) for k, v in values.items()}
+
+    def apply_snapshot(self, snapshot: dict[str, str] | dict[bytes, bytes]) -> bool:
+        """
+        Replace the whole state with a snapshot (unless it is the version we already have)
+        :return: True if the snapshot has been applied
+        """
+        values = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v) for k, v in snapshot.items()}
+        version = int(values.get("version", 0))
+        if "state" not in values or version == self._snapshot_version:
+            return False
+        self.init(
+            state=values["state"],
+            desired_state=values["desiredState"],
+            current_tick=values["currentRound"],
+            tick_start=values["roundStart"],
+            tick_end=values["roundEnd"],
+            tick_time=values["roundTime"],
+            stop_after_tick=values["stopAfterRound"],
+            start_at=values["startAt"],
+            open_vulnbox_access_at=values["openVulnboxAccessAt"],
+        )
+        self._snapshot_version = version
+        return True
+
     def init_from_redis(self) -> None:
         redis = get_redis_connection()
+        if self.apply_snapshot(redis.hgetall(SNAPSHOT_KEY)):
+            return
         self.init(
             state=redis.get("timing:state"),  # type: ignore
             desired_state=redis.get("timing:desiredState"),  # type: ignore
@@ -164,7 +263,9 @@ class CTFTimerBase(ABC):
         for item in self.redis_pubsub.listen():  # type: ignore
             if item["type"] == "message":
                 # print('Redis message:', item)
-                if item["channel"] == b"timing:state":
+                if item["channel"] == SNAPSHOT_KEY.encode():
+                    self.apply_snapshot(json.loads(item["data"]))
+                elif item["channel"] == b"timing:state":
                     self.state = CTFState[item["data"].decode("utf-8")]
                 elif item["channel"] == b"timing:desiredState":
                     self.desired_state = CTFState[item["data"].decode("utf-8")]
@@ -186,17 +287,7 @@ class CTFTimerBase(ABC):
     def bind_to_redis(self) -> None:
         redis: StrictRedis = get_redis_connection()
         self.redis_pubsub = redis.pubsub()
-        self.redis_pubsub.subscribe(
-            "timing:state",
-            "timing:desiredState",
-            "timing:currentRound",
-            "timing:roundStart",
-            "timing:roundEnd",
-            "timing:roundTime",
-            "timing:stopAfterRound",
-            "timing:startAt",
-            "timing:openVulnboxAccessAt",
-        )
+        self.redis_pubsub.subscribe(SNAPSHOT_KEY, *(f"timing:{field}" for field in TIMER_FIELDS))
         thread = threading.Thread(
             target=self.__listen_for_redis_events,
             name="Timer-Redis-Listener",
@@ -333,17 +424,9 @@ class CTFTimer(CTFTimerBase):
 
     @override
     def on_update_times(self) -> None:
-        redis = get_redis_connection()
-        redis_set_and_publish("timing:state", self.state.name, redis)
-        redis_set_and_publish("timing:desiredState", self.desired_state.name, redis)
-        redis_set_and_publish("timing:currentRound", self._current_tick, redis)
-        redis_set_and_publish("timing:roundStart", self._tick_start, redis)
-        redis_set_and_publish("timing:roundEnd", self._tick_end, redis)
-        redis_set_and_publish("timing:roundTime", self._tick_time, redis)
-        redis_set_and_publish("timing:stopAfterRound", self._stop_after_tick, redis)
-        redis_set_and_publish("timing:startAt", self._start_at, redis)
-        redis_set_and_publish("timing:openVulnboxAccessAt", self._open_vulnbox_access_at, redis)
-        self.update_tick_times(redis)
+        # one transaction, slaves get the snapshot before the legacy messages
+        snapshot = write_snapshot(self.get_snapshot(), extra=self.update_tick_times)
+        self._snapshot_version = int(snapshot["version"])
         for l in self.listener:
             l.on_update_times()
 
@@ -439,16 +522,14 @@ class CTFTimerMock(CTFTimerBase):
     @current_tick.setter
     def current_tick(self, tick: int) -> None:
         self._current_tick = tick
-        redis_set_and_publish("timing:currentRound", self._current_tick)
+        publish_timer_state(currentRound=self._current_tick)
 
     @override
     def on_update_times(self) -> None:
         pass
 
     def update_redis(self) -> None:
-        redis_set_and_publish("timing:state", self.state.name)
-        redis_set_and_publish("timing:desiredState", self.desired_state.name)
-        redis_set_and_publish("timing:currentRound", self._current_tick)
+        publish_timer_state(state=self.state.name, desiredState=self.desired_state.name, currentRound=self._current_tick)
 
 
 # Singleton CTFTimer instance, and default listeners (either master=self-counting or slave=getting state from redis)
@@ -0,0 +1,108 @@
+"""
+Run a set of interdependent steps on a thread pool.
+
+Each stage starts as soon as all stages it depends on have finished, independent stages overlap.
+If a stage raises, the stages depending on it are skipped (others continue).
+Start, end and duration of every stage are reported to Metrics (metric "pipeline_stage", attributes pipeline and stage),
+the whole run as metric "pipeline".
+Stages run in a copy of the caller's context (current trace span, component), each stage is traced as a span.
+"""
+
+import contextvars
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Any
+
+from saarctf_commons.metric_utils import Metrics, Value
+from saarctf_commons.prometheus_utils import PIPELINE_STAGE_SECONDS, component
+from saarctf_commons.tracing import span
+
+
+@dataclass
+class Stage:
+    name: str
+    function: Callable[[], Any]
+    after: list[str]
+    start: float | None = None
+    end: float | None = None
+    status: str = 'pending'  # pending / running / success / failed / skipped
+    error: BaseException | None = field(default=None, repr=False)
+
+    @property
+    def duration(self) -> float | None:
+        return self.end - self.start if self.start is not None and self.end is not None else None
+
+
+class TaskGraph:
+    def __init__(self, name: str, max_workers: int = 4) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.stages: dict[str, Stage] = {}
+
+    def add(self, name: str, function: Callable[[], Any], after: list[str] | None = None) -> str:
+        """
+        :param function: called without arguments
+        :param after: names of the stages that must have finished successfully before this one starts (added before)
+        :return: name
+        """
+        if name in self.stages:
+            raise ValueError(f'Duplicate stage {name}')
+        for dependency in after or []:
+            if dependency not in self.stages:
+                raise ValueError(f'Stage {name} depends on unknown stage {dependency}')
+        self.stages[name] = Stage(name, function, list(after or []))
+        return name
+
+    def run(self, **values: Value) -> dict[str, Stage]:
+        """
+        Execute all stages, returns when all stages are finished or skipped.
+        :param values: additional values for the reported metrics (for example: tick)
+        :return: all stages (with status and timing)
+        """
+        start = time.time()
+        running: dict[Future, Stage] = {}
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name) as pool:
+            while True:
+                for stage in self.stages.values():
+                    if stage.status != 'pending':
+                        continue
+                    dependencies = [self.stages[dependency].status for dependency in stage.after]
+                    if any(status in ('failed', 'skipped') for status in dependencies):
+                        stage.status = 'skipped'
+                    elif all(status == 'success' for status in dependencies):
+                        stage.status = 'running'
+                        running[pool.submit(contextvars.copy_context().run, self._run_stage, stage)] = stage
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    stage.status = 'failed' if stage.error else 'success'
+                    self._report(stage, values)
+        if Metrics.is_initialized():
+            Metrics.record_many('pipeline', {'duration': time.time() - start, **values}, pipeline=self.name)
+        return self.stages
+
+    @staticmethod
+    def _run_stage(stage: Stage) -> None:
+        stage.start = time.time()
+        try:
+            with component(stage.name), span(stage.name):  # attribute SQL statements / redis commands to this stage
+                stage.function()
+        except BaseException as e:
+            stage.error = e
+            traceback.print_exc()
+        finally:
+            stage.end = time.time()
+
+    def _report(self, stage: Stage, values: dict[str, Value]) -> None:
+        if stage.start is None or stage.end is None:
+            return
+        PIPELINE_STAGE_SECONDS.labels(self.name, stage.name).observe(stage.end - stage.start)
+        if not Metrics.is_initialized():
+            return
+        Metrics.record_many('pipeline_stage', {
+            'start': stage.start, 'end': stage.end, 'duration': stage.end - stage.start, 'success': stage.status == 'success', **values
+        }, ts=stage.end, pipeline=self.name, stage=stage.name)
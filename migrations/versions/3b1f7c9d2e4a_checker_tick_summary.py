@@ -0,0 +1,37 @@
+"""checker tick summary
+
+Revision ID: 3b1f7c9d2e4a
+Revises: 8cd6509e870d
+Create Date: 2026-10-19 15:12:37.520913
+
+Run "python3 scripts/backfill_checker_summary.py" afterwards to summarize the ticks played before.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3b1f7c9d2e4a'
+down_revision = '8cd6509e870d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('checker_tick_summary',
+                    sa.Column('tick', sa.Integer(), nullable=False),
+                    sa.Column('service_id', sa.SmallInteger(), nullable=False),
+                    sa.Column('results', sa.Integer(), nullable=False),
+                    sa.Column('status_counts', sa.JSON(), nullable=False),
+                    sa.Column('late_counts', sa.JSON(), nullable=False),
+                    sa.Column('time_count', sa.Integer(), nullable=False),
+                    sa.Column('time_min', sa.Float(), nullable=True),
+                    sa.Column('time_avg', sa.Float(), nullable=True),
+                    sa.Column('time_max', sa.Float(), nullable=True),
+                    sa.Column('last_finished', sa.TIMESTAMP(timezone=True), nullable=True),
+                    sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('tick', 'service_id')
+                    )
+
+
+def downgrade():
+    op.drop_table('checker_tick_summary')
@@ -0,0 +1,82 @@
+"""checker output in separate table
+
+Revision ID: 8cd6509e870d
+Revises: ca2c4a596673
+Create Date: 2026-10-19 14:02:51.402114
+
+Existing output is moved in batches (truncated + compressed).
+Postgres does not shrink checker_results on DROP COLUMN - run "VACUUM FULL checker_results" afterwards to reclaim the space.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from saarctf_commons.compression import compress_text, decompress_text, truncate_text
+
+# revision identifiers, used by Alembic.
+revision = '8cd6509e870d'
+down_revision = 'ca2c4a596673'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+# keep in sync with CheckerResultOutput
+HEAD_SIZE = 64 * 1024
+TAIL_SIZE = 192 * 1024
+
+
+def upgrade():
+    op.create_table('checker_result_outputs',
+                    sa.Column('tick', sa.Integer(), nullable=False),
+                    sa.Column('team_id', sa.SmallInteger(), nullable=False),
+                    sa.Column('service_id', sa.SmallInteger(), nullable=False),
+                    sa.Column('codec', sa.String(length=8), nullable=False),
+                    sa.Column('size', sa.Integer(), nullable=False),
+                    sa.Column('content', sa.LargeBinary(), nullable=True),
+                    sa.ForeignKeyConstraint(['tick', 'team_id', 'service_id'],
+                                            ['checker_results.tick', 'checker_results.team_id', 'checker_results.service_id'],
+                                            ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('tick', 'team_id', 'service_id')
+                    )
+
+    conn = op.get_bind()
+    insert = sa.text('INSERT INTO checker_result_outputs (tick, team_id, service_id, codec, size, content) '
+                     'VALUES (:tick, :team_id, :service_id, :codec, :size, :content)')
+    last_id = 0
+    while True:
+        rows = conn.execute(sa.text(
+            'SELECT id, tick, team_id, service_id, output FROM checker_results '
+            'WHERE id > :last_id AND output IS NOT NULL ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).all()
+        if not rows:
+            break
+        values = []
+        for row_id, tick, team_id, service_id, output in rows:
+            codec, content = compress_text(truncate_text(output, HEAD_SIZE, TAIL_SIZE))
+            values.append({'tick': tick, 'team_id': team_id, 'service_id': service_id,
+                           'codec': codec, 'size': len(output), 'content': content})
+        conn.execute(insert, values)
+        last_id = rows[-1][0]
+
+    op.drop_column('checker_results', 'output')
+
+
+def downgrade():
+    op.add_column('checker_results', sa.Column('output', sa.String(), server_default=sa.text('NULL'), nullable=True))
+
+    conn = op.get_bind()
+    update = sa.text('UPDATE checker_results SET output = :output '
+                     'WHERE tick = :tick AND team_id = :team_id AND service_id = :service_id')
+    last_key = (-1, -1, -1)
+    while True:
+        rows = conn.execute(sa.text(
+            'SELECT tick, team_id, service_id, codec, content FROM checker_result_outputs '
+            'WHERE (tick, team_id, service_id) > (:tick, :team_id, :service_id) AND content IS NOT NULL '
+            'ORDER BY tick, team_id, service_id LIMIT :limit'
+        ), {'tick': last_key[0], 'team_id': last_key[1], 'service_id': last_key[2], 'limit': BATCH_SIZE}).all()
+        if not rows:
+            break
+        conn.execute(update, [{'tick': tick, 'team_id': team_id, 'service_id': service_id, 'output': decompress_text(codec, content)}
+                              for tick, team_id, service_id, codec, content in rows])
+        last_key = tuple(rows[-1][:3])
+
+    op.drop_table('checker_result_outputs')
@@ -0,0 +1,50 @@
+"""
+Compact storage of large texts (like checker output): head/tail truncation and compression.
+Compressed with zstandard if installed, zlib otherwise. The codec is stored next to the data.
+"""
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_PLAIN = 'plain'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+
+def truncate_text(text: str, head: int, tail: int) -> str:
+    """
+    Keep the first <head> and the last <tail> characters of a text, with a marker in between.
+    """
+    if len(text) <= head + tail:
+        return text
+    skipped = len(text) - head - tail
+    return f'{text[:head]}\n\n[... {skipped} characters truncated ...]\n\n{text[len(text) - tail:]}'
+
+
+def compress_text(text: str) -> tuple[str, bytes]:
+    """
+    :return: (codec, compressed data)
+    """
+    data = text.encode('utf-8', errors='replace')
+    if len(data) < 128:
+        return CODEC_PLAIN, data
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=3).compress(data)
+    return CODEC_ZLIB, zlib.compress(data, 6)
+
+
+def decompress_text(codec: str, data: bytes | memoryview) -> str:
+    raw = bytes(data)  # drivers might return memoryview
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise Exception('Data is compressed with zstd, but package "zstandard" is not installed')
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(raw)
+    elif codec != CODEC_PLAIN:
+        raise ValueError(f'Unknown codec {codec!r}')
+    return raw.decode('utf-8', errors='replace')
@@ -40,14 +40,14 @@ class ConfigSection:
     @classmethod
     def from_dict(cls, d: dict) -> Self:
         for f in fields(cls):
-            if f.name in d and issubclass(f.type, ConfigSection):  # type: ignore
+            if f.name in d and isinstance(f.type, type) and issubclass(f.type, ConfigSection):
                 d[f.name] = f.type.from_dict(d[f.name])  # type: ignore
         return cls(**d)
 
     def to_dict(self) -> dict[str, Any]:
         d = {}
         for f in fields(self):
-            if issubclass(f.type, ConfigSection):  # type: ignore
+            if isinstance(f.type, type) and issubclass(f.type, ConfigSection):
                 d[f.name] = getattr(self, f.name).to_dict()
             else:
                 d[f.name] = getattr(self, f.name)
@@ -201,12 +201,73 @@ class ScoringConfig(ConfigSection):
 class EnoRunnerConfig(ConfigSection):
     check_past_ticks: int = 5
     timeout: float = 15
+    connections_per_host: int = 64  # keep-alive connections to each checker service, per worker process
+    task_id_block_size: int = 1000  # task IDs reserved at once (INCRBY), per worker process
+
+
+@dataclass
+class RetryConfig(ConfigSection):
+    """Late-tick retries of checks that failed for transient reasons. Services can override via runner_config["retry"]."""
+    enabled: bool = False
+    max_retries: int = 1
+    statuses: list[str] = field(default_factory=lambda: ["OFFLINE", "TIMEOUT", "CRASHED"])
+    delay: float = 2.0  # in seconds, between failure report and retry
+    queue: str | None = None  # None: the service's usual queue
+    priority: int = 9
+
+
+@dataclass
+class ConcurrentRunnerConfig(ConfigSection):
+    """Workers that run many checks per process (services with runner_config["concurrent"] = true)"""
+    queue: str = "concurrent"
+    threads: int = 32  # per worker process, for checkers without async interface
+
+
+@dataclass
+class ResultBufferConfig(ConfigSection):
+    """Workers write checker results in batches"""
+    enabled: bool = True
+    batch_size: int = 50
+    max_delay: float = 0.3  # in seconds
 
 
 @dataclass
 class RunnerConfig(ConfigSection):
     dispatcher: str = "dispatcher:CeleryDispatcher"
     eno: EnoRunnerConfig = field(default_factory=EnoRunnerConfig)
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    concurrent: ConcurrentRunnerConfig = field(default_factory=ConcurrentRunnerConfig)
+    result_buffer: ResultBufferConfig = field(default_factory=ResultBufferConfig)
+    forkserver: bool = False  # fork subprocess-mode checkers from a warm zygote instead of starting a new interpreter
+    warmup: bool = True  # load, compile and import checker packages when a worker starts / packages change
+
+
+@dataclass
+class LogBufferConfig(ConfigSection):
+    """Log messages are written by a background thread, in batches"""
+    enabled: bool = True
+    max_queue: int = 10000  # distinct pending messages, further messages are dropped (and counted)
+    batch_size: int = 500
+    max_delay: float = 0.5  # in seconds
+    max_repeated_texts: int = 20  # identical (component, title, level) messages in one batch are merged, keeping that many texts
+
+
+@dataclass
+class SqlProfilingConfig(ConfigSection):
+    """Statistics of all SQL statements per component, see /overview/sql"""
+    enabled: bool = True
+    sample_rate: float = 1.0  # fraction of the statements that are timed
+    publish_interval: float = 30  # in seconds, each process publishes its statistics to redis
+    top_n: int = 25  # statements in the report / exported metrics
+
+
+@dataclass
+class TelemetryConfig(ConfigSection):
+    """Tick-scoped tracing (saarctf_commons.tracing), disabled if neither trace_file nor otlp_endpoint is set"""
+    prefix: str = "gameserver-"  # prefix for resource (service) names
+    trace_file: str | None = None  # spans are appended as JSON lines, see scripts/trace_report.py
+    otlp_endpoint: str | None = None  # OTLP/HTTP endpoint URL (JSON encoding)
+    otlp_key: str | None = None
 
 
 @dataclass
@@ -259,6 +320,9 @@ class Config:
     NETWORK: NetworkConfig
     WIREGUARD_SYNC: WireguardSyncConfig | None
     RUNNER: RunnerConfig
+    LOG_BUFFER: LogBufferConfig
+    SQL_PROFILING: SqlProfilingConfig
+    TELEMETRY: TelemetryConfig
 
     CTFROUTE_NAMESPACE: str
     SCOREBOARD_FREEZE: int | None
@@ -388,6 +452,9 @@ class Config:
         )
         ctfroute_namespace = initial_config.get("ctfroute_namespace", "")
         runner: RunnerConfig = RunnerConfig.from_dict(initial_config.get("runner", {}))
+        log_buffer: LogBufferConfig = LogBufferConfig.from_dict(initial_config.get("log_buffer", {}))
+        sql_profiling: SqlProfilingConfig = SqlProfilingConfig.from_dict(initial_config.get("sql_profiling", {}))
+        telemetry: TelemetryConfig = TelemetryConfig.from_dict(initial_config.get("telemetry", {}))
 
         scoreboard_freeze = initial_config["scoreboard_freeze"] if "scoreboard_freeze" in initial_config else None
 
@@ -425,6 +492,9 @@ class Config:
             NETWORK=network,
             WIREGUARD_SYNC=wireguard_sync,
             RUNNER=runner,
+            LOG_BUFFER=log_buffer,
+            SQL_PROFILING=sql_profiling,
+            TELEMETRY=telemetry,
             SCOREBOARD_FREEZE=scoreboard_freeze,
             SCOREBOARD_PATH=scoreboard_path,
             SCOREBOARD_PATH_INTERNAL=scoreboard_path_internal,
@@ -465,6 +535,9 @@ class Config:
             "network": self.NETWORK.to_dict(),
             "wireguard_sync": self.WIREGUARD_SYNC.to_dict() if self.WIREGUARD_SYNC else None,
             "runner": self.RUNNER.to_dict(),
+            "log_buffer": self.LOG_BUFFER.to_dict(),
+            "sql_profiling": self.SQL_PROFILING.to_dict(),
+            "telemetry": self.TELEMETRY.to_dict(),
             "scoreboard_freeze": self.SCOREBOARD_FREEZE,
             "scoreboard_path": str(self.SCOREBOARD_PATH),
             "scoreboard_path_internal": str(self.SCOREBOARD_PATH_INTERNAL) if self.SCOREBOARD_PATH_INTERNAL else None,
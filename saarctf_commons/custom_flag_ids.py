@@ -0,0 +1,63 @@
+"""
+Custom flag IDs (reported by checker scripts, published in attack.json).
+
+Stored in one redis hash per service and tick: custom_flag_ids:<service>:<tick> => {"<team>:<index>": flag id}.
+Hashes expire after EXPIRY seconds, long after their flags are invalid.
+
+Previous versions stored one string key per flag ID (custom_flag_ids:<service>:<tick>:<team>:<index>).
+These are still read if the hash has no entry (by exact key, never with KEYS),
+scripts/migrate_custom_flag_ids.py converts them.
+"""
+
+import redis
+
+EXPIRY = 24 * 3600
+
+
+def custom_flag_ids_key(service_id: int, tick: int) -> str:
+    return f'custom_flag_ids:{service_id}:{tick}'
+
+
+def legacy_custom_flag_id_key(service_id: int, tick: int, team_id: int, index: int) -> str:
+    return f'custom_flag_ids:{service_id}:{tick}:{team_id}:{index}'
+
+
+def set_custom_flag_id(conn: redis.StrictRedis, service_id: int, tick: int, team_id: int, index: int, value: str) -> None:
+    key = custom_flag_ids_key(service_id, tick)
+    pipe = conn.pipeline(transaction=False)
+    pipe.hset(key, f'{team_id}:{index}', value)
+    pipe.expire(key, EXPIRY)
+    pipe.execute()
+
+
+def get_custom_flag_id(conn: redis.StrictRedis, service_id: int, tick: int, team_id: int, index: int) -> str | None:
+    value = conn.hget(custom_flag_ids_key(service_id, tick), f'{team_id}:{index}')
+    if value is None:
+        value = conn.get(legacy_custom_flag_id_key(service_id, tick, team_id, index))
+    return value.decode('utf-8') if value is not None else None
+
+
+def load_custom_flag_ids(conn: redis.StrictRedis, service_id: int, ticks: list[int],
+                         expected: list[tuple[int, int]] | None = None) -> dict[tuple[int, int, int], str]:
+    """
+    Load all custom flag IDs of a service in the given ticks (one roundtrip).
+    :param expected: (team id, index) of all flag IDs that should exist. Missing ones are looked up in the legacy format.
+    :return: {(tick, team id, index): flag id}
+    """
+    pipe = conn.pipeline(transaction=False)
+    for tick in ticks:
+        pipe.hgetall(custom_flag_ids_key(service_id, tick))
+    result: dict[tuple[int, int, int], str] = {}
+    for tick, values in zip(ticks, pipe.execute()):
+        for field, value in values.items():
+            team_id, index = field.decode().split(':')
+            result[(tick, int(team_id), int(index))] = value.decode('utf-8')
+
+    if expected:
+        missing = [(tick, team_id, index) for tick in ticks for team_id, index in expected if (tick, team_id, index) not in result]
+        if missing:
+            values = conn.mget([legacy_custom_flag_id_key(service_id, tick, team_id, index) for tick, team_id, index in missing])
+            for k, value in zip(missing, values):
+                if value is not None:
+                    result[k] = value.decode('utf-8')
+    return result
@@ -1,15 +1,27 @@
+import atexit
 import json
 import os
+import socket
 import sys
+import threading
 import time
+import traceback
 from abc import ABC, abstractmethod
+from collections import deque
 from datetime import datetime
-from typing import TypeAlias, Any, BinaryIO
+from typing import TypeAlias, Any, BinaryIO, Iterable, NamedTuple
 
 Value: TypeAlias = str | int | float | bool
 Timestamp: TypeAlias = int | float | datetime
 
 
+class MetricPoint(NamedTuple):
+    metric: str
+    values: dict[str, Value]
+    ts: Timestamp | None = None
+    attributes: dict[str, Any] | None = None
+
+
 class MetricRecorder(ABC):
     def record(self, metric: str, value_name: str, value: Value, ts: Timestamp | None = None, **attributes: Any) -> None:
         self.record_many(metric, {value_name: value}, ts, **attributes)
@@ -18,18 +30,36 @@ class MetricRecorder(ABC):
     def record_many(self, metric: str, values: dict[str, Value], ts: Timestamp | None = None, **attributes: Any) -> None:
         raise NotImplementedError()
 
+    def record_batch(self, points: Iterable[MetricPoint]) -> None:
+        for point in points:
+            self.record_many(point.metric, point.values, point.ts, **(point.attributes or {}))
+
 
 class InfluxLineProtocolMetricsRecorder(MetricRecorder, ABC):
     def record_many(self, metric: str, values: dict[str, Value], ts: Timestamp | None = None, **attributes: Any) -> None:
+        line = self.format_line(metric, values, ts, attributes)
+        if line:
+            self.write_lines([line])
+
+    def record_batch(self, points: Iterable[MetricPoint]) -> None:
+        lines = [line for line in (self.format_line(*point) for point in points) if line]
+        if lines:
+            self.write_lines(lines)
+
+    @classmethod
+    def format_line(cls, metric: str, values: dict[str, Value], ts: Timestamp | None = None,
+                    attributes: dict[str, Any] | None = None) -> bytes | None:
         if len(values) == 0:
-            return
+            return None
         if ts is None:
             ts = time.time()
-        fields = ','.join(f'{k}={self._value_to_influx(v)}' for k, v in values.items())
-        attrs = ''.join(f',{k}={self._value_to_influx(v)}' for k, v in attributes.items())
-        line = f'{metric}{attrs} {fields} {self._ts_to_influx(ts)}\n'
+        fields = ','.join(f'{k}={cls._value_to_influx(v)}' for k, v in values.items())
+        attrs = ''.join(f',{k}={cls._value_to_influx(v)}' for k, v in (attributes or {}).items())
+        return f'{metric}{attrs} {fields} {cls._ts_to_influx(ts)}\n'.encode('utf-8')
+
+    def write_lines(self, lines: list[bytes]) -> None:
         writer = self.get_writer()
-        writer.write(line.encode('utf-8'))
+        writer.write(b''.join(lines))
         writer.flush()
 
     @classmethod
@@ -70,6 +100,138 @@ class TelegrafBufferMetricsRecorder(InfluxLineProtocolMetricsRecorder):
         return self.file
 
 
+class TelegrafSocketMetricsRecorder(InfluxLineProtocolMetricsRecorder):
+    """
+    Send lines to a telegraf socket_listener: "udp://host:port", "unix:///path" (stream) or "unixgram:///path".
+    """
+    MAX_DATAGRAM_SIZE = 8192
+
+    def __init__(self, address: str) -> None:
+        self.scheme, _, location = address.partition('://')
+        self.address: str | tuple[str, int]
+        if self.scheme == 'udp':
+            host, _, port = location.rpartition(':')
+            self.address = (host, int(port))
+        elif self.scheme in ('unix', 'unixgram'):
+            self.address = location
+        else:
+            raise ValueError(f'Unsupported metrics socket: {address}')
+        self.sock: socket.socket | None = None
+
+    def _connect(self) -> socket.socket:
+        if self.sock is None:
+            if self.scheme == 'udp':
+                self.sock = socket.socket(socket.AF_INET6 if ':' in self.address[0] else socket.AF_INET, socket.SOCK_DGRAM)
+            elif self.scheme == 'unixgram':
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            else:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(self.address)
+        return self.sock
+
+    def get_writer(self) -> BinaryIO:
+        # sockets are not streams, write_lines sends complete lines instead
+        raise NotImplementedError('TelegrafSocketMetricsRecorder has no writer, use write_lines')
+
+    def write_lines(self, lines: list[bytes]) -> None:
+        try:
+            sock = self._connect()
+            if self.scheme == 'unix':
+                sock.sendall(b''.join(lines))
+                return
+            # datagrams contain complete lines only
+            datagram = b''
+            for line in lines:
+                if datagram and len(datagram) + len(line) > self.MAX_DATAGRAM_SIZE:
+                    sock.sendto(datagram, self.address)
+                    datagram = b''
+                datagram += line
+            if datagram:
+                sock.sendto(datagram, self.address)
+        except OSError:
+            # reconnect next time
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+            raise
+
+
+class BufferedMetricsRecorder(MetricRecorder):
+    """
+    Collects lines in memory, a background thread writes them to the target when flush_lines are waiting or every flush_interval seconds.
+    Recording never blocks on I/O. Lines are dropped (and counted in "dropped") if max_lines are waiting or the target fails,
+    the number of dropped lines is reported as metric "metrics_dropped".
+    """
+
+    def __init__(self, target: InfluxLineProtocolMetricsRecorder, max_lines: int = 100000, flush_lines: int = 1000,
+                 flush_interval: float = 1.0) -> None:
+        self.target = target
+        self.max_lines = max_lines
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self._thread_pid: int | None = None
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self) -> None:
+        """
+        New buffer and locks, also in forked children: the parent writes its own lines,
+        and the locks might have been held by a parent thread that does not exist in the child.
+        """
+        self.dropped = 0  # total
+        self._reported_dropped = 0
+        self._lines: deque[bytes] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+
+    def record_many(self, metric: str, values: dict[str, Value], ts: Timestamp | None = None, **attributes: Any) -> None:
+        line = self.target.format_line(metric, values, ts, attributes)
+        if line:
+            self._add([line])
+
+    def record_batch(self, points: Iterable[MetricPoint]) -> None:
+        self._add([line for line in (self.target.format_line(*point) for point in points) if line])
+
+    def _add(self, lines: list[bytes]) -> None:
+        with self._condition:
+            accepted = max(0, min(len(lines), self.max_lines - len(self._lines)))
+            self._lines.extend(lines[:accepted])
+            self.dropped += len(lines) - accepted
+            if self._thread_pid != os.getpid():
+                # first use in this process (threads do not survive fork)
+                self._thread_pid = os.getpid()
+                threading.Thread(target=self._run, name='MetricsFlush', daemon=True).start()
+            if len(self._lines) >= self.flush_lines:
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._lines) >= self.flush_lines, self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._condition:
+                lines = list(self._lines)
+                self._lines.clear()
+                if self.dropped > self._reported_dropped:
+                    line = self.target.format_line('metrics_dropped', {'dropped': self.dropped - self._reported_dropped, 'total': self.dropped},
+                                                   attributes={'pid': os.getpid()})
+                    if line:
+                        lines.append(line)
+                    self._reported_dropped = self.dropped
+            if not lines:
+                return
+            try:
+                self.target.write_lines(lines)
+            except Exception:
+                traceback.print_exc()
+                with self._condition:
+                    self.dropped += len(lines)
+
+
 class MetricsProxy(MetricRecorder):
     def __init__(self) -> None:
         self._recorder: MetricRecorder | None = None
@@ -81,6 +243,10 @@ class MetricsProxy(MetricRecorder):
         if self._recorder is not None:
             self._recorder.record_many(metric, values, ts, **attributes)
 
+    def record_batch(self, points: Iterable[MetricPoint]) -> None:
+        if self._recorder is not None:
+            self._recorder.record_batch(points)
+
     def is_initialized(self) -> bool:
         return self._recorder is not None
 
@@ -89,11 +255,22 @@ Metrics = MetricsProxy()
 
 
 def setup_default_metrics() -> None:
+    """
+    METRICS_LOGFILE: "-" (stdout), a file (telegraf tail), "udp://host:port", "unix:///path" or "unixgram:///path" (telegraf socket_listener).
+    Lines are buffered and written in the background unless METRICS_BUFFER=0.
+    """
     if Metrics.is_initialized():
         return
     if 'METRICS_LOGFILE' in os.environ:
         f = os.environ['METRICS_LOGFILE']
+        recorder: InfluxLineProtocolMetricsRecorder
         if f == '-':
-            Metrics.set_recorder(TelegrafBufferMetricsRecorder(sys.stdout.buffer))
+            recorder = TelegrafBufferMetricsRecorder(sys.stdout.buffer)
+        elif '://' in f:
+            recorder = TelegrafSocketMetricsRecorder(f)
+        else:
+            recorder = TelegrafTailMetricsRecorder(f)
+        if os.environ.get('METRICS_BUFFER', '1') == '0':
+            Metrics.set_recorder(recorder)
         else:
-            Metrics.set_recorder(TelegrafTailMetricsRecorder(f))
+            Metrics.set_recorder(BufferedMetricsRecorder(recorder))
@@ -0,0 +1,114 @@
+"""
+Prometheus metrics of the gameserver internals.
+
+Every process calls setup_prometheus(component) once. Metrics are exposed:
+- by the controlserver at /metrics
+- by other processes (timer, workers, scoreboard daemon, VPN status daemon) on port $PROMETHEUS_PORT, if set.
+Processes that fork (celery prefork workers, gunicorn) need $PROMETHEUS_MULTIPROC_DIR: an empty directory,
+all processes write their metrics there and the exposition aggregates them.
+
+The "component" label of DB query and Redis counters is the process component, or the one set with `with component(...)`.
+"""
+
+import contextvars
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, multiprocess, start_http_server, generate_latest
+
+_component: contextvars.ContextVar[str | None] = contextvars.ContextVar('component', default=None)
+_process_component = 'unknown'
+_db_listener_installed = False
+
+# long-running steps, up to a few tick lengths
+_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+DISPATCH_SECONDS = Histogram('saarctf_dispatch_seconds', 'Dispatching the checker scripts of one tick', buckets=_BUCKETS)
+COLLECT_SECONDS = Histogram('saarctf_collect_seconds', 'Collecting the checker results of one tick', buckets=_BUCKETS)
+SCORING_SECONDS = Histogram('saarctf_scoring_seconds', 'Scoring and ranking of one tick', buckets=_BUCKETS)
+SCOREBOARD_SECONDS = Histogram('saarctf_scoreboard_seconds', 'Rendering the scoreboard of one tick', ['output'], buckets=_BUCKETS)
+PIPELINE_STAGE_SECONDS = Histogram('saarctf_pipeline_stage_seconds', 'Stages of the end-of-tick pipeline', ['pipeline', 'stage'],
+                                   buckets=_BUCKETS)
+CHECKER_SECONDS = Histogram('saarctf_checker_seconds', 'Checker script runtime', ['service_id', 'status'], buckets=_BUCKETS)
+DB_QUERIES = Counter('saarctf_db_queries', 'SQL statements executed', ['component'])
+SQL_SECONDS = Histogram('saarctf_sql_seconds', 'SQL statement duration (sampled, see sql_profiling)', ['component'],
+                        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+REDIS_ROUNDTRIPS = Counter('saarctf_redis_roundtrips', 'Commands / pipelines sent to redis', ['component'])
+
+
+def get_component() -> str:
+    return _component.get() or _process_component
+
+
+def get_process_component() -> str:
+    return _process_component
+
+
+def set_component(name: str) -> contextvars.Token:
+    """
+    Attribute DB queries and redis commands of this thread / task to another component, until reset_component(token)
+    """
+    return _component.set(name)
+
+
+def reset_component(token: contextvars.Token) -> None:
+    _component.reset(token)
+
+
+@contextmanager
+def component(name: str) -> Iterator[None]:
+    """
+    Attribute DB queries and redis commands in this block (and this thread / task) to another component
+    """
+    token = set_component(name)
+    try:
+        yield
+    finally:
+        reset_component(token)
+
+
+def get_registry() -> CollectorRegistry:
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def generate_metrics() -> bytes:
+    return generate_latest(get_registry())
+
+
+def setup_prometheus(component_name: str, serve: bool = True) -> None:
+    """
+    :param component_name: default "component" label of this process
+    :param serve: start a metrics server on $PROMETHEUS_PORT (if set)
+    """
+    global _process_component
+    _process_component = component_name
+    _install_db_listener()
+    if serve and os.environ.get('PROMETHEUS_PORT'):
+        start_http_server(int(os.environ['PROMETHEUS_PORT']), registry=get_registry())
+
+
+def process_exited(pid: int) -> None:
+    """
+    Clean up the metric files of a forked process that exits (multiprocess mode only)
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def _install_db_listener() -> None:
+    global _db_listener_installed
+    if _db_listener_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _count_query(*args: Any, **kwargs: Any) -> None:
+        DB_QUERIES.labels(get_component()).inc()
+
+    _db_listener_installed = True
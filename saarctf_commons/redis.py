@@ -1,17 +1,35 @@
+from typing import Any
+
 import redis
 
 from saarctf_commons.config import config
+from saarctf_commons.prometheus_utils import REDIS_ROUNDTRIPS, get_component
 
 
 class NamedRedisConnection(redis.Connection):
     name: str = ''
 
+    _connecting: bool = False
+
     def on_connect(self) -> None:
         redis.Connection.on_connect(self)
         if self.name:
             self.send_command("CLIENT SETNAME", self.name.replace(' ', '_'))
             self.read_response()
 
+    def connect(self) -> None:
+        self._connecting = True
+        try:
+            super().connect()
+        finally:
+            self._connecting = False
+
+    def send_packed_command(self, command: Any, check_health: bool = True) -> None:
+        # one call per command or pipeline, commands of the connection handshake are not counted
+        if not self._connecting:
+            REDIS_ROUNDTRIPS.labels(get_component()).inc()
+        super().send_packed_command(command, check_health)
+
     @classmethod
     def set_clientname(cls, name: str, overwrite: bool = False) -> None:
         """
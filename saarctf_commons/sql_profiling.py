@@ -0,0 +1,198 @@
+"""
+Always-on SQL statistics (the production variant of debug_sql_timing).
+
+Statements are grouped by fingerprint (literals and parameters replaced by "?", IN lists and multi-row VALUES collapsed)
+and by component (see prometheus_utils.component: process name, end-of-tick stage, control panel route, ...).
+A fraction (sample_rate) of the statements is timed, the per-statement cost is two clock reads and a cached fingerprint lookup.
+
+Each process publishes its statistics to redis every publish_interval seconds (from a background thread),
+the control panel merges the reports of all processes (/overview/sql). The top statements are exported as metric "sql_top".
+"""
+
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, ClassVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from saarctf_commons.config import config
+from saarctf_commons.metric_utils import Metrics, MetricPoint
+from saarctf_commons.prometheus_utils import SQL_SECONDS, get_component
+from saarctf_commons.redis import get_redis_connection
+
+REDIS_PREFIX = 'sql_profiling:'
+BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)  # upper bounds (seconds), plus one bucket for slower statements
+
+_literals = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%\(\w+\)s|%s|\$\d+'), '?'),
+    (re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\(\?(?:, \?)+\)'), '(?, ...)'),  # IN lists, rows
+    (re.compile(r'(\(\?(?:, \.\.\.)?\))(?:, \(\?(?:, \.\.\.)?\))+'), r'\1, ...'),  # multi-row VALUES
+]
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    for pattern, replacement in _literals:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()[:2000]
+
+
+@dataclass
+class QueryStats:
+    count: float = 0  # merged reports: extrapolated from sampled statements
+    total: float = 0.0  # seconds
+    max: float = 0.0
+    buckets: list[float] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def merge(self, other: 'QueryStats') -> None:
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+
+class SqlProfiler:
+    _instance: ClassVar['SqlProfiler | None'] = None
+
+    def __init__(self, sample_rate: float, publish_interval: float, top_n: int) -> None:
+        self.sample_rate = sample_rate
+        self.publish_interval = publish_interval
+        self.top_n = top_n
+        self.sample_factor = 1 / sample_rate if sample_rate > 0 else 0.0  # estimated statements per timed statement
+        self.stats: dict[tuple[str, str], QueryStats] = {}
+        self._lock = threading.Lock()
+        self._thread_pid: int | None = None
+
+    @classmethod
+    def setup(cls) -> 'SqlProfiler | None':
+        """
+        Start profiling in this process (once, if enabled in config)
+        """
+        if cls._instance is None and config.SQL_PROFILING.enabled:
+            cls._instance = SqlProfiler(config.SQL_PROFILING.sample_rate, config.SQL_PROFILING.publish_interval, config.SQL_PROFILING.top_n)
+            event.listen(Engine, 'before_cursor_execute', cls._instance._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', cls._instance._after_cursor_execute)
+        return cls._instance
+
+    def _before_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if context is not None and (self.sample_rate >= 1 or random.random() < self.sample_rate):
+            context._profiling_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        start: float | None = getattr(context, '_profiling_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        context._profiling_start = None
+        self.add(get_component(), statement, duration)
+
+    def add(self, component: str, statement: str, duration: float) -> None:
+        key = (component, fingerprint(statement))
+        SQL_SECONDS.labels(component).observe(duration)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = QueryStats()
+            stats.add(duration)
+            if self._thread_pid != os.getpid():
+                # first statement in this process (threads do not survive fork)
+                self._thread_pid = os.getpid()
+                threading.Thread(target=self._run, name='SqlProfiler', daemon=True).start()
+
+    def report(self) -> dict[str, Any]:
+        """
+        :return: this process's statistics (JSON-serializable)
+        """
+        with self._lock:
+            queries = [[component, statement, stats.count, stats.total, stats.max, list(stats.buckets)]
+                       for (component, statement), stats in self.stats.items()]
+        return {'ts': time.time(), 'sample_factor': self.sample_factor, 'queries': queries}
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.publish_interval)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f'[sql_profiling] publish failed: {e!r}')
+
+    def publish(self) -> None:
+        report = self.report()
+        with get_redis_connection() as redis:
+            redis.set(f'{REDIS_PREFIX}{socket.gethostname()}:{os.getpid()}', json.dumps(report), ex=int(self.publish_interval * 10) + 60)
+        if Metrics.is_initialized():
+            Metrics.record_batch(
+                MetricPoint('sql_top', {
+                    'count': round(entry['count']), 'total_ms': entry['total'] * 1000, 'max_ms': entry['max'] * 1000
+                }, report['ts'], {'component': entry['component'], 'statement': entry['id']})
+                for entry in top_statements(merge_reports([report]), self.top_n)
+            )
+
+
+def merge_reports(reports: list[dict[str, Any]]) -> dict[tuple[str, str], QueryStats]:
+    """
+    Combine the statistics of several processes. Counts and totals are extrapolated if statements were sampled.
+    """
+    result: dict[tuple[str, str], QueryStats] = {}
+    for report in reports:
+        factor = report.get('sample_factor', 1.0)
+        for component, statement, count, total, maximum, buckets in report['queries']:
+            stats = QueryStats(count * factor, total * factor, maximum, [b * factor for b in buckets])
+            if (component, statement) in result:
+                result[(component, statement)].merge(stats)
+            else:
+                result[(component, statement)] = stats
+    return result
+
+
+def top_statements(stats: dict[tuple[str, str], QueryStats], n: int) -> list[dict[str, Any]]:
+    """
+    :return: the n statements with the highest total time
+    """
+    entries = sorted(stats.items(), key=lambda item: item[1].total, reverse=True)[:n]
+    return [{
+        'component': component,
+        'statement': statement,
+        'id': f'{zlib.crc32(statement.encode()):08x}',
+        'count': stats.count,
+        'total': stats.total,
+        'avg': stats.total / stats.count if stats.count else 0.0,
+        'max': stats.max,
+        'buckets': stats.buckets,
+    } for (component, statement), stats in entries]
+
+
+def collect_reports() -> list[dict[str, Any]]:
+    """
+    :return: the latest published report of every process
+    """
+    reports = []
+    with get_redis_connection() as redis:
+        keys = list(redis.scan_iter(f'{REDIS_PREFIX}*'))
+        for data in (redis.mget(keys) if keys else []):
+            if data:
+                reports.append(json.loads(data))
+    return reports
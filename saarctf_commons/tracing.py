@@ -0,0 +1,303 @@
+"""
+Lightweight span tracing, one trace per tick (section "telemetry" in the config).
+
+Trace and root span ID of a tick are derived from the tick number (and the game secret), every process can attach spans to a tick
+without coordination. The root span "tick" is written by the timer when the end-of-tick work is finished.
+The current span is kept in a contextvar and propagated to celery tasks in the W3C "traceparent" header.
+
+Spans are written as JSON lines (OTLP span fields, see scripts/trace_report.py) to trace_file
+and/or sent to an OTLP/HTTP collector (JSON encoding) by a background thread.
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Iterator
+
+from celery.signals import before_task_publish, task_prerun, task_postrun
+
+from saarctf_commons.config import config
+
+CHECKER_TASKS = {
+    'checker_runner.runner.run_checkerscript',
+    'checker_runner.runner.run_checkerscript_external',
+    'checker_runner.runner.run_checkerscript_concurrent',
+    'checker_runner.runner.run_checkerscript_batch',
+}
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str  # 32 hex digits
+    span_id: str  # 16 hex digits
+
+    @property
+    def traceparent(self) -> str:
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    @classmethod
+    def from_traceparent(cls, value: str | None) -> 'SpanContext | None':
+        parts = value.split('-') if value else []
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        return SpanContext(parts[1], parts[2])
+
+
+_current: contextvars.ContextVar[SpanContext | None] = contextvars.ContextVar('span', default=None)
+
+
+def _tick_hash(tick: int) -> str:
+    return hashlib.sha256(config.SECRET_FLAG_KEY + f'/trace/{tick}'.encode()).hexdigest()
+
+
+def tick_context(tick: int) -> SpanContext:
+    """
+    :return: trace ID and root span ID of this tick (the same in all processes)
+    """
+    digest = _tick_hash(tick)
+    return SpanContext(digest[:32], digest[32:48])
+
+
+@dataclass
+class Span:
+    name: str
+    context: SpanContext
+    parent_id: str | None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    error: str | None = None
+
+    def end(self, end_ns: int | None = None) -> None:
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            SpanExporter.export(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'traceId': self.context.trace_id,
+            'spanId': self.context.span_id,
+            'parentSpanId': self.parent_id or '',
+            'name': self.name,
+            'startTimeUnixNano': self.start_ns,
+            'endTimeUnixNano': self.end_ns,
+            'attributes': self.attributes,
+            'status': 'ERROR' if self.error else 'OK',
+            'statusMessage': self.error or '',
+        }
+
+
+def current_context() -> SpanContext | None:
+    return _current.get()
+
+
+def start_span(name: str, tick: int | None = None, parent: SpanContext | None = None, **attributes: Any) -> Span:
+    """
+    Start a span (call .end() when done). The parent is (in this order): parent, the current span, the root span of tick.
+    Without any of them the span starts a new trace.
+    """
+    parent = parent or _current.get() or (tick_context(tick) if tick is not None else None)
+    if tick is not None:
+        attributes['tick'] = tick
+    if parent is None:
+        return Span(name, SpanContext(secrets.token_hex(16), secrets.token_hex(8)), None, attributes)
+    return Span(name, SpanContext(parent.trace_id, secrets.token_hex(8)), parent.span_id, attributes)
+
+
+@contextmanager
+def span(name: str, tick: int | None = None, parent: SpanContext | None = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Trace a block: the span is the current span inside, exceptions mark it as failed.
+    """
+    s = start_span(name, tick, parent, **attributes)
+    token = _current.set(s.context)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f'{e.__class__.__name__}: {e}'
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+def record_tick_span(tick: int, start: float, end: float, **attributes: Any) -> None:
+    """
+    Write the root span of a tick (all other spans of this tick are its descendants)
+    """
+    Span('tick', tick_context(tick), None, dict(attributes, tick=tick), int(start * 1e9)).end(int(end * 1e9))
+
+
+class SpanExporter:
+    """
+    Buffers finished spans (per process), a background thread writes them every flush_interval seconds.
+    """
+    _instance: ClassVar['SpanExporter | None'] = None
+    _disabled_pid: ClassVar[int | None] = None
+
+    MAX_SPANS = 20000
+    FLUSH_INTERVAL = 2.0
+
+    def __init__(self, service_name: str, trace_file: str | None, otlp_endpoint: str | None, otlp_key: str | None) -> None:
+        self.owner_pid = os.getpid()
+        self.service_name = service_name
+        self.trace_file = trace_file
+        self.otlp_endpoint = otlp_endpoint
+        if otlp_endpoint and not otlp_endpoint.rstrip('/').endswith('/v1/traces'):
+            self.otlp_endpoint = otlp_endpoint.rstrip('/') + '/v1/traces'
+        self.otlp_key = otlp_key
+        self.dropped = 0
+        self._spans: deque[dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        threading.Thread(target=self._run, name='SpanExporter', daemon=True).start()
+
+    @classmethod
+    def get(cls) -> 'SpanExporter | None':
+        """
+        :return: the exporter of this process, None if tracing is disabled
+        """
+        if cls._instance is not None and cls._instance.owner_pid == os.getpid():
+            return cls._instance
+        if cls._disabled_pid == os.getpid():
+            return None
+        telemetry = config.TELEMETRY
+        if not telemetry.trace_file and not telemetry.otlp_endpoint:
+            cls._disabled_pid = os.getpid()
+            return None
+        from saarctf_commons.prometheus_utils import get_process_component
+        cls._instance = SpanExporter(telemetry.prefix + get_process_component(), telemetry.trace_file, telemetry.otlp_endpoint,
+                                     telemetry.otlp_key)
+        return cls._instance
+
+    @classmethod
+    def export(cls, s: Span) -> None:
+        exporter = cls.get()
+        if exporter is not None:
+            exporter.add(s)
+
+    def add(self, s: Span) -> None:
+        data = s.to_dict()
+        data['resource'] = self.service_name
+        with self._lock:
+            if len(self._spans) >= self.MAX_SPANS:
+                self.dropped += 1
+            else:
+                self._spans.append(data)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                spans = list(self._spans)
+                self._spans.clear()
+            if not spans:
+                return
+            try:
+                if self.trace_file:
+                    # one write per batch, O_APPEND - several processes can share a file
+                    with open(self.trace_file, 'a') as f:
+                        f.write(''.join(json.dumps(data) + '\n' for data in spans))
+                if self.otlp_endpoint:
+                    self._send_otlp(spans)
+            except Exception:
+                traceback.print_exc()
+                with self._lock:
+                    self.dropped += len(spans)
+
+    def _send_otlp(self, spans: list[dict[str, Any]]) -> None:
+        import requests
+
+        headers = {'Authorization': f'Bearer {self.otlp_key}'} if self.otlp_key else {}
+        body = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'saarctf'}, 'spans': [self._to_otlp(data) for data in spans]}],
+        }]}
+        requests.post(self.otlp_endpoint, json=body, headers=headers, timeout=5).raise_for_status()  # type: ignore[arg-type]
+
+    @staticmethod
+    def _to_otlp(data: dict[str, Any]) -> dict[str, Any]:
+        def value(v: Any) -> dict[str, Any]:
+            if isinstance(v, bool):
+                return {'boolValue': v}
+            if isinstance(v, int):
+                return {'intValue': str(v)}
+            if isinstance(v, float):
+                return {'doubleValue': v}
+            return {'stringValue': str(v)}
+
+        return {
+            'traceId': data['traceId'],
+            'spanId': data['spanId'],
+            'parentSpanId': data['parentSpanId'],
+            'name': data['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(data['startTimeUnixNano']),
+            'endTimeUnixNano': str(data['endTimeUnixNano']),
+            'attributes': [{'key': k, 'value': value(v)} for k, v in data['attributes'].items()],
+            'status': {'code': 2, 'message': data['statusMessage']} if data['status'] == 'ERROR' else {'code': 1},
+        }
+
+
+def flush_spans() -> None:
+    if SpanExporter._instance is not None and SpanExporter._instance.owner_pid == os.getpid():
+        SpanExporter._instance.flush()
+
+
+atexit.register(flush_spans)
+
+
+# --- celery propagation ---
+
+_task_spans: dict[str, tuple[Span, contextvars.Token]] = {}
+
+
+@before_task_publish.connect
+def _inject_traceparent(headers: dict | None = None, **kwargs: Any) -> None:
+    context = _current.get()
+    if context is not None and headers is not None:
+        headers.setdefault('traceparent', context.traceparent)
+
+
+@task_prerun.connect
+def _start_task_span(task_id: str | None = None, task: Any = None, args: Any = None, kwargs: Any = None, **_: Any) -> None:
+    if task is None or task_id is None or task.name not in CHECKER_TASKS or SpanExporter.get() is None:
+        return
+    traceparent = task.request.get('traceparent') or (task.request.headers or {}).get('traceparent')
+    # run_checkerscript*(runner_spec, package, script, service_id, team_id(s), tick, cfg, ...)
+    params = list(args or ()) + [None] * 6
+    attributes: dict[str, Any] = {'task': task.name.rsplit('.', 1)[-1], 'service_id': params[3]}
+    if isinstance(params[4], int):
+        attributes['team_id'] = params[4]
+    tick = params[5] if isinstance(params[5], int) else None
+    s = start_span('checker', tick, SpanContext.from_traceparent(traceparent), **attributes)
+    _task_spans[task_id] = (s, _current.set(s.context))
+
+
+@task_postrun.connect
+def _end_task_span(task_id: str | None = None, retval: Any = None, state: str | None = None, **_: Any) -> None:
+    if task_id is None or task_id not in _task_spans:
+        return
+    s, token = _task_spans.pop(task_id)
+    try:
+        _current.reset(token)
+    except ValueError:
+        _current.set(None)  # postrun in another context
+    if isinstance(retval, str):
+        s.attributes['status'] = retval
+    if state != 'SUCCESS':
+        s.error = f'task state {state}'
+    s.end()
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from controlserver.models import init_database, db_session_2, CheckerResult, CheckerTickSummary
+from saarctf_commons.redis import NamedRedisConnection
+from saarctf_commons.config import config, load_default_config
+
+"""
+Recompute checker_tick_summary (checker status pages) from checker_results.
+ARGUMENTS: start_tick end_tick (inclusive, optional - default: all ticks with checker results)
+"""
+
+
+def backfill_checker_summary(tick_start: int | None = None, tick_end: int | None = None) -> int:
+    """
+    :return: number of ticks summarized
+    """
+    init_database()
+    with db_session_2() as session:
+        first, last = session.query(func.min(CheckerResult.tick), func.max(CheckerResult.tick)).one()
+        if first is None or last is None:
+            return 0
+        tick_start = max(first, tick_start) if tick_start is not None else first
+        tick_end = min(last, tick_end) if tick_end is not None else last
+        for tick in range(tick_start, tick_end + 1):
+            CheckerTickSummary.update(session, tick)
+            session.commit()
+            if tick % 50 == 0:
+                print(f'- summarized tick {tick}')
+    return max(0, tick_end - tick_start + 1)
+
+
+if __name__ == '__main__':
+    load_default_config()
+    config.set_script()
+    NamedRedisConnection.set_clientname('script-' + os.path.basename(__file__))
+
+    t = time.time()
+    count = backfill_checker_summary(int(sys.argv[1]) if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(f'Summarized {count} ticks, took {time.time() - t:.1f} sec.')
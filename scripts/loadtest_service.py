@@ -9,6 +9,7 @@ from datetime import timedelta
 from typing import cast
 
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -28,6 +29,11 @@ ARGUMENTS: --team X --service Y [ -n 1,2,3,4... ]
 
 
 def timings_from_message(result: CheckerResult) -> tuple[float | None, float | None, float | None]:
+    if result.data and 'timings' in result.data:
+        timings = result.data['timings']
+        ti, ts, tr = (timings[phase]['wall'] if phase in timings else None for phase in ('check_integrity', 'store_flags', 'retrieve_flags'))
+        return ti, ts, tr
+    # results of older runners: parse the timestamps in the log output
     if result.output is None:
         return None, None, None
     # this is ugly as fuck, but it works
@@ -150,6 +156,7 @@ class LoadTester:
                 .filter(CheckerResult.team_id == self.team.id) \
                 .filter(CheckerResult.service_id == self.service.id) \
                 .filter(CheckerResult.tick.in_(ticks)) \
+                .options(selectinload(CheckerResult.output_row)) \
                 .all()
             session.expunge_all()
             return LoadTestResult(n, self.concurrency, results)
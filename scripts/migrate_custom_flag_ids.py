@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+from redis import StrictRedis
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saarctf_commons.config import config, load_default_config
+from saarctf_commons.custom_flag_ids import EXPIRY, custom_flag_ids_key
+from saarctf_commons.redis import NamedRedisConnection, get_redis_connection
+
+"""
+Moves custom flag IDs from the old format (one key per flag ID) to one hash per service and tick.
+Uses SCAN, safe to run while the game is running.
+ARGUMENTS: [--keep]
+"""
+
+
+def migrate_custom_flag_ids(keep: bool = False) -> None:
+    with get_redis_connection() as redis:
+        count = 0
+        batch: list[bytes] = []
+        for key in redis.scan_iter(match='custom_flag_ids:*:*:*:*', count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                count += _migrate_batch(redis, batch, keep)
+                batch = []
+        if batch:
+            count += _migrate_batch(redis, batch, keep)
+    print(f'Migrated {count} custom flag IDs')
+
+
+def _migrate_batch(redis: StrictRedis, keys: list[bytes], keep: bool) -> int:
+    values = redis.mget(keys)
+    hashes: dict[str, dict[str | bytes, bytes]] = defaultdict(dict)
+    for key, value in zip(keys, values):
+        if value is None:
+            continue
+        _, service_id, tick, team_id, index = key.decode().split(':')
+        hashes[custom_flag_ids_key(int(service_id), int(tick))][f'{team_id}:{index}'] = value
+    pipe = redis.pipeline(transaction=False)
+    for hash_key, mapping in hashes.items():
+        pipe.hset(hash_key, mapping=mapping)
+        pipe.expire(hash_key, EXPIRY)
+    if not keep:
+        pipe.delete(*keys)
+    pipe.execute()
+    return sum(len(mapping) for mapping in hashes.values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert custom flag IDs to the per-tick hash format')
+    parser.add_argument('--keep', action='store_true', help='Do not delete the old keys')
+    args = parser.parse_args()
+
+    load_default_config()
+    config.set_script()
+    NamedRedisConnection.set_clientname('script-' + os.path.basename(__file__))
+    migrate_custom_flag_ids(args.keep)
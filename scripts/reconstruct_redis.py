@@ -5,7 +5,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from controlserver.models import init_database, db_session_2, Tick
-from controlserver.timer import redis_set_and_publish, CTFState
+from controlserver.timer import publish_timer_state, CTFState
 from saarctf_commons.redis import NamedRedisConnection, get_redis_connection
 from saarctf_commons.config import config, load_default_config
 from saarctf_commons.debug_sql_timing import print_query_stats
@@ -38,16 +38,12 @@ def reconstruct_redis() -> None:
         print(f'  state: {state.name}')
         print(f'  estimated tick time: {estimated_time} seconds')
 
-        with get_redis_connection() as redis:
-            redis_set_and_publish("timing:state", state.name, redis)
-            redis_set_and_publish("timing:desiredState", state.name, redis)
-            redis_set_and_publish("timing:currentRound", last_completed_tick, redis)
-            redis_set_and_publish("timing:roundStart", current_start, redis)
-            redis_set_and_publish("timing:roundEnd", current_end, redis)
-            redis_set_and_publish("timing:roundTime", estimated_time, redis)
-            redis_set_and_publish("timing:stopAfterRound", None, redis)
-            redis_set_and_publish("timing:startAt", None, redis)
+        # unknown tick time: keep the configured one
+        tick_time = {'roundTime': estimated_time} if estimated_time else {}
+        publish_timer_state(state=state.name, desiredState=state.name, currentRound=last_completed_tick, roundStart=current_start,
+                            roundEnd=current_end, stopAfterRound=None, startAt=None, **tick_time)
 
+        with get_redis_connection() as redis:
             for tick in ticks:
                 if tick.start:
                     redis.set(f'round.{tick.tick}.start', int(tick.start.timestamp()))
@@ -83,7 +83,7 @@ def reset_broker() -> None:
 def reset_database(include_storage: bool = False) -> None:
     init_database()
     import controlserver.models
-    for m in ["TeamPoints", "TeamRanking", "SubmittedFlag", "CheckerResult", "LogMessage", "Tick"]:
+    for m in ["TeamPoints", "TeamRanking", "SubmittedFlag", "CheckerTickSummary", "CheckerResult", "LogMessage", "Tick"]:
         count = getattr(controlserver.models, m).query.delete()
         print("- dropped {} entries from {}".format(count, m))
     if include_storage:
@@ -6,7 +6,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from controlserver.models import init_database
 from controlserver.scoring.scoreboard import default_scoreboards
 from controlserver.scoring.scoring import ScoringCalculation
-from controlserver.timer import init_slave_timer
+from controlserver.timer import init_slave_timer, publish_timer_state
 from saarctf_commons.config import config, load_default_config
 from saarctf_commons.redis import NamedRedisConnection, get_redis_connection
 
@@ -49,9 +49,9 @@ def query_yes_no(question: str, default: str = "yes") -> bool:
 
 
 def reset_redis(tick: int) -> None:
+    publish_timer_state(currentRound=tick)
+
     redis = get_redis_connection()
-    redis.set("timing:currentRound", str(tick))
-    redis.publish("timing:currentRound", str(tick))
 
     wiped = 0
     for key in redis.keys(b"services:*"):
@@ -66,7 +66,7 @@ def reset_database(tick: int) -> None:
     init_database()
     import controlserver.models
 
-    for m in ["TeamPoints", "TeamRanking", "CheckerResult", "Tick"]:
+    for m in ["TeamPoints", "TeamRanking", "CheckerTickSummary", "CheckerResult", "Tick"]:
         model = getattr(controlserver.models, m)
         count = model.query.filter(model.tick > tick).delete()
         print("- dropped {} entries from {}".format(count, m))
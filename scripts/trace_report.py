@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Iterable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saarctf_commons.config import config, load_default_config
+
+"""
+Offline analysis of the tick traces written by saarctf_commons.tracing (telemetry.trace_file).
+ARGUMENTS: [trace files] (default: telemetry.trace_file)
+--tick N  (default: the last tick with a complete trace)
+--top N   (slowest checker runs, default: 10)
+--all     (one line per complete tick)
+"""
+
+Span = dict[str, Any]
+
+
+def load_spans(paths: Iterable[str]) -> list[Span]:
+    spans = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    pass  # partially written line
+    return spans
+
+
+def group_by_tick(spans: list[Span]) -> dict[int, list[Span]]:
+    """
+    :return: all spans of each tick's trace
+    """
+    traces: dict[str, list[Span]] = defaultdict(list)
+    ticks: dict[str, int] = {}
+    for s in spans:
+        traces[s['traceId']].append(s)
+        if 'tick' in s['attributes']:
+            ticks[s['traceId']] = s['attributes']['tick']
+    return {ticks[trace_id]: trace for trace_id, trace in traces.items() if trace_id in ticks}
+
+
+def find_root(spans: list[Span]) -> Span | None:
+    for s in spans:
+        if s['name'] == 'tick' and not s['parentSpanId']:
+            return s
+    return None
+
+
+def children_of(spans: list[Span], root: Span) -> dict[str, list[Span]]:
+    """
+    :return: span id => child spans. Spans whose parent is missing (dropped / not yet written) are attached to root.
+    """
+    ids = {s['spanId'] for s in spans}
+    children: dict[str, list[Span]] = defaultdict(list)
+    for s in spans:
+        if s is root:
+            continue
+        parent = s['parentSpanId'] if s['parentSpanId'] in ids else root['spanId']
+        children[parent].append(s)
+    return children
+
+
+def critical_path(spans: list[Span], root: Span) -> list[tuple[int, Span, int]]:
+    """
+    The chain of spans that determined the end of root: starting from the child that ended last,
+    walk back to the latest sibling that ended before it started, and so on; then descend into each span of the chain.
+    :return: list of (depth, span, self time in ns = time not covered by the span's own critical children)
+    """
+    children = children_of(spans, root)
+    result: list[tuple[int, Span, int]] = []
+
+    def visit(node: Span, depth: int) -> None:
+        candidates = [c for c in children.get(node['spanId'], []) if c['endTimeUnixNano'] <= node['endTimeUnixNano']]
+        chain: list[Span] = []
+        limit = node['endTimeUnixNano']
+        while True:
+            previous = [c for c in candidates if c['endTimeUnixNano'] <= limit and c['startTimeUnixNano'] >= node['startTimeUnixNano']]
+            if not previous:
+                break
+            last = max(previous, key=lambda c: c['endTimeUnixNano'])
+            chain.append(last)
+            candidates.remove(last)
+            limit = last['startTimeUnixNano']
+        chain.reverse()
+        covered = sum(c['endTimeUnixNano'] - c['startTimeUnixNano'] for c in chain)
+        result.append((depth, node, node['endTimeUnixNano'] - node['startTimeUnixNano'] - covered))
+        for c in chain:
+            visit(c, depth + 1)
+
+    visit(root, 0)
+    return result
+
+
+def describe(s: Span) -> str:
+    attributes = {k: v for k, v in s['attributes'].items() if k != 'tick'}
+    text = s['name']
+    if attributes:
+        text += ' ' + ' '.join(f'{k}={v}' for k, v in attributes.items())
+    if s['status'] == 'ERROR':
+        text += f' [{s["statusMessage"] or "error"}]'
+    return text
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+def report_tick(tick: int, spans: list[Span], top: int) -> str:
+    root = find_root(spans)
+    if root is None:
+        return f'Tick {tick}: trace is incomplete (no root span yet)'
+    start = root['startTimeUnixNano']
+    lines = [f'Tick {tick}: {(root["endTimeUnixNano"] - start) / 1e9:.3f} s, {len(spans)} spans', '',
+             'Critical path:        start      duration   self']
+    for depth, s, self_time in critical_path(spans, root):
+        lines.append(f'{"  " * depth}{describe(s)[:60 - 2 * depth]:<{60 - 2 * depth}} '
+                     f'{(s["startTimeUnixNano"] - start) / 1e9:9.3f} {(s["endTimeUnixNano"] - s["startTimeUnixNano"]) / 1e9:9.3f} '
+                     f'{self_time / 1e9:9.3f}')
+
+    checkers = [s for s in spans if s['name'] in ('checker', 'check')]
+    if checkers:
+        durations = [(s['endTimeUnixNano'] - s['startTimeUnixNano']) / 1e9 for s in checkers]
+        errors = sum(1 for s in checkers if s['status'] == 'ERROR')
+        lines += ['', f'Checker runs: {len(checkers)} ({errors} errors), p50 {percentile(durations, 0.5):.3f} s, '
+                      f'p95 {percentile(durations, 0.95):.3f} s, max {max(durations):.3f} s, '
+                      f'last finished at {(max(s["endTimeUnixNano"] for s in checkers) - start) / 1e9:.3f} s']
+        lines.append(f'Slowest {top}:')
+        for s in sorted(checkers, key=lambda s: s['startTimeUnixNano'] - s['endTimeUnixNano'])[:top]:
+            lines.append(f'  {(s["endTimeUnixNano"] - s["startTimeUnixNano"]) / 1e9:9.3f} s  {describe(s)}')
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Critical path of the end-of-tick work, from tick traces')
+    parser.add_argument('files', nargs='*', help='trace files (JSON lines), default: telemetry.trace_file')
+    parser.add_argument('--tick', type=int, help='default: the last complete tick')
+    parser.add_argument('--top', type=int, default=10, help='slowest checker runs to list')
+    parser.add_argument('--all', action='store_true', help='summary of all ticks')
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        load_default_config()
+        config.set_script()
+        if not config.TELEMETRY.trace_file:
+            parser.error('no trace file given and telemetry.trace_file not configured')
+        files = [config.TELEMETRY.trace_file]
+    ticks = group_by_tick(load_spans(files))
+    complete = sorted(tick for tick, spans in ticks.items() if find_root(spans))
+
+    if args.all:
+        for tick in complete:
+            root = find_root(ticks[tick])
+            assert root is not None
+            path = critical_path(ticks[tick], root)
+            slowest = max(path[1:], key=lambda entry: entry[2], default=None)
+            print(f'Tick {tick:5d}: {(root["endTimeUnixNano"] - root["startTimeUnixNano"]) / 1e9:9.3f} s'
+                  + (f'  (most self time: {slowest[1]["name"]} {slowest[2] / 1e9:.3f} s)' if slowest else ''))
+        return
+    selected: int | None = args.tick if args.tick is not None else (complete[-1] if complete else None)
+    if selected is None or selected not in ticks:
+        print('No trace for this tick')
+        sys.exit(1)
+    print(report_tick(selected, ticks[selected], args.top))
+
+
+if __name__ == '__main__':
+    main()
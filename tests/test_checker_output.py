@@ -0,0 +1,41 @@
+from controlserver.models import CheckerResult, CheckerResultOutput, db_session_2
+from saarctf_commons.compression import compress_text, decompress_text, truncate_text
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class CheckerOutputTest(DatabaseTestCase):
+    def test_compression(self) -> None:
+        for text in ['', 'short', 'long output line\n' * 1000, 'unicode ✓ ' * 100]:
+            codec, data = compress_text(text)
+            self.assertEqual(text, decompress_text(codec, data))
+        self.assertLess(len(compress_text('long output line\n' * 1000)[1]), 1000)
+
+    def test_truncation(self) -> None:
+        self.assertEqual('abcdef', truncate_text('abcdef', 3, 3))
+        truncated = truncate_text('a' * 100 + 'b' * 100 + 'c' * 100, 100, 50)
+        self.assertTrue(truncated.startswith('a' * 100 + '\n'))
+        self.assertTrue(truncated.endswith('\n' + 'c' * 50))
+        self.assertIn('150 characters truncated', truncated)
+
+    def test_output_table(self) -> None:
+        self.demo_team_services()
+        output = 'x' * (CheckerResultOutput.HEAD_SIZE + CheckerResultOutput.TAIL_SIZE) + 'end'
+        for tick, out in [(1, output), (2, None)]:
+            result = CheckerResult(tick=tick, team_id=2, service_id=1, status='SUCCESS', celery_id='x')
+            result.output = out
+            with db_session_2() as session:
+                session.execute(CheckerResult.upsert().values(result.props_dict()))
+                session.execute(CheckerResultOutput.upsert().values(result.output_props_dict()))
+                session.commit()
+
+        with db_session_2() as session:
+            result1, result2 = session.query(CheckerResult).order_by(CheckerResult.tick).all()
+            self.assertIsNotNone(result1.output)
+            self.assertTrue(result1.output.endswith('xend'))  # type: ignore
+            self.assertIn('characters truncated', result1.output)  # type: ignore
+            self.assertEqual(len(output), result1.output_row.size)
+            self.assertIsNone(result2.output)
+            # outputs are deleted with their result
+            session.query(CheckerResult).delete()
+            session.commit()
+            self.assertEqual(0, session.query(CheckerResultOutput).count())
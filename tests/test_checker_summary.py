@@ -0,0 +1,50 @@
+from datetime import datetime, timezone, timedelta
+
+from controlserver.models import CheckerResult, CheckerTickSummary, db_session_2
+from scripts.backfill_checker_summary import backfill_checker_summary
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class CheckerTickSummaryTest(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.demo_team_services()
+        self.start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        with db_session_2() as session:
+            results = [
+                (1, 1, 'SUCCESS', 1.0, False), (2, 1, 'SUCCESS', 3.0, False), (3, 1, 'SUCCESS', 5.0, True), (4, 1, 'MUMBLE', None, False),
+                (1, 2, 'CRASHED', 0.5, False), (2, 2, 'REVOKED', None, False),
+            ]
+            for i, (team_id, service_id, status, runtime, late) in enumerate(results):
+                session.add(CheckerResult(tick=1, team_id=team_id, service_id=service_id, status=status, time=runtime,
+                                          run_over_time=late, celery_id='x', finished=self.start + timedelta(seconds=i)))
+            session.add(CheckerResult(tick=2, team_id=1, service_id=1, status='OFFLINE', time=2.0, celery_id='x'))
+            session.commit()
+
+    def test_update(self) -> None:
+        with db_session_2() as session:
+            CheckerTickSummary.update(session, 1)
+            CheckerTickSummary.update(session, 1)  # recomputing replaces the rows
+            session.commit()
+            summaries = {s.service_id: s for s in session.query(CheckerTickSummary).all()}
+        self.assertEqual({1, 2}, set(summaries))
+        s1 = summaries[1]
+        self.assertEqual(4, s1.results)
+        self.assertEqual({'SUCCESS': 3, 'MUMBLE': 1}, s1.status_counts)
+        self.assertEqual({'SUCCESS': 1}, s1.late_counts)
+        self.assertEqual(3, s1.time_count)
+        self.assertEqual((1.0, 3.0, 5.0), (s1.time_min, s1.time_avg, s1.time_max))
+        self.assertAlmostEqual(9.0, s1.time_sum)
+        self.assertEqual(self.start + timedelta(seconds=3), s1.last_finished)
+        s2 = summaries[2]
+        self.assertEqual({'CRASHED': 1, 'REVOKED': 1}, s2.status_counts)
+        self.assertEqual({}, s2.late_counts)
+        self.assertEqual((0.5, 0.5, 0.5), (s2.time_min, s2.time_avg, s2.time_max))
+
+    def test_backfill(self) -> None:
+        self.assertEqual(2, backfill_checker_summary())
+        with db_session_2() as session:
+            self.assertEqual(3, session.query(CheckerTickSummary).count())
+            summary = session.query(CheckerTickSummary).filter(CheckerTickSummary.tick == 2).one()
+            self.assertEqual({'OFFLINE': 1}, summary.status_counts)
+            self.assertIsNone(summary.last_finished)
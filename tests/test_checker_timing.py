@@ -0,0 +1,53 @@
+import time
+
+from checker_runner.checker_execution import CheckerRunOutput, PhaseTimer
+from controlserver.checker_timing import get_phase_timing_stats, percentile
+from controlserver.models import CheckerResult, db_session_2
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class CheckerTimingTest(DatabaseTestCase):
+    def test_phase_timer(self) -> None:
+        timer = PhaseTimer()
+        with timer.measure('check_integrity'):
+            time.sleep(0.05)
+        try:
+            with timer.measure('store_flags', cpu=False):
+                raise ValueError()
+        except ValueError:
+            pass
+        timer.record('getflag', 0.5)
+        timer.record('getflag', 0.2)
+        result = timer.attach(CheckerRunOutput('SUCCESS'))
+
+        timings = result.data['timings']
+        self.assertEqual(['check_integrity', 'store_flags', 'getflag'], list(timings))
+        self.assertGreaterEqual(timings['check_integrity']['wall'], 0.05)
+        self.assertLess(timings['check_integrity']['cpu'], 0.05)
+        self.assertNotIn('cpu', timings['store_flags'])
+        self.assertEqual(0.5, timings['getflag']['wall'])  # slowest run is kept
+
+    def test_percentile(self) -> None:
+        self.assertIsNone(percentile([], 50))
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(50.0, percentile(values, 50))
+        self.assertEqual(95.0, percentile(values, 95))
+        self.assertEqual(1.0, percentile([1.0], 95))
+
+    def test_stats(self) -> None:
+        self.demo_team_services()
+        with db_session_2() as session:
+            for team_id in range(1, 5):
+                timings = {'check_integrity': {'wall': 0.1 * team_id, 'cpu': 0.01 * team_id}, 'store_flags': {'wall': 1.0}}
+                session.add(CheckerResult(tick=3, team_id=team_id, service_id=1, status='SUCCESS', celery_id='x', data={'timings': timings}))
+            session.add(CheckerResult(tick=3, team_id=1, service_id=2, status='CRASHED', celery_id='x', data={'attempt': 0}))
+            session.commit()
+
+            stats = get_phase_timing_stats(session, 3)
+        self.assertEqual([1], list(stats))
+        self.assertEqual(['check_integrity', 'store_flags'], list(stats[1]))
+        self.assertEqual(4, stats[1]['check_integrity'].count)
+        self.assertEqual(0.2, stats[1]['check_integrity'].wall_p50)
+        self.assertEqual(0.4, stats[1]['check_integrity'].wall_p95)
+        self.assertEqual(0.04, stats[1]['check_integrity'].cpu_p95)
+        self.assertIsNone(stats[1]['store_flags'].cpu_p50)
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from checker_runner.concurrent_execution import WorkerEventLoop, CheckerTimeout, capture_output, run_with_timeout
+from tests.utils.base_cases import TestCase
+
+
+def sync_check(i: int, duration: float) -> int:
+    for step in range(3):
+        logging.getLogger().warning(f'check {i} step {step}')
+        time.sleep(0.02)
+    time.sleep(duration)
+    return i
+
+
+async def async_check(i: int, duration: float) -> int:
+    for step in range(3):
+        logging.getLogger().warning(f'check {i} step {step}')
+        await asyncio.sleep(0.02)
+    await asyncio.sleep(duration)
+    return i
+
+
+async def run_check(i: int, is_async: bool, duration: float) -> tuple[int | str, list[str]]:
+    with capture_output() as output:
+        try:
+            if is_async:
+                return await run_with_timeout(async_check(i, duration), 0.5), output
+            return await WorkerEventLoop.get().run_in_pool(lambda: sync_check(i, duration), 0.5), output
+        except CheckerTimeout:
+            return 'TIMEOUT', output
+
+
+class ConcurrentExecutionTest(TestCase):
+    def test_concurrent_checks(self) -> None:
+        loop = WorkerEventLoop.get()
+        start = time.time()
+        with ThreadPoolExecutor(8) as executor:
+            futures = [executor.submit(loop.run, run_check(i, i % 2 == 0, 1 if i == 3 else 0)) for i in range(8)]
+            results = [future.result() for future in futures]
+        # all checks ran at the same time
+        self.assertLess(time.time() - start, 0.9)
+
+        for i, (result, output) in enumerate(results):
+            self.assertEqual('TIMEOUT' if i == 3 else i, result)
+            # each check sees its own log messages only
+            self.assertEqual([f'check {i} step {step}' for step in range(3)], output)
+
+    def test_stuck_threads(self) -> None:
+        loop = WorkerEventLoop.get()
+        time.sleep(1)  # wait for threads of other tests
+        result, _ = loop.run(run_check(0, False, 0.7))
+        self.assertEqual('TIMEOUT', result)
+        self.assertEqual(1, loop.stuck_threads)
+        time.sleep(0.5)
+        self.assertEqual(0, loop.stuck_threads)
+
+    def test_http_sessions(self) -> None:
+        from aiohttp import ClientTimeout
+
+        async def get_sessions() -> tuple[Any, Any, Any]:
+            loop = WorkerEventLoop.get()
+            return (loop.get_http_session('http://a', 4, ClientTimeout(total=1)), loop.get_http_session('http://a', 4, ClientTimeout(total=1)),
+                    loop.get_http_session('http://b', 4, ClientTimeout(total=1)))
+
+        a1, a2, b = WorkerEventLoop.get().run(get_sessions())
+        self.assertIs(a1, a2)
+        self.assertIsNot(a1, b)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(get_sessions())
+        WorkerEventLoop.shutdown_current()
+        self.assertTrue(a1.closed and b.closed)
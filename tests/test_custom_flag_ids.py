@@ -0,0 +1,37 @@
+from saarctf_commons.custom_flag_ids import get_custom_flag_id, legacy_custom_flag_id_key, load_custom_flag_ids, \
+    set_custom_flag_id, custom_flag_ids_key, EXPIRY
+from saarctf_commons.redis import get_redis_connection
+from tests.utils.base_cases import TestCase
+
+
+class CustomFlagIdTest(TestCase):
+    def setUp(self) -> None:
+        with get_redis_connection() as conn:
+            keys = list(conn.scan_iter(match='custom_flag_ids:*'))
+            if keys:
+                conn.delete(*keys)
+
+    def test_hash_storage(self) -> None:
+        with get_redis_connection() as conn:
+            set_custom_flag_id(conn, 1, 5, 2, 0, 'user2')
+            set_custom_flag_id(conn, 1, 5, 3, 1, 'user3')
+            set_custom_flag_id(conn, 1, 6, 2, 0, 'user2b')
+            self.assertEqual('user2', get_custom_flag_id(conn, 1, 5, 2, 0))
+            self.assertIsNone(get_custom_flag_id(conn, 1, 5, 2, 1))
+            self.assertEqual({(5, 2, 0): 'user2', (5, 3, 1): 'user3', (6, 2, 0): 'user2b'}, load_custom_flag_ids(conn, 1, [5, 6, 7]))
+            self.assertLessEqual(conn.ttl(custom_flag_ids_key(1, 5)), EXPIRY)
+            self.assertGreater(conn.ttl(custom_flag_ids_key(1, 5)), 0)
+
+    def test_legacy_keys(self) -> None:
+        with get_redis_connection() as conn:
+            conn.set(legacy_custom_flag_id_key(1, 5, 4, 0), 'old')
+            set_custom_flag_id(conn, 1, 5, 2, 0, 'new')
+            self.assertEqual('old', get_custom_flag_id(conn, 1, 5, 4, 0))
+            # legacy keys are only read if expected
+            self.assertEqual({(5, 2, 0): 'new'}, load_custom_flag_ids(conn, 1, [5]))
+            self.assertEqual({(5, 2, 0): 'new', (5, 4, 0): 'old'}, load_custom_flag_ids(conn, 1, [5], [(2, 0), (3, 0), (4, 0)]))
+
+            from scripts.migrate_custom_flag_ids import migrate_custom_flag_ids
+            migrate_custom_flag_ids()
+            self.assertIsNone(conn.get(legacy_custom_flag_id_key(1, 5, 4, 0)))
+            self.assertEqual({(5, 2, 0): 'new', (5, 4, 0): 'old'}, load_custom_flag_ids(conn, 1, [5]))
@@ -0,0 +1,103 @@
+import os
+import tempfile
+from pathlib import Path
+
+from sqlalchemy import text
+
+from controlserver.db_filesystem import DBFilesystem
+from controlserver.models import db_session_2
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class DBFilesystemTest(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def _create_folder(self, name: str, extra: bytes = b'') -> Path:
+        folder = self.root / name
+        (folder / 'lib' / 'sub').mkdir(parents=True)
+        (folder / 'checker.py').write_bytes(b'print("checker")' + extra)
+        (folder / 'lib' / '__init__.py').write_bytes(b'')
+        (folder / 'lib' / 'sub' / '__init__.py').write_bytes(b'')
+        (folder / 'lib' / 'large.bin').write_bytes(b'x' * (DBFilesystem.LFS_MIN_SIZE + 1))
+        (folder / '__pycache__').mkdir()
+        (folder / '__pycache__' / 'checker.pyc').write_bytes(b'ignored')
+        return folder
+
+    def test_roundtrip(self) -> None:
+        dbfs = DBFilesystem()
+        package, is_new = dbfs.move_folder_to_package(str(self._create_folder('service')))
+        self.assertTrue(is_new)
+        self.assertEqual((package, False), dbfs.move_folder_to_package(str(self._create_folder('service2'))))
+
+        packages = self.root / 'packages'
+        lfs = self.root / 'lfs'
+        self.assertTrue(dbfs.load_package_to_folder(package, packages / package, lfs))
+        self.assertFalse(dbfs.load_package_to_folder(package, packages / package, lfs))
+        loaded = packages / package
+        self.assertEqual(b'print("checker")', (loaded / 'checker.py').read_bytes())
+        self.assertEqual(b'', (loaded / 'lib' / 'sub' / '__init__.py').read_bytes())
+        self.assertFalse((loaded / '__pycache__').exists())
+        self.assertTrue((loaded / 'lib' / 'large.bin').is_symlink())
+        self.assertEqual(DBFilesystem.LFS_MIN_SIZE + 1, (loaded / 'lib' / 'large.bin').stat().st_size)
+        # identical files in one package are stored once
+        self.assertEqual((loaded / 'lib' / '__init__.py').stat().st_ino, (loaded / 'lib' / 'sub' / '__init__.py').stat().st_ino)
+
+        # other packages reuse unchanged files
+        package2, _ = dbfs.move_folder_to_package(str(self._create_folder('service3', b'  # changed')))
+        self.assertNotEqual(package, package2)
+        self.assertTrue(dbfs.load_package_to_folder(package2, packages / package2, lfs))
+        loaded2 = packages / package2
+        self.assertEqual(b'print("checker")  # changed', (loaded2 / 'checker.py').read_bytes())
+        self.assertEqual((loaded / 'lib' / '__init__.py').stat().st_ino, (loaded2 / 'lib' / '__init__.py').stat().st_ino)
+        self.assertEqual(os.readlink(loaded / 'lib' / 'large.bin'), os.readlink(loaded2 / 'lib' / 'large.bin'))
+
+    def test_chunked_upload(self) -> None:
+        dbfs = DBFilesystem()
+        dbfs.BLOB_CHUNK_SIZE = 1000
+        dbfs.INSERT_BATCH_SIZE = 1000
+        folder = self.root / 'chunked'
+        folder.mkdir()
+        (folder / 'a.bin').write_bytes(bytes(range(256)) * 10)
+        for i in range(10):
+            (folder / f'small{i}.txt').write_bytes(str(i).encode() * 300)
+        package, is_new = dbfs.move_folder_to_package(str(folder))
+        self.assertTrue(is_new)
+        single_package, _ = dbfs.move_single_files_to_package(sorted(folder.iterdir()))
+        self.assertEqual(package, single_package)  # same content, same package
+
+        self.assertTrue(dbfs.load_package_to_folder(package, self.root / 'packages' / package))
+        for f in folder.iterdir():
+            self.assertEqual(f.read_bytes(), (self.root / 'packages' / package / f.name).read_bytes())
+        # the temporary large object is removed
+        with db_session_2() as session:
+            self.assertEqual(0, session.scalar(text('SELECT COUNT(*) FROM pg_largeobject_metadata')))
+
+    def test_warmup(self) -> None:
+        from checker_runner.package_loader import PackageLoader
+        from controlserver.models import Service, db_session_2
+        from saarctf_commons.config import config
+
+        folder = self.root / 'warmup'
+        (folder / 'lib').mkdir(parents=True)
+        (folder / 'checker.py').write_text('from .lib import helper\nclass Checker:\n    pass\n')
+        (folder / 'lib' / '__init__.py').write_text('')
+        (folder / 'lib' / 'helper.py').write_text('VALUE = 1\n')
+        package, _ = DBFilesystem().move_folder_to_package(str(folder))
+        with db_session_2() as session:
+            session.add(Service(id=1, name='S1', package=package, checker_script='checker.py:Checker', checker_enabled=True,
+                                checker_timeout=1, num_payloads=0, flags_per_tick=1))  # type: ignore[misc]
+            session.add(Service(id=2, name='S2', package='0' * 32, checker_script='checker.py:Checker', checker_enabled=False,
+                                checker_timeout=1, num_payloads=0, flags_per_tick=1))  # type: ignore[misc]
+            session.commit()
+
+        timings = PackageLoader.warmup()
+        self.assertEqual([package], list(timings))
+        self.assertIn(f'{package}.checker', PackageLoader.cached_modules)
+        self.assertTrue(list((config.CHECKER_PACKAGES_PATH / package / 'lib' / '__pycache__').glob('helper.*.pyc')))
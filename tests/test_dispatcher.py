@@ -4,8 +4,10 @@ from celery.result import GroupResult
 
 from checker_runner.runner import celery_worker
 from controlserver.dispatcher import DispatcherFactory
+from controlserver.flag_id_file import FlagIDFileGenerator
 from controlserver.models import Team, db_session, Service, CheckerResult
 from controlserver.timer import init_mock_timer
+from saarctf_commons.config import config
 from tests.utils.celery import CeleryTestCase
 
 
@@ -37,11 +39,17 @@ class DispatcherTestCase(CeleryTestCase):
 
     def test_dispatch_tick(self) -> None:
         self._prepare_db()
+        Service.query.get(1).flag_ids = 'username,hex8'  # type: ignore[union-attr]
+        db_session().commit()
         init_mock_timer()
         dispatcher = DispatcherFactory.build(self.dispatcher_script)
-        with patch('pathlib.Path.write_text') as write_text_mock:  # called by "attack.json" writer
+        with patch.object(FlagIDFileGenerator, '_write_atomic') as write_mock:  # "attack.json" writer
             dispatcher.dispatch_checker_scripts(1)
-            write_text_mock.assert_called_once()
+        written = [path for path, _ in (c.args for c in write_mock.call_args_list)]
+        for path in filter(None, (config.SCOREBOARD_PATH, config.SCOREBOARD_PATH_INTERNAL)):
+            files = [p.name for p in written if p.parent == path / 'api' and not p.name.endswith(('.gz', '.br'))]
+            self.assertEqual(['attack.json', 'attack_Service1.json', 'attack_index.json'], files)
+            self.assertIn(path / 'api' / 'attack.json.gz', written)
 
         time.sleep(3.5)
 
@@ -67,3 +75,61 @@ class DispatcherTestCase(CeleryTestCase):
 
         self.print_logs()
         self.assert_in_logs("Worker close to overload")
+
+    def test_batch_tasks(self) -> None:
+        self._prepare_db()
+        dispatcher = DispatcherFactory.build(self.dispatcher_script)
+        batched: Service = Service.query.get(1)  # type: ignore[assignment]
+        batched.runner_config = {'batch': 2}
+        regular: Service = Service.query.get(2)  # type: ignore[assignment]
+        teams = [Team(id=i, name=f'Team {i}') for i in range(1, 6)]
+        combinations = [(team, service, 3) for team in teams for service in (batched, regular)]
+        tasks = dispatcher._prepare(combinations)
+        assert tasks is not None
+
+        published, taskmap = dispatcher._batch_tasks(combinations, tasks)  # type: ignore[attr-defined]
+        self.assertEqual(5 + 3, len(published))
+        self.assertEqual([5, 6, 7], taskmap['batches'])
+        self.assertEqual([5, 0, 5, 1, 6, 2, 6, 3, 7, 4], taskmap['tasks'])
+        self.assertEqual([1, 2], published[5].args[4])
+        self.assertEqual([5], published[7].args[4])
+        self.assertEqual(tasks[0].options['queue'], published[5].options['queue'])
+
+        regular_only = [c for c in combinations if c[1] is regular]
+        self.assertEqual((tasks[1::2], None), dispatcher._batch_tasks(regular_only, tasks[1::2]))  # type: ignore[attr-defined]
+
+    def test_prepared_plan_update(self) -> None:
+        self._prepare_db()
+        for team in Team.query.filter(Team.id.in_([1, 2])).all():
+            team.vpn_connected = True
+        db_session().commit()
+        dispatcher = DispatcherFactory.build(self.dispatcher_script)
+        with patch('saarctf_commons.config.current_config.DISPATCHER_CHECK_VPN_STATUS', True):
+            dispatcher.prepare_checker_scripts(7)
+            plan = dispatcher._plan
+            assert plan is not None and plan.tasks is not None
+            self.assertEqual({(t, s) for t in (1, 2) for s in (1, 2, 3)}, {(t.id, s.id) for t, s, _ in plan.combinations})
+            prepared = {(team.id, service.id): task for (team, service, _), task in zip(plan.combinations, plan.tasks)}
+
+            # between preparation and tick start: team 2 disconnects, team 3 connects, service 3 is disabled, service 2 is reconfigured
+            Team.query.get(2).vpn_connected = False  # type: ignore[union-attr]
+            Team.query.get(3).vpn_connected = True  # type: ignore[union-attr]
+            Service.query.get(3).checker_enabled = False  # type: ignore[union-attr]
+            Service.query.get(2).checker_timeout = 7  # type: ignore[union-attr]
+            db_session().commit()
+
+            with patch.object(dispatcher, '_dispatch_prepared', return_value='ref') as dispatch_mock, \
+                    patch.object(dispatcher._flag_id_generator, 'generate_and_save'):
+                dispatcher.dispatch_checker_scripts(7)
+        combinations, tasks = dispatch_mock.call_args.args
+        dispatched = [(team.id, service.id) for team, service, _ in combinations]
+        self.assertEqual({(t, s) for t in (1, 3) for s in (1, 2)}, set(dispatched))
+        self.assertEqual(4, len(dispatched))
+        # tasks stay aligned with the combinations and with dispatcher:order
+        self.assertEqual(dispatched, [(task.args[4], task.args[3]) for task in tasks])
+        self.assertEqual(dispatched, [(t, s) for t, s in dispatcher.get_tick_combinations(7)])
+        # unchanged combinations keep their prepared task, reconfigured services get new tasks
+        self.assertIs(prepared[(1, 1)], tasks[dispatched.index((1, 1))])
+        self.assertIsNot(prepared[(1, 2)], tasks[dispatched.index((1, 2))])
+        self.assertEqual(7, tasks[dispatched.index((1, 2))].options['soft_time_limit'])
+        self.assertIsNone(dispatcher._plan)
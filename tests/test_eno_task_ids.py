@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from checker_runner.runners.eno import TaskIdAllocator
+from saarctf_commons.config import config
+from saarctf_commons.redis import get_redis_connection
+from tests.utils.base_cases import TestCase
+
+
+class TaskIdAllocatorTest(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        with get_redis_connection() as conn:
+            conn.set(TaskIdAllocator.KEY, 100)
+        self.block_size = patch.object(config.RUNNER.eno, 'task_id_block_size', 4)
+        self.block_size.start()
+
+    def tearDown(self) -> None:
+        self.block_size.stop()
+        super().tearDown()
+
+    @staticmethod
+    def reserved() -> int:
+        with get_redis_connection() as conn:
+            return int(conn.get(TaskIdAllocator.KEY) or 0)
+
+    def test_blocks(self) -> None:
+        allocator = TaskIdAllocator()
+        # one INCRBY per block
+        self.assertEqual([101, 102, 103, 104], [allocator.allocate() for _ in range(4)])
+        self.assertEqual(104, self.reserved())
+        # at the boundary, the next block is reserved
+        self.assertEqual(105, allocator.allocate())
+        self.assertEqual(108, self.reserved())
+
+    def test_unique(self) -> None:
+        # two workers sharing redis
+        allocators = [TaskIdAllocator(), TaskIdAllocator()]
+        with ThreadPoolExecutor(8) as executor:
+            ids = list(executor.map(lambda i: allocators[i % 2].allocate(), range(200)))
+        self.assertEqual(200, len(set(ids)))
+        self.assertTrue(all(100 < task_id <= self.reserved() for task_id in ids))
+
+    def test_fork(self) -> None:
+        allocator = TaskIdAllocator()
+        self.assertEqual(101, allocator.allocate())
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # child: must not continue the block of its parent
+            try:
+                os.close(read_fd)
+                os.write(write_fd, str(allocator.allocate()).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            child_id = int(f.read())
+        os.waitpid(pid, 0)
+        self.assertEqual(105, child_id)
+        self.assertEqual(102, allocator.allocate())  # the parent keeps its block
+        self.assertEqual(108, self.reserved())
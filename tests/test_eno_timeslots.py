@@ -0,0 +1,56 @@
+import random
+
+from checker_runner.runners.eno_timeslots import TIME_BUFFER, plan_timeslots
+from tests.utils.base_cases import TestCase
+
+TICK_LENGTHS = [60, 75, 90, 120, 180, 300]
+VARIANTS = [(1, 0, 0), (1, 1, 1), (2, 2, 1), (3, 1, 2), (5, 3, 3), (8, 0, 4)]
+PAST_TICKS = [0, 4, 10]
+TIMEOUT = 15
+
+
+class EnoTimeslotTest(TestCase):
+    def _check_plan(self, tick_length: int, flag_variants: int, noise_variants: int, havoc_variants: int, past_ticks: int) -> None:
+        msg = f'tick={tick_length} variants={flag_variants}/{noise_variants}/{havoc_variants} past={past_ticks}'
+        plan = plan_timeslots(tick_length, flag_variants, noise_variants, havoc_variants, past_ticks, TIMEOUT)
+        slots = (2 + past_ticks) * flag_variants + 2 * noise_variants + havoc_variants
+        # every slot is used exactly once
+        self.assertEqual(list(range(slots)), sorted(plan.early + plan.late + plan.unconstrained), msg)
+        self.assertEqual(flag_variants + noise_variants, len(plan.early), msg)
+
+        rng = random.Random(1337)
+        for _ in range(50):
+            early, late, unconstrained = plan.delays(rng)
+            for start in early + late + unconstrained:
+                self.assertGreaterEqual(start, 0, msg)
+                self.assertLessEqual(start + TIMEOUT, tick_length - TIME_BUFFER, msg)
+            if plan.valid:
+                for early_start, late_start in zip(early, late):
+                    self.assertGreaterEqual(late_start - early_start, TIMEOUT, msg)
+
+    def test_clearance(self) -> None:
+        for tick_length in TICK_LENGTHS:
+            for variants in VARIANTS:
+                for past_ticks in PAST_TICKS:
+                    self._check_plan(tick_length, *variants, past_ticks)
+
+    def test_valid(self) -> None:
+        # the usual configurations must be solvable
+        self.assertTrue(plan_timeslots(60, 1, 1, 1, 5, TIMEOUT).valid)
+        self.assertTrue(plan_timeslots(120, 3, 2, 2, 10, TIMEOUT).valid)
+        self.assertTrue(plan_timeslots(60, 8, 0, 4, 0, TIMEOUT).valid)
+        # too short: best effort, still within the tick
+        self.assertFalse(plan_timeslots(30, 1, 0, 0, 0, TIMEOUT).valid)
+        self._check_plan(30, 1, 0, 0, 0)
+
+    def test_spread(self) -> None:
+        # with enough slots, late tasks don't all wait for the end of the tick
+        plan = plan_timeslots(300, 4, 4, 2, 10, TIMEOUT)
+        slots = len(plan.early) + len(plan.late) + len(plan.unconstrained)
+        self.assertTrue(plan.valid)
+        self.assertLess(min(plan.late), slots - len(plan.late))
+        self.assertGreater(max(plan.early), min(plan.late))
+
+    def test_cached(self) -> None:
+        self.assertIs(plan_timeslots(120, 2, 1, 1, 5, TIMEOUT), plan_timeslots(120, 2, 1, 1, 5, TIMEOUT))
+        self.assertEqual(([], [], []), plan_timeslots(60, 0, 0, 0, 5, TIMEOUT).delays())
@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from controlserver.flag_id_file import FlagIDFileGenerator, brotli
+from controlserver.models import Team, Service
+from controlserver.timer import init_mock_timer
+from saarctf_commons.custom_flag_ids import set_custom_flag_id
+from saarctf_commons.redis import get_redis_connection
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class FlagIDFileTest(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.demo_team_services()
+        with get_redis_connection() as conn:
+            keys = list(conn.scan_iter(match='custom_flag_ids:*'))
+            if keys:
+                conn.delete(*keys)
+        self.timer = init_mock_timer()
+        self.teams: list[Team] = Team.query.order_by(Team.id).all()
+        self.services: list[Service] = Service.query.order_by(Service.id).all()
+        self.services[0].flag_ids = 'username'
+        self.services[1].flag_ids = 'hex8,custom'
+
+    def uncached_json(self, tick: int) -> bytes:
+        return json.dumps(FlagIDFileGenerator().generate(self.teams, self.services, tick)).encode()
+
+    def test_cache(self) -> None:
+        generator = FlagIDFileGenerator()
+        for tick in range(1, 16):
+            self.timer.current_tick = tick
+            self.assertEqual(self.uncached_json(tick), generator.generate_json(self.teams, self.services, tick))
+            # only ticks that are still valid are cached
+            min_tick = max(1, tick - 10)
+            self.assertTrue(all(key[2] >= min_tick for key in generator._fragments))
+            self.assertTrue(all(key[2] >= min_tick for key in generator._flag_ids))
+        self.assertEqual(set(range(5, 15)), {key[2] for key in generator._fragments})
+        # custom flag IDs are missing - these flag IDs are not cached
+        self.assertNotIn((2, 2, 14), generator._fragments)
+        self.assertIn((1, 2, 14), generator._fragments)
+
+        # the checker of the previous tick sets its flag IDs late
+        with get_redis_connection() as conn:
+            set_custom_flag_id(conn, 2, 14, 2, 1, 'late-user')
+        self.timer.current_tick = 15
+        content = generator.generate_json(self.teams, self.services, 15)
+        self.assertEqual(self.uncached_json(15), content)
+        self.assertIn(b'"late-user"', content)
+        self.assertEqual('late-user', generator._flag_ids[(2, 2, 14, 1)])
+
+        # changed flag ID types invalidate the cache of this service
+        self.services[0].flag_ids = 'hex8'
+        self.assertEqual(self.uncached_json(15), generator.generate_json(self.teams, self.services, 15))
+        self.assertEqual('hex8', generator._flag_id_types[1])
+        fresh = FlagIDFileGenerator()
+        fresh.generate_json(self.teams, self.services, 15)
+        self.assertEqual({k: v for k, v in fresh._flag_ids.items() if k[0] == 1},
+                         {k: v for k, v in generator._flag_ids.items() if k[0] == 1})
+
+    def test_files(self) -> None:
+        self.services[1].name = 'Service 2/b'
+        self.timer.current_tick = 5
+        with TemporaryDirectory() as directory, \
+                patch('saarctf_commons.config.current_config.SCOREBOARD_PATH', Path(directory)), \
+                patch('saarctf_commons.config.current_config.SCOREBOARD_PATH_INTERNAL', None):
+            api = Path(directory) / 'api'
+            api.mkdir()
+            FlagIDFileGenerator().generate_and_save(self.teams, self.services, 5)
+
+            plain_files = {'attack.json', 'attack_Service1.json', 'attack_Service_2_b.json', 'attack_index.json'}
+            suffixes = ['', '.gz'] + (['.br'] if brotli is not None else [])
+            self.assertEqual({fname + suffix for fname in plain_files for suffix in suffixes}, {p.name for p in api.iterdir()})
+            self.assertEqual(api / 'attack.json', (Path(directory) / 'attack.json').resolve())
+            self.assertEqual(self.uncached_json(5), (api / 'attack.json').read_bytes())
+
+            # per-service files: only this service, no team list
+            service_file = json.loads((api / 'attack_Service_2_b.json').read_text())
+            self.assertEqual(['Service 2/b'], list(service_file['flag_ids']))
+            self.assertNotIn('teams', service_file)
+            self.assertEqual(5, service_file['current_tick'])
+            full = json.loads((api / 'attack.json').read_text())
+            self.assertEqual(full['flag_ids']['Service 2/b'], service_file['flag_ids']['Service 2/b'])
+
+            # index: service files, size and hash of every (uncompressed) file
+            index = json.loads((api / 'attack_index.json').read_text())
+            self.assertEqual(5, index['current_tick'])
+            self.assertEqual({'Service1': 'attack_Service1.json', 'Service 2/b': 'attack_Service_2_b.json'}, index['services'])
+            self.assertEqual(plain_files - {'attack_index.json'}, set(index['files']))
+            for fname, info in index['files'].items():
+                content = (api / fname).read_bytes()
+                self.assertEqual({'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()}, info)
+
+            # compressed variants contain the same bytes
+            for fname in plain_files:
+                content = (api / fname).read_bytes()
+                self.assertEqual(content, gzip.decompress((api / (fname + '.gz')).read_bytes()))
+                if brotli is not None:
+                    self.assertEqual(content, brotli.decompress((api / (fname + '.br')).read_bytes()))
+
+    def test_compressed_variants(self) -> None:
+        content = b'{"flag_ids": {}}' * 100
+        variants = FlagIDFileGenerator._compressed_variants('attack.json', content)
+        # nginx picks the compressed variants, they must be written before the plain file
+        self.assertEqual('attack.json', list(variants)[-1])
+        self.assertEqual(content, variants['attack.json'])
+        self.assertEqual(content, gzip.decompress(variants['attack.json.gz']))
+        if brotli is not None:
+            self.assertEqual(content, brotli.decompress(variants['attack.json.br']))
+        else:
+            self.assertNotIn('attack.json.br', variants)
+
+    def test_write_atomic(self) -> None:
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / 'attack.json'
+            path.write_bytes(b'old')
+            with patch('os.replace', side_effect=OSError('disk full')):
+                with self.assertRaises(OSError):
+                    FlagIDFileGenerator._write_atomic(path, b'new')
+            self.assertEqual(b'old', path.read_bytes())  # never partially written
+            FlagIDFileGenerator._write_atomic(path, b'new')
+            self.assertEqual(b'new', path.read_bytes())
+            self.assertEqual(['attack.json'], [p.name for p in Path(directory).iterdir()])  # no temporary files left
@@ -0,0 +1,110 @@
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+from celery.exceptions import SoftTimeLimitExceeded
+
+from checker_runner.forkserver import ForkServer
+from checker_runner.runner import celery_worker, SUBPROCESS_TIMEOUT_MARGIN
+from checker_runner.runners.saarctf import SaarctfServiceRunner
+from controlserver.models import Service, CheckerResult
+from saarctf_commons.config import config
+from tests.utils.base_cases import DatabaseTestCase
+from tests.utils.celery import CeleryTestCase
+
+
+class ForkServerTest(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.demo_team_services()
+        ForkServer.reset()
+
+    def tearDown(self) -> None:
+        ForkServer.reset()
+        super().tearDown()
+
+    @staticmethod
+    def runner(service_id: int) -> SaarctfServiceRunner:
+        service: Service = Service.query.get(service_id)  # type: ignore[assignment]
+        return SaarctfServiceRunner(service.id, '', service.checker_script, None)
+
+    def test_run(self) -> None:
+        server = ForkServer.get()
+        response = server.run('', 'checker_runner.demo_checker:WorkingService', 1, 2, 1, 5)
+        self.assertEqual(0, response['exitcode'])
+        self.assertFalse(response['timeout'])
+        self.assertIn('(forkserver child)', response['output'])
+        result = SaarctfServiceRunner._parse_subprocess_output(response['output'])
+        self.assertEqual('SUCCESS', result.status)
+        self.assertIn('stdout-Test-2', result.output or '')
+        self.assertIn('stderr-Test-2', result.output or '')
+        self.assertIn('check_integrity', result.data['timings'])
+
+        result = self.runner(2).execute_checker_forkserver(2, 1, 5)
+        self.assertEqual('FLAGMISSING', result.status)
+        self.assertEqual('Flag from tick 1 not found!', result.message)
+        self.assertIs(server, ForkServer.get())  # the zygote is reused
+
+    def test_timeout(self) -> None:
+        start = time.time()
+        result = self.runner(3).execute_checker_forkserver(2, 1, 1)
+        self.assertEqual('TIMEOUT', result.status)
+        self.assertLess(time.time() - start, 5)
+        # the zygote survives the killed child
+        server = ForkServer.get()
+        self.assertIsNone(server.process.poll())
+        self.assertEqual('SUCCESS', self.runner(1).execute_checker_forkserver(2, 1, 5).status)
+        self.assertIs(server, ForkServer.get())
+
+    def test_crashed_zygote(self) -> None:
+        server = ForkServer.get()
+        threading.Timer(0.5, server.process.kill).start()
+        with patch.object(ForkServer, 'reset', wraps=ForkServer.reset) as reset:
+            result = self.runner(3).execute_checker_forkserver(2, 1, 5)
+        self.assertEqual('CRASHED', result.status)
+        self.assertIn('Forkserver failed', result.output or '')
+        reset.assert_called_once()
+        self.assertIsNone(ForkServer._instance)
+        self.assertIsNotNone(server.process.poll())
+        # the next check starts a new zygote
+        self.assertEqual('SUCCESS', self.runner(1).execute_checker_forkserver(2, 1, 5).status)
+        self.assertIsNot(server, ForkServer.get())
+
+    def test_interrupted(self) -> None:
+        server = ForkServer.get()
+        server.file = MagicMock()
+        server.file.readline.side_effect = SoftTimeLimitExceeded()
+        with self.assertRaises(SoftTimeLimitExceeded):
+            server.run('', 'checker_runner.demo_checker:WorkingService', 1, 2, 1, 5)
+        # the pending response must not be read by the next check
+        self.assertIsNone(ForkServer._instance)
+        self.assertIsNotNone(server.process.poll())
+
+
+class ForkServerTaskTest(CeleryTestCase):
+    def setUp(self) -> None:
+        config.RUNNER.forkserver = True  # before the worker is started
+        super().setUp()
+        self.demo_team_services()
+
+    def tearDown(self) -> None:
+        super().tearDown()
+        config.RUNNER.forkserver = False
+
+    def run_task(self, script: str, service_id: int, team_id: int, soft_time_limit: int) -> str:
+        task = celery_worker.run_checkerscript_external.apply_async(
+            ('', '', script, service_id, team_id, 1, None), time_limit=soft_time_limit + 5, soft_time_limit=soft_time_limit)
+        return task.get(timeout=soft_time_limit + 10)
+
+    def test_timeout(self) -> None:
+        start = time.time()
+        # the zygote kills the check before celery's soft time limit interrupts the worker
+        self.assertEqual('TIMEOUT', self.run_task('checker_runner.demo_checker:TimeoutService', 3, 2, 5))
+        self.assertLess(time.time() - start, 5)
+        self.assertGreaterEqual(time.time() - start, 5 - SUBPROCESS_TIMEOUT_MARGIN)
+        # the next check on this worker gets its own result
+        self.assertEqual('SUCCESS', self.run_task('checker_runner.demo_checker:WorkingService', 1, 3, 5))
+        results = {(r.team_id, r.service_id): r for r in CheckerResult.query.filter(CheckerResult.tick == 1).all()}
+        self.assertEqual('TIMEOUT', results[(2, 3)].status)
+        self.assertEqual('SUCCESS', results[(3, 1)].status)
+        self.assertIn('(forkserver child)', results[(3, 1)].output or '')
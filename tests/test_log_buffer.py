@@ -0,0 +1,38 @@
+import time
+
+from controlserver.logger import LogBuffer, log
+from controlserver.models import LogMessage
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class LogBufferTest(DatabaseTestCase):
+    def test_log(self) -> None:
+        start = time.time()
+        for i in range(100):
+            log('test', f'Message {i}', level=LogMessage.WARNING)
+        self.assertLess(time.time() - start, 1)
+        logs = self.get_logs()
+        self.assertEqual([f'Message {i}' for i in range(100)], [entry.title for entry in logs])
+        self.assertEqual(LogMessage.WARNING, logs[0].level)
+
+    def test_background_flush(self) -> None:
+        buffer = LogBuffer(max_queue=100, batch_size=10, max_delay=0.05, max_repeated_texts=5)
+        buffer.add('test', 'Background')
+        for _ in range(100):
+            if LogMessage.query.count() > 0:
+                break
+            time.sleep(0.02)
+        self.assertEqual(['Background'], [entry.title for entry in LogMessage.query.all()])
+
+    def test_aggregation(self) -> None:
+        buffer = LogBuffer(max_queue=2, batch_size=10, max_delay=60, max_repeated_texts=3)
+        for i in range(10):
+            buffer.add('scoring', 'Flag submitted for invalid team/service', f'flag #{i}', LogMessage.WARNING)
+        buffer.add('scoring', 'Other')
+        buffer.add('scoring', 'Dropped')
+        buffer.add('scoring', 'Dropped as well')
+        buffer.flush()
+        logs = {entry.title: entry for entry in self.get_logs()}
+        self.assertEqual({'Flag submitted for invalid team/service (10x)', 'Other', '2 log messages dropped (queue full)'}, set(logs))
+        self.assertEqual('flag #0\nflag #1\nflag #2\n... (7 more)', logs['Flag submitted for invalid team/service (10x)'].text)
+        self.assertEqual(LogMessage.WARNING, logs['2 log messages dropped (queue full)'].level)
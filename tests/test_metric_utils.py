@@ -0,0 +1,110 @@
+import io
+import os
+import signal
+import socket
+import tempfile
+import time
+
+from saarctf_commons.metric_utils import BufferedMetricsRecorder, MetricPoint, TelegrafBufferMetricsRecorder, \
+    TelegrafSocketMetricsRecorder, InfluxLineProtocolMetricsRecorder
+from tests.utils.base_cases import TestCase
+
+
+class FlushCountingBuffer(io.BytesIO):
+    flushes = 0
+
+    def flush(self) -> None:
+        self.flushes += 1
+        super().flush()
+
+
+class MetricUtilsTest(TestCase):
+    def test_batch(self) -> None:
+        buffer = FlushCountingBuffer()
+        recorder = TelegrafBufferMetricsRecorder(buffer)
+        recorder.record('single', 'value', 1, ts=1, team_id=2)
+        recorder.record_batch([MetricPoint('a', {'x': 1.5, 'y': 2}, 2, {'team_id': 3}), MetricPoint('b', {}, 3), MetricPoint('c', {'s': 'text'}, 4)])
+        self.assertEqual(b'single,team_id=2i value=1i 1000000000\n'
+                         b'a,team_id=3i x=1.5,y=2i 2000000000\n'
+                         b'c s="text" 4000000000\n', buffer.getvalue())
+        self.assertEqual(2, buffer.flushes)
+
+    def test_buffered(self) -> None:
+        buffer = FlushCountingBuffer()
+        recorder = BufferedMetricsRecorder(TelegrafBufferMetricsRecorder(buffer), max_lines=5, flush_lines=100, flush_interval=60)
+        for i in range(4):
+            recorder.record('m', 'i', i, ts=1)
+        recorder.record_batch([MetricPoint('m', {'i': i}, 1) for i in range(4, 8)])
+        self.assertEqual(b'', buffer.getvalue())
+        recorder.flush()
+        lines = buffer.getvalue().decode().splitlines()
+        self.assertEqual([f'm i={i}i 1000000000' for i in range(5)], lines[:5])
+        self.assertTrue(lines[5].startswith('metrics_dropped,pid='))
+        self.assertIn('dropped=3i,total=3i', lines[5])
+        self.assertEqual(3, recorder.dropped)
+        self.assertEqual(1, buffer.flushes)
+
+    def test_background_flush(self) -> None:
+        buffer = io.BytesIO()
+        recorder = BufferedMetricsRecorder(TelegrafBufferMetricsRecorder(buffer), flush_lines=2, flush_interval=60)
+        recorder.record('m', 'i', 1, ts=1)
+        recorder.record('m', 'i', 2, ts=1)
+        for _ in range(100):
+            if buffer.getvalue():
+                break
+            time.sleep(0.02)
+        self.assertEqual(b'm i=1i 1000000000\nm i=2i 1000000000\n', buffer.getvalue())
+
+    def test_fork(self) -> None:
+        buffer = io.BytesIO()
+        recorder = BufferedMetricsRecorder(TelegrafBufferMetricsRecorder(buffer), max_lines=1, flush_lines=100, flush_interval=60)
+        recorder.record('parent', 'i', 1, ts=1)
+        recorder.record('parent', 'i', 2, ts=1)  # dropped
+        read_fd, write_fd = os.pipe()
+        with recorder._flush_lock:  # a flush of the parent is in progress
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    os.close(read_fd)
+                    signal.alarm(5)  # must not hang on the inherited locks
+                    recorder.record('child', 'i', 3, ts=1)
+                    recorder.flush()
+                    os.write(write_fd, buffer.getvalue())
+                finally:
+                    os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as f:
+            child_output = f.read()
+        os.waitpid(pid, 0)
+        # the child neither writes the lines of its parent nor reports its dropped lines
+        self.assertEqual(b'child i=3i 1000000000\n', child_output)
+        recorder.flush()
+        lines = buffer.getvalue().decode().splitlines()
+        self.assertEqual('parent i=1i 1000000000', lines[0])
+        self.assertIn('dropped=1i,total=1i', lines[1])
+        self.assertEqual(2, len(lines))
+
+    def test_sockets(self) -> None:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+            server.bind(('127.0.0.1', 0))
+            recorder = TelegrafSocketMetricsRecorder(f'udp://127.0.0.1:{server.getsockname()[1]}')
+            recorder.MAX_DATAGRAM_SIZE = 60  # two lines
+            recorder.record_batch([MetricPoint('metric', {'value': i}, 1) for i in range(3)])
+            self.assertEqual(b'metric value=0i 1000000000\nmetric value=1i 1000000000\n', server.recv(1000))
+            self.assertEqual(b'metric value=2i 1000000000\n', server.recv(1000))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'telegraf.sock')
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+                server.bind(path)
+                server.listen(1)
+                recorder = TelegrafSocketMetricsRecorder(f'unix://{path}')
+                recorder.record('metric', 'value', 1, ts=1)
+                connection, _ = server.accept()
+                with connection:
+                    self.assertEqual(b'metric value=1i 1000000000\n', connection.recv(1000))
+
+    def test_abstract_writer(self) -> None:
+        self.assertIn('get_writer', InfluxLineProtocolMetricsRecorder.__abstractmethods__)
+        with self.assertRaises(NotImplementedError):
+            TelegrafSocketMetricsRecorder('udp://127.0.0.1:8094').get_writer()
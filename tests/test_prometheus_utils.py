@@ -0,0 +1,29 @@
+from sqlalchemy import text
+
+from controlserver.models import db_session_2
+from saarctf_commons.prometheus_utils import DB_QUERIES, REDIS_ROUNDTRIPS, component, generate_metrics, setup_prometheus
+from saarctf_commons.redis import get_redis_connection
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class PrometheusUtilsTest(DatabaseTestCase):
+    def test_counters(self) -> None:
+        setup_prometheus('tests', serve=False)
+        queries = DB_QUERIES.labels('test_queries')._value.get()
+        roundtrips = REDIS_ROUNDTRIPS.labels('test_queries')._value.get()
+        with component('test_queries'):
+            with db_session_2() as session:
+                session.execute(text('SELECT 1'))
+                session.execute(text('SELECT 2'))
+            with get_redis_connection() as redis:
+                redis.get('test:prometheus')
+                with redis.pipeline() as pipe:
+                    pipe.set('test:prometheus', '1')
+                    pipe.delete('test:prometheus')
+                    pipe.execute()
+        self.assertEqual(queries + 2, DB_QUERIES.labels('test_queries')._value.get())
+        self.assertEqual(roundtrips + 2, REDIS_ROUNDTRIPS.labels('test_queries')._value.get())
+
+        exposition = generate_metrics().decode()
+        self.assertIn('saarctf_db_queries_total{component="test_queries"}', exposition)
+        self.assertIn('saarctf_scoring_seconds_bucket', exposition)
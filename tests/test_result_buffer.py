@@ -0,0 +1,132 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+from celery.signals import task_prerun, task_postrun
+from sqlalchemy import func, select
+
+from checker_runner.checker_execution import CheckerRunOutput
+from checker_runner.result_buffer import CheckerResultBuffer
+from checker_runner.runner import run_checkerscript_batch, save_checker_result
+from saarctf_commons.config import config
+from controlserver.models import CheckerResult, CheckerResultOutput, db_session_2
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class BatchRunner:
+    def __init__(self, crashing_team: int | None = None) -> None:
+        self.crashing_team = crashing_team
+
+    async def execute_checker_concurrent(self, team_id: int, tick: int, timeout: float) -> CheckerRunOutput:
+        if team_id == self.crashing_team:
+            raise KeyError('broken runner')
+        return CheckerRunOutput('SUCCESS', f'team {team_id}')
+
+
+class BatchTask:
+    name = 'checker_runner.runner.run_checkerscript_batch'
+    request = SimpleNamespace(id='batch', timelimit=(10, 5))
+
+
+class ResultBufferTest(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.demo_team_services()
+        with db_session_2() as session:
+            session.query(CheckerResult).delete()
+            session.commit()
+
+    def row(self, team_id: int, service_id: int, status: str = 'SUCCESS') -> dict[str, Any]:
+        return {'tick': 1, 'team_id': team_id, 'service_id': service_id, 'status': status, 'message': None,
+                'data': None, 'celery_id': f'{team_id}-{service_id}', 'time': 0.5, 'run_over_time': False}
+
+    def save(self, buffer: CheckerResultBuffer, row: dict[str, Any]) -> None:
+        output = f'output of {row["team_id"]}/{row["service_id"]}/{row["status"]}'
+        buffer.save(row, CheckerResultOutput.props_dict_for(row['tick'], row['team_id'], row['service_id'], output))
+
+    def count(self) -> int:
+        with db_session_2() as session:
+            return session.scalar(select(func.count()).select_from(CheckerResult)) or 0
+
+    def test_batches(self) -> None:
+        buffer = CheckerResultBuffer(batch_size=4, max_delay=5)
+        for _ in range(8):
+            buffer.task_started()
+        start = time.time()
+        with ThreadPoolExecutor(8) as executor:
+            rows = [self.row(team_id, service_id) for team_id in range(1, 5) for service_id in (1, 2)]
+            list(executor.map(lambda row: self.save(buffer, row), rows))
+        # two full batches, no waiting for max_delay
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(8, self.count())
+
+    def test_max_delay(self) -> None:
+        buffer = CheckerResultBuffer(batch_size=50, max_delay=0.2)
+        buffer.task_started()
+        buffer.task_started()
+        start = time.time()
+        self.save(buffer, self.row(1, 1))
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        self.assertEqual(1, self.count())
+        # a later result for the same check overwrites the previous one
+        buffer.task_finished()
+        self.save(buffer, self.row(1, 1, 'OFFLINE'))
+        with db_session_2() as session:
+            result = session.scalars(select(CheckerResult)).one()
+            self.assertEqual('OFFLINE', result.status)
+            self.assertEqual('output of 1/1/OFFLINE', result.output)
+
+    def test_finished_database_time(self) -> None:
+        buffer = CheckerResultBuffer(batch_size=1, max_delay=1)
+        with db_session_2() as session:
+            before = session.scalar(select(func.now()))
+        self.save(buffer, self.row(1, 1))
+        with db_session_2() as session:
+            after = session.scalar(select(func.now()))
+            result = session.scalars(select(CheckerResult)).one()
+        # set by the database on commit, not by the worker
+        self.assertIsNotNone(result.finished)
+        self.assertTrue(before <= result.finished <= after)
+
+    def test_batch_task(self) -> None:
+        task = BatchTask()
+        args = ['', 'package', 'script:Checker', 1, [1, 2, 3, 4], 1, None]
+        CheckerResultBuffer._instance = CheckerResultBuffer(batch_size=50, max_delay=5)
+        try:
+            with patch.object(config.RUNNER.result_buffer, 'enabled', True), \
+                    patch('checker_runner.runner.CheckerRunnerFactory.build', return_value=BatchRunner()), \
+                    patch.object(CheckerResultBuffer, '_write', wraps=CheckerResultBuffer._write) as write:
+                start = time.time()
+                task_prerun.send(sender=task, task_id='batch', task=task, args=args, kwargs={})
+                statuses = run_checkerscript_batch(task, *args)  # type: ignore[arg-type]
+                task_postrun.send(sender=task, task_id='batch', task=task, args=args, kwargs={})
+            # all teams of the batch are written together, without waiting for max_delay
+            self.assertLess(time.time() - start, 2)
+            self.assertEqual({'1': 'SUCCESS', '2': 'SUCCESS', '3': 'SUCCESS', '4': 'SUCCESS'}, statuses)
+            self.assertEqual(1, write.call_count)
+            self.assertEqual(4, len(write.call_args.args[0]))
+            self.assertEqual(0, CheckerResultBuffer.get()._running)
+            self.assertEqual(4, self.count())
+        finally:
+            CheckerResultBuffer._instance = None
+
+    def test_batch_task_failures(self) -> None:
+        def save(tick: int, service_id: int, team_id: int, *args: Any) -> None:
+            if team_id == 3:
+                raise OSError('database gone')
+            save_checker_result(tick, service_id, team_id, *args)
+
+        with patch('checker_runner.runner.CheckerRunnerFactory.build', return_value=BatchRunner(crashing_team=2)), \
+                patch('checker_runner.runner.save_checker_result', side_effect=save), \
+                patch('checker_runner.runner.report_retry_candidate') as report:
+            statuses = run_checkerscript_batch(BatchTask(), '', 'package', 'script:Checker', 1, [1, 2, 3, 4], 1, None)  # type: ignore[arg-type]
+        # the other teams are not affected
+        self.assertEqual({'1': 'SUCCESS', '2': 'CRASHED', '3': 'CRASHED', '4': 'SUCCESS'}, statuses)
+        with db_session_2() as session:
+            results = {r.team_id: r for r in session.scalars(select(CheckerResult))}
+            self.assertEqual({1: 'SUCCESS', 2: 'CRASHED', 4: 'SUCCESS'}, {team_id: r.status for team_id, r in results.items()})
+            self.assertIn('broken runner', results[2].output or '')
+        # only stored results are reported
+        self.assertEqual([1, 2, 4], sorted(c.args[2] for c in report.call_args_list))
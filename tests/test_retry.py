@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+from checker_runner.checker_execution import RetryPolicy
+from checker_runner.runner import celery_worker
+from controlserver import timer
+from controlserver.dispatcher import CeleryDispatcher, RETRY_SAFETY_MARGIN, DispatchRef
+from controlserver.models import Service, Team, CheckerResult, db_session
+from saarctf_commons.config import config
+from saarctf_commons.redis import get_redis_connection
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class RecordingDispatcher(CeleryDispatcher):
+    def __init__(self) -> None:
+        super().__init__()
+        self.retries: list[tuple[int, int, int, int]] = []
+
+    def _dispatch_retry(self, team: Team, service: Service, tick: int, attempt: int, eta: float, deadline: float) -> DispatchRef:
+        self.retries.append((team.id, service.id, tick, attempt))
+        return f'retry-{team.id}-{service.id}-{attempt}'
+
+
+class RetryTest(DatabaseTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        celery_worker.init()
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.retry_config = config.RUNNER.retry
+        config.RUNNER.retry = type(self.retry_config)(enabled=True, max_retries=1, statuses=['OFFLINE', 'TIMEOUT'], delay=2.0)
+        self.demo_team_services()
+        with get_redis_connection() as redis:
+            redis.delete('dispatcher:retry_requests:5', 'dispatcher:retry_refs:5', 'dispatcher:retry_targets:5')
+        self.timer = timer.init_mock_timer()
+        self.timer.current_tick = 5
+
+    def tearDown(self) -> None:
+        config.RUNNER.retry = self.retry_config
+        super().tearDown()
+
+    @staticmethod
+    def report(team_id: int, service_id: int, status: str, runtime: float = 0.5, attempt: int = 0) -> None:
+        request = {'team_id': team_id, 'service_id': service_id, 'status': status, 'runtime': runtime, 'attempt': attempt}
+        with get_redis_connection() as redis:
+            redis.rpush('dispatcher:retry_requests:5', json.dumps(request))
+
+    def test_policy(self) -> None:
+        policy = RetryPolicy.for_service(None)
+        self.assertTrue(policy.allows('OFFLINE', 0))
+        self.assertFalse(policy.allows('OFFLINE', 1))  # max_retries
+        self.assertFalse(policy.allows('MUMBLE', 0))  # status filter
+        policy = RetryPolicy.for_service({'retry': {'max_retries': 2, 'statuses': ['MUMBLE']}})
+        self.assertTrue(policy.allows('MUMBLE', 1))
+        self.assertFalse(policy.allows('MUMBLE', 2))
+        self.assertFalse(policy.allows('OFFLINE', 0))
+        config.RUNNER.retry.enabled = False
+        self.assertFalse(RetryPolicy.for_service({'retry': {'max_retries': 2}}).allows('OFFLINE', 0))
+
+    def test_process_requests(self) -> None:
+        service: Service = Service.query.get(2)  # type: ignore[assignment]
+        service.checker_timeout = 10
+        db_session().commit()
+        # retries start after 2 sec (delay), must be finished 1.5 sec before the deadline (tick end - safety margin)
+        self.timer._tick_end = time.time() + 2 + 1 + 1.5 + RETRY_SAFETY_MARGIN  # type: ignore[assignment]
+        self.report(1, 1, 'OFFLINE')  # predicted runtime 1 sec
+        self.report(2, 1, 'TIMEOUT')  # predicted runtime = timeout = 1 sec
+        self.report(3, 2, 'OFFLINE', runtime=0.2)  # predicted runtime 1 sec
+        self.report(4, 2, 'TIMEOUT')  # timeout 10 sec, does not fit
+        self.report(1, 3, 'MUMBLE')  # status not retried
+        self.report(2, 3, 'OFFLINE', attempt=1)  # max_retries reached
+
+        dispatcher = RecordingDispatcher()
+        self.assertEqual(3, dispatcher.process_retry_requests(5))
+        self.assertEqual([(1, 1, 5, 1), (2, 1, 5, 1), (3, 2, 5, 1)], dispatcher.retries)
+        self.assertEqual(['retry-1-1-1', 'retry-2-1-1', 'retry-3-2-1'], dispatcher._get_retry_refs(5))
+        self.assertEqual({'retry-1-1-1': (1, 1), 'retry-2-1-1': (2, 1), 'retry-3-2-1': (3, 2)}, dispatcher._get_retry_targets(5))
+        self.assertEqual(0, dispatcher.process_retry_requests(5))  # requests are consumed
+
+        # the tick is over - requests are discarded
+        self.report(1, 1, 'OFFLINE')
+        self.timer.current_tick = 6
+        self.assertEqual(0, dispatcher.process_retry_requests(5))
+        self.assertEqual(3, len(dispatcher.retries))
+
+    def test_priority(self) -> None:
+        # retries are consumed before regular checks on both brokers
+        self.assertEqual(9, celery_worker.app.conf.task_queue_max_priority)
+        with patch('saarctf_commons.config.current_config.RABBITMQ', {'host': 'localhost'}):
+            self.assertEqual(9, celery_worker.broker_priority(9))
+        with patch('saarctf_commons.config.current_config.RABBITMQ', None):
+            self.assertEqual(0, celery_worker.broker_priority(9))  # redis: lower values first
+        dispatcher = CeleryDispatcher()
+        with patch.object(dispatcher, '_create_celery_task', return_value=MagicMock()) as create:
+            dispatcher._dispatch_retry(Team.query.get(2), Service.query.get(1), 5, 1, time.time(), time.time() + 30)  # type: ignore[arg-type]
+        self.assertEqual(celery_worker.broker_priority(9), create.call_args.kwargs['priority'])
+        self.assertEqual({'attempt': 1}, create.call_args.kwargs['kwargs'])
+
+    def test_collect(self) -> None:
+        with get_redis_connection() as redis:
+            redis.hset('dispatcher:retry_targets:5', mapping={'retry-running': '[2, 1]', 'retry-failed': '[3, 1]', 'retry-pending': '[4, 1]'})
+        statuses = {'retry-running': 'STARTED', 'retry-failed': 'FAILURE', 'retry-pending': 'REVOKED'}
+        # the first attempts finished in time
+        for team_id in (2, 3, 4):
+            db_session().add(CheckerResult(tick=5, team_id=team_id, service_id=1, status='OFFLINE', message='first attempt',
+                                         celery_id=f'first-{team_id}'))
+        db_session().commit()
+
+        dispatcher = CeleryDispatcher()
+        with patch.object(CeleryDispatcher, '_get_celery_status', side_effect=lambda result: statuses[result.id]), \
+                patch('celery.result.AsyncResult.get', return_value=TimeoutError()), \
+                patch('celery.result.AsyncResult.forget') as forget:
+            dispatcher._collect_retries(5, dispatcher._get_retry_targets(5))
+        self.assertEqual(2, forget.call_count)  # finished or revoked retries, running ones still write their result
+        db_session().expire_all()
+        results = {r.team_id: r for r in CheckerResult.query.filter(CheckerResult.tick == 5).all()}
+        # still running at tick end - marked like regular checks
+        self.assertEqual('TIMEOUT', results[2].status)
+        self.assertTrue(results[2].run_over_time)
+        self.assertEqual('CRASHED', results[3].status)
+        # never started - the result of the first attempt stays
+        self.assertEqual('OFFLINE', results[4].status)
+        self.assertEqual('first attempt', results[4].message)
+
+    def test_loop_stops_at_tick_change(self) -> None:
+        self.timer._tick_end = time.time() + 100  # type: ignore[assignment]
+        dispatcher = RecordingDispatcher()
+        calls: list[int] = []
+
+        def process(tick: int) -> int:
+            calls.append(tick)
+            return 0
+
+        with patch.object(dispatcher, 'process_retry_requests', side_effect=process):
+            thread = threading.Thread(target=dispatcher.run_retry_loop, args=(5, 0.02))
+            thread.start()
+            time.sleep(0.2)
+            self.assertTrue(thread.is_alive())
+            self.timer.current_tick = 6
+            thread.join(timeout=2)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(calls)
+        self.assertEqual({5}, set(calls))
+
+    def test_loop_stops_before_tick_end(self) -> None:
+        self.timer._tick_end = time.time() + RETRY_SAFETY_MARGIN - 1  # type: ignore[assignment]
+        dispatcher = RecordingDispatcher()
+        with patch.object(dispatcher, 'process_retry_requests', return_value=0) as process:
+            dispatcher.run_retry_loop(5, 0.01)
+        process.assert_not_called()
+
+    def test_abstract(self) -> None:
+        from controlserver.dispatcher import GenericDispatcher
+
+        self.assertIn('_dispatch_retry', GenericDispatcher.__abstractmethods__)
+        self.assertIn('_revoke_retries', GenericDispatcher.__abstractmethods__)
+        self.assertIn('_collect_retries', GenericDispatcher.__abstractmethods__)
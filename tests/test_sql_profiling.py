@@ -0,0 +1,40 @@
+from sqlalchemy import text
+
+from controlserver.models import db_session_2
+from saarctf_commons.prometheus_utils import component
+from saarctf_commons.sql_profiling import SqlProfiler, collect_reports, fingerprint, merge_reports, top_statements
+from tests.utils.base_cases import DatabaseTestCase
+
+
+class SqlProfilingTest(DatabaseTestCase):
+    def test_fingerprint(self) -> None:
+        self.assertEqual('SELECT * FROM team WHERE id = ? AND name = ?',
+                         fingerprint("SELECT *\n  FROM team\n  WHERE id = 12 AND name = 'it''s'"))
+        self.assertEqual('SELECT * FROM t1 WHERE t1.id IN (?, ...) LIMIT ?',
+                         fingerprint('SELECT * FROM t1 WHERE t1.id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s) LIMIT %(param_1)s'))
+        self.assertEqual('INSERT INTO x (a, b) VALUES (?, ...), ...',
+                         fingerprint('INSERT INTO x (a, b) VALUES (%(a_m0)s, %(b_m0)s), (%(a_m1)s, %(b_m1)s), (1, 2.5)'))
+        self.assertEqual(fingerprint('SELECT a FROM b WHERE c = 1'), fingerprint('SELECT a FROM b WHERE c = 2'))
+
+    def test_profiling(self) -> None:
+        profiler = SqlProfiler.setup()
+        assert profiler is not None
+        profiler.stats.clear()
+        with component('test_stage'):
+            with db_session_2() as session:
+                for i in range(3):
+                    session.execute(text(f'SELECT {i}'))
+        stats = {key: value for key, value in profiler.stats.items() if key[0] == 'test_stage'}
+        self.assertEqual({('test_stage', 'SELECT ?')}, set(stats))
+        self.assertEqual(3, stats[('test_stage', 'SELECT ?')].count)
+        self.assertEqual(3, sum(stats[('test_stage', 'SELECT ?')].buckets))
+
+        profiler.publish()
+        reports = collect_reports()
+        self.assertGreaterEqual(len(reports), 1)
+        # two processes with the same report, one of them sampled 50%
+        sampled = dict(reports[0], sample_factor=2.0)
+        top = top_statements({key: value for key, value in merge_reports([profiler.report(), sampled]).items() if key[0] == 'test_stage'}, 5)
+        self.assertEqual(1, len(top))
+        self.assertEqual(9, top[0]['count'])
+        self.assertEqual(8, len(top[0]['id']))
@@ -0,0 +1,53 @@
+import threading
+import time
+
+from controlserver.utils.task_graph import TaskGraph
+from tests.utils.base_cases import TestCase
+
+
+class TaskGraphTest(TestCase):
+    def test_order(self) -> None:
+        order: list[str] = []
+        graph = TaskGraph('test')
+        graph.add('a', lambda: order.append('a'))
+        graph.add('b', lambda: order.append('b'), after=['a'])
+        graph.add('c', lambda: order.append('c'), after=['b'])
+        stages = graph.run()
+        self.assertEqual(['a', 'b', 'c'], order)
+        self.assertTrue(all(stage.status == 'success' for stage in stages.values()))
+        self.assertLessEqual(stages['a'].end or 0, stages['b'].start or 0)
+
+    def test_overlap(self) -> None:
+        barrier = threading.Barrier(2, timeout=5)
+        graph = TaskGraph('test')
+        graph.add('first', lambda: time.sleep(0.01))
+        graph.add('x', barrier.wait, after=['first'])
+        graph.add('y', barrier.wait, after=['first'])
+        stages = graph.run()
+        # both stages would block forever if they did not run concurrently
+        self.assertEqual('success', stages['x'].status)
+        self.assertEqual('success', stages['y'].status)
+
+    def test_failure(self) -> None:
+        def fail() -> None:
+            raise ValueError('stage failed')
+
+        graph = TaskGraph('test')
+        graph.add('a', fail)
+        graph.add('b', lambda: None, after=['a'])
+        graph.add('c', lambda: None, after=['b'])
+        graph.add('independent', lambda: None)
+        stages = graph.run()
+        self.assertEqual('failed', stages['a'].status)
+        self.assertIsInstance(stages['a'].error, ValueError)
+        self.assertEqual('skipped', stages['b'].status)
+        self.assertEqual('skipped', stages['c'].status)
+        self.assertEqual('success', stages['independent'].status)
+
+    def test_invalid(self) -> None:
+        graph = TaskGraph('test')
+        graph.add('a', lambda: None)
+        with self.assertRaises(ValueError):
+            graph.add('a', lambda: None)
+        with self.assertRaises(ValueError):
+            graph.add('b', lambda: None, after=['unknown'])
@@ -0,0 +1,126 @@
+import json
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Callable
+
+from controlserver.models import Tick, db_session_2
+from controlserver.timer import CTFTimer, CTFTimerSlave, CTFState, SNAPSHOT_KEY, publish_timer_state
+from saarctf_commons.redis import get_redis_connection
+from scripts.reconstruct_redis import reconstruct_redis
+from scripts.reset_ctf_to_round import reset_redis
+from tests.utils.base_cases import TestCase, DatabaseTestCase
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    for _ in range(50):
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError('Timeout')
+
+
+class TimerSnapshotTest(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        get_redis_connection().flushdb()
+
+    def test_snapshot(self) -> None:
+        master = CTFTimer()
+        master.init_from_redis()
+        master.tick_time = 120
+        slave = CTFTimerSlave()
+        slave.init_from_redis()
+        slave.bind_to_redis()
+        self.assertEqual(120, slave.tick_time)
+
+        master.start_ctf()
+        wait_for(lambda: slave.current_tick == 1)
+        self.assertEqual(CTFState.RUNNING, slave.state)
+        self.assertEqual(master.tick_start, slave.tick_start)
+        self.assertEqual(master.tick_end, slave.tick_end)
+
+        redis = get_redis_connection()
+        snapshot = {k.decode(): v.decode() for k, v in redis.hgetall(SNAPSHOT_KEY).items()}
+        self.assertEqual(master.get_snapshot(), snapshot)
+        self.assertEqual('None', snapshot['stopAfterRound'])
+        # legacy keys are still written
+        self.assertEqual(b'1', redis.get('timing:currentRound'))
+        self.assertEqual(b'RUNNING', redis.get('timing:state'))
+        self.assertEqual(str(master.tick_end).encode(), redis.get('round:1:end'))
+
+        # a restarted timer continues with the stored snapshot
+        master2 = CTFTimer()
+        master2.init_from_redis()
+        self.assertEqual(snapshot, master2.get_snapshot())
+        self.assertFalse(master2.apply_snapshot(json.loads(json.dumps(snapshot))))  # same version
+
+    def test_versions(self) -> None:
+        master = CTFTimer()
+        master.init_from_redis()
+        master.tick_time = 100
+        slave = CTFTimerSlave()
+        slave.init_from_redis()
+        slave.bind_to_redis()
+        self.assertEqual('1', master.get_snapshot()['version'])
+        # a script publishes while the master has not seen its snapshot yet
+        self.assertEqual('2', publish_timer_state(stopAfterRound=10)['version'])
+        wait_for(lambda: slave.stop_after_tick == 10)
+        # the master's next snapshot gets a new version, slaves must not skip it
+        master.tick_time = 90
+        self.assertEqual('3', master.get_snapshot()['version'])
+        wait_for(lambda: slave.tick_time == 90)
+        self.assertEqual(master.get_snapshot(), slave.get_snapshot())
+
+
+class TimerScriptsTest(DatabaseTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        get_redis_connection().flushdb()
+
+    @staticmethod
+    def stored_timer() -> CTFTimerSlave:
+        timer = CTFTimerSlave()
+        timer.init_from_redis()
+        return timer
+
+    def test_publish_timer_state(self) -> None:
+        publish_timer_state(state='SUSPENDED', desiredState='SUSPENDED', currentRound=5, roundTime=90)
+        slave = self.stored_timer()
+        slave.bind_to_redis()
+        self.assertEqual((CTFState.SUSPENDED, 5, 90), (slave.state, slave.current_tick, slave.tick_time))
+
+        snapshot = publish_timer_state(currentRound=6)
+        wait_for(lambda: slave.current_tick == 6)
+        self.assertEqual(snapshot, slave.get_snapshot())
+        self.assertEqual('2', snapshot['version'])
+        self.assertEqual((CTFState.SUSPENDED, 90), (slave.state, slave.tick_time))  # other fields are kept
+        self.assertEqual(b'6', get_redis_connection().get('timing:currentRound'))
+        with self.assertRaises(ValueError):
+            publish_timer_state(round=1)
+
+    def test_reset_redis(self) -> None:
+        publish_timer_state(state='SUSPENDED', desiredState='SUSPENDED', currentRound=10)
+        reset_redis(3)
+        # the snapshot is preferred over the legacy keys, it must not contain the old tick
+        timer = self.stored_timer()
+        self.assertEqual(3, timer.current_tick)
+        self.assertEqual(CTFState.SUSPENDED, timer.state)
+        self.assertEqual(b'3', get_redis_connection().get('timing:currentRound'))
+
+    def test_reconstruct_redis(self) -> None:
+        start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        with db_session_2() as session:
+            for tick in (1, 2):
+                session.add(Tick(tick=tick, start=start + timedelta(minutes=2 * tick), end=start + timedelta(minutes=2 * tick + 2)))
+            session.add(Tick(tick=3, start=start + timedelta(minutes=6)))
+            session.commit()
+        publish_timer_state(state='RUNNING', desiredState='RUNNING', currentRound=10, roundTime=60)
+
+        reconstruct_redis()
+        timer = self.stored_timer()
+        self.assertEqual(2, timer.current_tick)
+        self.assertEqual((CTFState.SUSPENDED, CTFState.SUSPENDED), (timer.state, timer.desired_state))
+        self.assertEqual(120, timer.tick_time)
+        self.assertEqual(int((start + timedelta(minutes=4)).timestamp()), timer.tick_start)
+        self.assertEqual(int((start + timedelta(minutes=6)).timestamp()), timer.tick_end)
+        self.assertEqual(b'SUSPENDED', get_redis_connection().get('timing:state'))
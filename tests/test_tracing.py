@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import time
+
+from controlserver.utils.task_graph import TaskGraph
+from saarctf_commons import tracing
+from saarctf_commons.config import config
+from saarctf_commons.tracing import SpanContext, SpanExporter, span, tick_context, record_tick_span, flush_spans
+from scripts.trace_report import group_by_tick, find_root, critical_path, report_tick
+from tests.utils.base_cases import TestCase
+
+
+class TracingTest(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.tmpdir.name, 'traces.jsonl')
+        config.TELEMETRY.trace_file = self.trace_file
+        SpanExporter._instance = None
+        SpanExporter._disabled_pid = None
+
+    def tearDown(self) -> None:
+        config.TELEMETRY.trace_file = None
+        SpanExporter._instance = None
+        SpanExporter._disabled_pid = None
+        self.tmpdir.cleanup()
+        super().tearDown()
+
+    def read_spans(self) -> list[dict]:
+        flush_spans()
+        with open(self.trace_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_traceparent(self) -> None:
+        context = tick_context(5)
+        self.assertEqual(context, tick_context(5))
+        self.assertNotEqual(context, tick_context(6))
+        self.assertEqual(context, SpanContext.from_traceparent(context.traceparent))
+        self.assertIsNone(SpanContext.from_traceparent('invalid'))
+        self.assertIsNone(SpanContext.from_traceparent(None))
+
+    def test_nesting(self) -> None:
+        with span('outer', tick=3) as outer:
+            with span('inner', x=1) as inner:
+                headers: dict = {}
+                tracing._inject_traceparent(headers=headers)
+        self.assertIsNone(tracing.current_context())
+        self.assertEqual(tick_context(3).trace_id, outer.context.trace_id)
+        self.assertEqual(tick_context(3).span_id, outer.parent_id)
+        self.assertEqual(outer.context.span_id, inner.parent_id)
+        self.assertEqual(inner.context.traceparent, headers['traceparent'])
+        spans = self.read_spans()
+        self.assertEqual(['inner', 'outer'], [s['name'] for s in spans])
+        self.assertEqual({'x': 1}, spans[0]['attributes'])
+
+    def test_error(self) -> None:
+        with self.assertRaises(ValueError):
+            with span('failing', tick=1):
+                raise ValueError('test')
+        spans = self.read_spans()
+        self.assertEqual('ERROR', spans[0]['status'])
+        self.assertIn('ValueError', spans[0]['statusMessage'])
+
+    def test_disabled(self) -> None:
+        config.TELEMETRY.trace_file = None
+        with span('ignored', tick=1):
+            pass
+        self.assertIsNone(SpanExporter.get())
+        self.assertFalse(os.path.exists(self.trace_file))
+
+    def test_task_graph(self) -> None:
+        graph = TaskGraph('test')
+        graph.add('a', lambda: None)
+        graph.add('b', lambda: None, after=['a'])
+        with span('pipeline', tick=7) as pipeline:
+            graph.run()
+        spans = {s['name']: s for s in self.read_spans()}
+        self.assertEqual(pipeline.context.span_id, spans['a']['parentSpanId'])
+        self.assertEqual(pipeline.context.span_id, spans['b']['parentSpanId'])
+
+    def test_report(self) -> None:
+        with span('end_of_tick', tick=2):
+            with span('collect'):
+                pass
+            with span('scoring'):
+                with span('scoreboard'):
+                    pass
+        record_tick_span(2, time.time() - 1, time.time() + 1)
+        with span('dispatch', tick=3):
+            pass
+        ticks = group_by_tick(self.read_spans())
+        self.assertEqual({2, 3}, set(ticks))
+        root = find_root(ticks[2])
+        assert root is not None
+        self.assertIsNone(find_root(ticks[3]))
+        path = [(depth, s['name']) for depth, s, _ in critical_path(ticks[2], root)]
+        self.assertEqual([(0, 'tick'), (1, 'end_of_tick'), (2, 'collect'), (2, 'scoring'), (3, 'scoreboard')], path)
+        self.assertIn('Critical path', report_tick(2, ticks[2], 5))
@@ -5,6 +5,7 @@ from pathlib import Path
 from sqlalchemy import text
 
 import saarctf_commons
+from controlserver.logger import flush_log_messages
 from controlserver.models import init_database, db_session, Team, Service, close_database, Database, \
     SubmittedFlag, CheckerFilesystem, TeamLogo, \
     LogMessage, db_session_2, Base
@@ -57,6 +58,7 @@ class DatabaseTestCase(TestCase):
         Base.metadata.create_all(bind=Database.db_engine)
 
     def setUp(self) -> None:
+        flush_log_messages()  # messages of the previous test
         session = db_session()
         Team.query.delete()
         TeamLogo.query.delete()
@@ -71,6 +73,7 @@ class DatabaseTestCase(TestCase):
 
     @classmethod
     def tearDownClass(cls) -> None:
+        flush_log_messages()
         Base.metadata.drop_all(bind=Database.db_engine)
         with Database.db_engine.connect() as conn:
             conn.execute(text("DROP TABLE IF EXISTS alembic_version;"))
@@ -99,6 +102,7 @@ class DatabaseTestCase(TestCase):
             session.commit()
 
     def get_logs(self) -> list[LogMessage]:
+        flush_log_messages()
         return list(LogMessage.query.order_by("created", "id"))
 
     def print_logs(self) -> None:
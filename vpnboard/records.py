@@ -1,6 +1,6 @@
 import logging
 
-from saarctf_commons.metric_utils import Metrics, Value
+from saarctf_commons.metric_utils import Metrics, Value, MetricPoint
 from vpnboard import VpnStatusHandler, VpnStatus
 
 
@@ -9,8 +9,9 @@ class MetricStatusHandler(VpnStatusHandler):
         routers_up = 0
         testbox_up = 0
         vulnbox_up = 0
+        points: list[MetricPoint] = []
         for state in states:
-            Metrics.record('vpn_connection', 'connected', 1 if state.connected else 0, ts=start, team_id=state.team.id)
+            points.append(MetricPoint('vpn_connection', {'connected': 1 if state.connected else 0}, start, {'team_id': state.team.id}))
             if state.connected:
                 metrics: dict[str, Value] = {
                     'router_up': 0 if state.router_ping_ms is None else 1,
@@ -29,7 +30,8 @@ class MetricStatusHandler(VpnStatusHandler):
                         vulnbox_up += 1
                     if state.vulnbox_ping_ms:
                         metrics['vulnbox_ping_ms'] = state.vulnbox_ping_ms
-                Metrics.record_many('vpn_board', metrics, ts=start, team_id=state.team.id)
+                points.append(MetricPoint('vpn_board', metrics, start, {'team_id': state.team.id}))
+        Metrics.record_batch(points)
 
 
 class WireguardPeerLogger(VpnStatusHandler):
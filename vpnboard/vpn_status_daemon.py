@@ -20,6 +20,7 @@ from saarctf_commons.config import config, load_default_config
 from saarctf_commons.db_utils import retry_on_sql_error
 from saarctf_commons.logging_utils import setup_script_logging
 from saarctf_commons.metric_utils import setup_default_metrics
+from saarctf_commons.prometheus_utils import setup_prometheus
 from saarctf_commons.redis import NamedRedisConnection, get_redis_connection
 from vpnboard import VpnStatus, VpnStatusHandler
 from vpnboard.records import WireguardPeerLogger, MetricStatusHandler
@@ -247,6 +248,7 @@ if __name__ == '__main__':
     NamedRedisConnection.set_clientname('VPN-Board Daemon')
     setup_script_logging('vpn-status-daemon')
     setup_default_metrics()
+    setup_prometheus('vpnboard')
     init_database()
 
     parser = argparse.ArgumentParser('''VPN Status Daemon. Modes: